@@ -1,12 +1,120 @@
 import os
 import time
 import tracemalloc
+from collections import deque
+from multiprocessing import get_context
 
 import numpy as np
 import h5py
 from tqdm.auto import tqdm
 
-from ..data._raw import convert_to_V
+from ..data._raw import convert_to_V, get_record_indices
+from ..features._mp import calc_main_parameters, calc_additional_parameters
+
+_MAINPAR_NAMES = ['pulse_height', 't_zero', 't_rise', 't_max', 't_decaystart', 't_half', 't_end', 'offset',
+                 'linear_drift', 'quadratic_drift']
+_ADD_MAINPAR_NAMES = ['array_max', 'array_min', 'var_first_eight', 'mean_first_eight', 'var_last_eight',
+                     'mean_last_eight', 'var', 'mean', 'skewness', 'max_derivative', 'ind_max_derivative',
+                     'min_derivative', 'ind_min_derivative', 'max_filtered', 'ind_max_filtered',
+                     'skewness_filtered_peak']
+
+# ------------------------------------------------------------
+# HELPER
+# ------------------------------------------------------------
+
+def _read_events(recs, idx, event_dtype):
+    # Converts the records at the indices 'idx' (shape (nmbr_channels, n)) of the memory mapped RDT file to volt, in
+    # the data type with which they are stored in the HDF5 file
+    events = np.empty((*idx.shape, recs.dtype['samples'].shape[0]), dtype=event_dtype)
+    for c, idx_c in enumerate(idx):
+        events[c] = convert_to_V(recs['samples'][idx_c])
+
+    return events
+
+
+def _block_parameters(events, calc_mp, calc_add_mp):
+    # Calculates the (additional) main parameters of a block of events of shape (nmbr_channels, n, record_length)
+    mainpar = [[calc_main_parameters(ev).getArray() for ev in events_c] for events_c in events] if calc_mp else []
+    add_mainpar = [[calc_additional_parameters(ev, None) for ev in events_c] for events_c in events] \
+        if calc_add_mp else []
+
+    return np.array(mainpar, dtype=float), np.array(add_mainpar, dtype=float)
+
+
+def _calc_block_parameters(args):
+    # Runs in the worker processes: reads and converts a block of records from the memory mapped RDT file itself
+    # (instead of receiving the events from the main process) and returns only their (additional) main parameters.
+    # The parameters are calculated from the converted values in the stored data type, i.e. they are the same as if
+    # they were calculated from the HDF5 file.
+    rdt_path, record, idx, event_dtype, calc_mp, calc_add_mp = args
+    events = _read_events(np.memmap(rdt_path, dtype=record, mode='r'), idx, event_dtype)
+
+    return _block_parameters(events, calc_mp, calc_add_mp)
+
+
+def _imap_bounded(pool, f, tasks, max_pending):
+    # Like pool.imap, but at most 'max_pending' tasks are submitted whose results were not consumed yet, such that
+    # the results do not pile up in memory if writing is slower than calculating them
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(f, (task,)))
+        if len(pending) == max_pending:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def _write_records(h5group, recs, rdt_path, record, idx, nmbr_channels, event_dtype, batch_size,
+                   calc_mp=False, calc_add_mp=False, pool=None, max_pending=None):
+    # Streams the records (of all channels) starting at the indices 'idx' from the RDT file to the 'event' dataset
+    # of 'h5group' in blocks of 'batch_size' events. The events are converted and written in this process. Their
+    # (additional) main parameters are calculated either in the worker processes of 'pool' (which read the records
+    # themselves and only send back the parameters, at most 'max_pending' blocks ahead of writing) or here.
+    record_length = record['samples'].shape[0]
+    nmbr_events = idx.shape[0]
+
+    # Chunks of (about) 1 MiB which hold the samples of a single channel
+    chunks = (1, int(min(nmbr_events, max(1, 2 ** 20 // (record_length * np.dtype(event_dtype).itemsize)))),
+              record_length) if nmbr_events > 0 else None
+    h5group.create_dataset('event', shape=(nmbr_channels, nmbr_events, record_length), dtype=event_dtype,
+                           chunks=chunks)
+
+    if calc_mp:
+        h5group.create_dataset('mainpar', shape=(nmbr_channels, nmbr_events, len(_MAINPAR_NAMES)), dtype=float)
+        for i, name in enumerate(_MAINPAR_NAMES):
+            h5group['mainpar'].attrs.create(name=name, data=i)
+    if calc_add_mp:
+        h5group.create_dataset('add_mainpar', shape=(nmbr_channels, nmbr_events, len(_ADD_MAINPAR_NAMES)),
+                               dtype=float)
+        for i, name in enumerate(_ADD_MAINPAR_NAMES):
+            h5group['add_mainpar'].attrs.create(name=name, data=i)
+
+    starts = range(0, nmbr_events, batch_size)
+    blocks = [idx[start:start + batch_size] + np.arange(nmbr_channels)[:, None] for start in starts]
+
+    parameters = None
+    if pool is not None and (calc_mp or calc_add_mp):
+        parameters = _imap_bounded(pool, _calc_block_parameters,
+                                   [(rdt_path, record, block, event_dtype, calc_mp, calc_add_mp) for block in blocks],
+                                   max_pending)
+
+    with tqdm(total=nmbr_events) as pbar:
+        for start, block in zip(starts, blocks):
+            stop = start + block.shape[1]
+
+            events = _read_events(recs, block, event_dtype)
+            h5group['event'][:, start:stop, :] = events
+
+            if calc_mp or calc_add_mp:
+                mainpar, add_mainpar = next(parameters) if parameters is not None \
+                    else _block_parameters(events, calc_mp, calc_add_mp)
+                if calc_mp:
+                    h5group['mainpar'][:, start:stop, :] = mainpar
+                if calc_add_mp:
+                    h5group['add_mainpar'][:, start:stop, :] = add_mainpar
+
+            pbar.update(stop - start)
+
 
 # ------------------------------------------------------------
 # FUNCTION
@@ -25,6 +133,9 @@ def gen_dataset_from_rdt_memsafe(path_rdt,
                                  batch_size=1000,
                                  trace=False,
                                  indiv_tpas=False,
+                                 calc_mp=False,
+                                 calc_add_mp=False,
+                                 processes=1,
                                  ):
     """
     Generates a HDF5 File from an RDT File, with an memory safe implementation. This is recommended, in case the RDT
@@ -57,6 +168,15 @@ def gen_dataset_from_rdt_memsafe(path_rdt,
     :param individual_tpas: Write individual TPAs for the all channels. This results in a testpulseamplitude dataset
             of shape (nmbr_channels, nmbr_testpulses). Otherwise we have (nmbr_testpulses).
     :type individual_tpas: bool
+    :param calc_mp: If True the main parameters of the events and testpulses are calculated and stored.
+    :type calc_mp: bool
+    :param calc_add_mp: If True the additional main parameters of the events and testpulses are calculated and stored
+        (without the optimum filter, i.e. the filtered quantities are filled with zeros).
+    :type calc_add_mp: bool
+    :param processes: The number of processes used to calculate the (additional) main parameters. The worker processes
+        read the records from the RDT file themselves and only send back the parameters, while the main process
+        converts and writes the events. Only used if calc_mp or calc_add_mp is True.
+    :type processes: int
     """
 
     nmbr_channels = len(channels)
@@ -128,29 +248,12 @@ def gen_dataset_from_rdt_memsafe(path_rdt,
 
     print('Getting good idx. (Depending on OS and drive reading speed, this might take some minutes!)')
 
-    good_idx = []
-
-    detnmbrs = []
-
-    for r in tqdm(recs):
-        detnmbrs.append(r['detector_nmbr'])
-
-    # detnmbrs = np.array(detnmbrs)
-
     detnmbrs = np.array(recs['detector_nmbr'])
 
     for c in channels:
         print(f'Event Counts Channel {c}: {np.sum(detnmbrs == c)}')
-    recs = np.memmap("{}{}.rdt".format(path_rdt, fname), dtype=record, mode='r')
 
-    for idx in range(recs.shape[0] - nmbr_channels + 1):
-        cond = True
-        for j in range(nmbr_channels):
-            cond = np.logical_and(cond, detnmbrs[idx + j] == channels[j])
-            if not cond:
-                break
-        if cond:
-            good_idx.append(idx)
+    good_idx = get_record_indices(detnmbrs, channels)
 
     if trace:
         current, peak = tracemalloc.get_traced_memory()
@@ -161,7 +264,6 @@ def gen_dataset_from_rdt_memsafe(path_rdt,
 
     print('Getting good tpas.')
 
-    good_idx = np.array(good_idx)
     good_tpas = np.array(recs[good_idx]['test_pulse_amplitude'])
 
     if trace:
@@ -184,114 +286,76 @@ def gen_dataset_from_rdt_memsafe(path_rdt,
             path += '-{}_Ch{}'.format(i + 1, c)
         path += ".h5"
 
-    with h5py.File(path, 'w') as h5f:
-
-        for i, c in enumerate(channels):
-            h5f.attrs.create('Ch_{}'.format(i + 1), data=c)
-
-        # ################# PROCESS EVENTS #################
-        # if we filtered for events
-        if 0.0 in tpa_list:
-            print('\nWORKING ON EVENTS WITH TPA = 0.')
-
-            nmbr_events = np.sum(good_tpas == 0.)
-            idx_events = good_idx[good_tpas == 0.]
-
-            print('CREATE DATASET WITH EVENTS.')
-            events = h5f.create_group('events')
-            events.create_dataset('event', shape=(nmbr_channels, nmbr_events, record_length), dtype=event_dtype)
-            events.create_dataset('hours', data=recs['hours'][idx_events], dtype=float)
-            events.create_dataset('dac_output', data=recs['dac_output'][idx_events], dtype=float)
-            events.create_dataset('time_s', data=recs['abs_time_s'][idx_events], dtype='int32')
-            events.create_dataset('time_mus', data=recs['abs_time_mus'][idx_events], dtype='int32')
-
-            with tqdm(total=nmbr_channels * nmbr_events) as pbar:
-                holder = np.zeros((batch_size, record_length), dtype=event_dtype)
-                for c in range(nmbr_channels):
-                    # create new memmep for lower memory usage
-                    del recs
-                    recs = np.memmap("{}{}.rdt".format(path_rdt, fname), dtype=record, mode='r')
-                    counter = 0
-                    while counter < nmbr_events - batch_size:
-                        holder[:, :] = convert_to_V(recs['samples'][idx_events[counter:counter + batch_size] + c])
-                        events['event'][c, counter:counter + batch_size, ...] = holder
-                        pbar.update(batch_size)
-                        counter += batch_size
-                    events['event'][c, counter:nmbr_events, ...] = convert_to_V(
-                        recs['samples'][idx_events[counter:nmbr_events] + c])
-                    pbar.update(nmbr_events - counter)
-
-        # ################# PROCESS NOISE #################
-        # if we filtered for noise
-        if -1.0 in tpa_list:
-            print('\nWORKING ON EVENTS WITH TPA = -1.')
-
-            nmbr_noise = np.sum(good_tpas == -1.)
-            idx_noise = good_idx[good_tpas == -1.]
-
-            print('CREATE DATASET WITH NOISE.')
-            noise = h5f.create_group('noise')
-            noise.create_dataset('event', shape=(nmbr_channels, nmbr_noise, record_length), dtype=event_dtype)
-            noise.create_dataset('hours', data=recs['hours'][idx_noise], dtype=float)
-            noise.create_dataset('dac_output', data=recs['dac_output'][idx_noise], dtype=float)
-            noise.create_dataset('time_s', data=recs['abs_time_s'][idx_noise], dtype='int32')
-            noise.create_dataset('time_mus', data=recs['abs_time_mus'][idx_noise], dtype='int32')
-
-            with tqdm(total=nmbr_channels * nmbr_noise) as pbar:
-                holder = np.zeros((batch_size, record_length), dtype=event_dtype)
-                for c in range(nmbr_channels):
-                    # create new memmep for lower memory usage
-                    del recs
-                    recs = np.memmap("{}{}.rdt".format(path_rdt, fname), dtype=record, mode='r')
-                    counter = 0
-                    while counter < nmbr_noise - batch_size:
-                        holder[:, :] = convert_to_V(recs['samples'][idx_noise[counter:counter + batch_size] + c])
-                        noise['event'][c, counter:counter + batch_size, ...] = holder
-                        pbar.update(batch_size)
-                        counter += batch_size
-                    noise['event'][c, counter:nmbr_noise, ...] = convert_to_V(
-                        recs['samples'][idx_noise[counter:nmbr_noise] + c])
-                    pbar.update(nmbr_noise - counter)
-
-        # ################# PROCESS TESTPULSES #################
-        # if we filtered for testpulses
-        if any(el > 0 for el in tpa_list):
-            print('\nWORKING ON EVENTS WITH TPA > 0.')
-
-            nmbr_testpulses = np.sum(good_tpas > 0.)
-            idx_testpulses = good_idx[good_tpas > 0.]
-
-            print('CREATE DATASET WITH TESTPULSES.')
-            testpulses = h5f.create_group('testpulses')
-            testpulses.create_dataset('event', shape=(nmbr_channels, nmbr_testpulses, record_length), dtype=event_dtype)
-            data_to_write = recs['test_pulse_amplitude'][idx_testpulses]
-            if indiv_tpas:
-                data_to_write = np.tile(data_to_write, (nmbr_channels, 1))
-            testpulses.create_dataset('testpulseamplitude', data=data_to_write,
-                                      dtype=float)
-            testpulses.create_dataset('hours', data=recs['hours'][idx_testpulses], dtype=float)
-            testpulses.create_dataset('dac_output', data=recs['dac_output'][idx_testpulses], dtype=float)
-            testpulses.create_dataset('time_s', data=recs['abs_time_s'][idx_testpulses], dtype='int32')
-            testpulses.create_dataset('time_mus', data=recs['abs_time_mus'][idx_testpulses], dtype='int32')
-
-            with tqdm(total=nmbr_channels * nmbr_testpulses) as pbar:
-                holder = np.zeros((batch_size, record_length), dtype=event_dtype)
-                for c in range(nmbr_channels):
-                    # create new memmep for lower memory usage
-                    # del recs
-                    # recs = np.memmap("{}{}.rdt".format(path_rdt, fname), dtype=record, mode='r')
-                    counter = 0
-                    while counter < nmbr_testpulses - batch_size:
-                        holder[:, :] = convert_to_V(recs['samples'][idx_testpulses[counter:counter + batch_size] + c])
-                        testpulses['event'][c, counter:counter + batch_size, ...] = holder
-                        pbar.update(batch_size)
-                        counter += batch_size
-                    testpulses['event'][c, counter:nmbr_testpulses, ...] = convert_to_V(
-                        recs['samples'][idx_testpulses[counter:nmbr_testpulses] + c])
-                    pbar.update(nmbr_testpulses - counter)
-
-    # recs
-    del holder
+    rdt_path = "{}{}.rdt".format(path_rdt, fname)
+
+    # The (additional) main parameters are calculated by worker processes which read the records from the memory
+    # mapped RDT file themselves, the events are converted and written in this process
+    pool = get_context("spawn").Pool(processes) if processes > 1 and (calc_mp or calc_add_mp) else None
+
+    try:
+        with h5py.File(path, 'w') as h5f:
+
+            for i, c in enumerate(channels):
+                h5f.attrs.create('Ch_{}'.format(i + 1), data=c)
+
+            # ################# PROCESS EVENTS #################
+            # if we filtered for events
+            if 0.0 in tpa_list:
+                print('\nWORKING ON EVENTS WITH TPA = 0.')
+
+                idx_events = good_idx[good_tpas == 0.]
+
+                print('CREATE DATASET WITH EVENTS.')
+                events = h5f.create_group('events')
+                events.create_dataset('hours', data=recs['hours'][idx_events], dtype=float)
+                events.create_dataset('dac_output', data=recs['dac_output'][idx_events], dtype=float)
+                events.create_dataset('time_s', data=recs['abs_time_s'][idx_events], dtype='int32')
+                events.create_dataset('time_mus', data=recs['abs_time_mus'][idx_events], dtype='int32')
+
+                _write_records(events, recs, rdt_path, record, idx_events, nmbr_channels, event_dtype, batch_size,
+                               calc_mp, calc_add_mp, pool, 2 * processes)
+
+            # ################# PROCESS NOISE #################
+            # if we filtered for noise
+            if -1.0 in tpa_list:
+                print('\nWORKING ON EVENTS WITH TPA = -1.')
+
+                idx_noise = good_idx[good_tpas == -1.]
+
+                print('CREATE DATASET WITH NOISE.')
+                noise = h5f.create_group('noise')
+                noise.create_dataset('hours', data=recs['hours'][idx_noise], dtype=float)
+                noise.create_dataset('dac_output', data=recs['dac_output'][idx_noise], dtype=float)
+                noise.create_dataset('time_s', data=recs['abs_time_s'][idx_noise], dtype='int32')
+                noise.create_dataset('time_mus', data=recs['abs_time_mus'][idx_noise], dtype='int32')
+
+                _write_records(noise, recs, rdt_path, record, idx_noise, nmbr_channels, event_dtype, batch_size)
+
+            # ################# PROCESS TESTPULSES #################
+            # if we filtered for testpulses
+            if any(el > 0 for el in tpa_list):
+                print('\nWORKING ON EVENTS WITH TPA > 0.')
+
+                idx_testpulses = good_idx[good_tpas > 0.]
+
+                print('CREATE DATASET WITH TESTPULSES.')
+                testpulses = h5f.create_group('testpulses')
+                data_to_write = recs['test_pulse_amplitude'][idx_testpulses]
+                if indiv_tpas:
+                    data_to_write = np.tile(data_to_write, (nmbr_channels, 1))
+                testpulses.create_dataset('testpulseamplitude', data=data_to_write,
+                                          dtype=float)
+                testpulses.create_dataset('hours', data=recs['hours'][idx_testpulses], dtype=float)
+                testpulses.create_dataset('dac_output', data=recs['dac_output'][idx_testpulses], dtype=float)
+                testpulses.create_dataset('time_s', data=recs['abs_time_s'][idx_testpulses], dtype='int32')
+                testpulses.create_dataset('time_mus', data=recs['abs_time_mus'][idx_testpulses], dtype='int32')
+
+                _write_records(testpulses, recs, rdt_path, record, idx_testpulses, nmbr_channels, event_dtype,
+                               batch_size, calc_mp, calc_add_mp, pool, 2 * processes)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
     if trace:
         current, peak = tracemalloc.get_traced_memory()
@@ -65,6 +65,30 @@ def convert_to_int(event, bits=16, max=10, min=-10, offset=0):
     return event
 
 
+def get_record_indices(detector_nmbr, channels):
+    """
+    Find the records of correlated channels in an RDT file, i.e. the indices of records of the first channel which are
+    directly followed by records of the remaining channels (in the given order).
+
+    :param detector_nmbr: The detector numbers of all records in the RDT file.
+    :type detector_nmbr: 1D array
+    :param channels: The channels that belong together.
+    :type channels: list of ints
+    :return: The indices of the records of the first channel. The records of the j-th channel are at these indices + j.
+    :rtype: 1D array
+    """
+    detector_nmbr = np.asarray(detector_nmbr)
+    n = detector_nmbr.shape[0] - len(channels) + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    cond = np.ones(n, dtype=bool)
+    for j, c in enumerate(channels):
+        cond &= detector_nmbr[j:j + n] == c
+
+    return np.flatnonzero(cond)
+
+
 def read_rdt_file(fname, path, channels,
                   remove_offset=False, store_as_int=False, ints_in_header=7, lazy_loading=True):
     """
@@ -135,26 +159,12 @@ def read_rdt_file(fname, path, channels,
     else:
         recs = np.memmap("{}{}.rdt".format(path, fname), dtype=record, mode='r')
 
-    # check if all events belong together in the channels
-    good_recs = [[] for i in range(nmbr_channels)]
-
     length_recs = recs.shape[0]
     print('Total Records in File: ', length_recs)
 
-    if nmbr_channels > 1:
-        for i in range(length_recs):
-            if i > length_recs - nmbr_channels:
-                break
-            cond = recs[i]['detector_nmbr'] == channels[0]
-            for j, c in enumerate(channels[1:]):
-                cond = np.logical_and(cond, recs[i + j + 1]['detector_nmbr'] == c)
-            if cond:
-                for j in range(nmbr_channels):
-                    good_recs[j].append(i + j)
-    else:  # exceptional handling for case of just one channel
-        for i in range(length_recs):
-            if recs[i]['detector_nmbr'] == channels[0]:
-                good_recs[0].append(i)
+    # check if all events belong together in the channels
+    good_idx = get_record_indices(recs['detector_nmbr'], channels)
+    good_recs = [good_idx + j for j in range(nmbr_channels)]
 
     nmbr_good_recs = len(good_recs[0])
     print('Event Counts: ', nmbr_good_recs)
@@ -168,18 +178,21 @@ def read_rdt_file(fname, path, channels,
         pulse = np.empty([nmbr_channels, nmbr_good_recs, record_length], dtype='int16')
 
     for c in range(nmbr_channels):
+        # read the records of this channel only once
+        recs_c = recs[good_recs[c]]
         for i, d in enumerate(record.descr):
             name = d[0]
             if name == 'delay_ch_tp' and ints_in_header != 7:
                 continue
-            metainfo[c, :, i] = recs[good_recs[c]][name].reshape(-1)
+            metainfo[c, :, i] = recs_c[name].reshape(-1)
             if i >= 13:
                 break
-        dvms[c] = recs[good_recs[c]]['dvm_channels']
+        dvms[c] = recs_c['dvm_channels']
         if not store_as_int:
-            pulse[c] = convert_to_V(recs[good_recs[c]]['samples'])
+            pulse[c] = convert_to_V(recs_c['samples'])
         else:
-            pulse[c] = recs[good_recs[c]]['samples']
+            pulse[c] = recs_c['samples']
+        del recs_c
 
     if remove_offset and not store_as_int:
         pulse = np.subtract(pulse.T, np.mean(pulse[:, :, :int(record_length / 8)], axis=2).T).T
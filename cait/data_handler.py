@@ -2,12 +2,23 @@ import os
 import subprocess
 import warnings
 from typing import List, Union
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 import fnmatch
+import zlib
 
 import numpy as np
 import h5py
 from tqdm.auto import tqdm
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
 from .mixins._data_handler_simulate import SimulateMixin
 from .mixins._data_handler_rdt import RdtMixin
 from .mixins._data_handler_plot import PlotMixin
@@ -29,6 +40,48 @@ ADD_MAINPAR = ['array_max', 'array_min', 'var_first_eight',
                'ind_max_derivative', 'min_derivative', 'ind_min_derivative', 
                'max_filtered', 'ind_max_filtered', 'skewness_filtered_peak']
 
+# -----------------------------------------------------------
+# HELPER
+# -----------------------------------------------------------
+
+class _SessionFile:
+    # Wraps the HDF5 file handle of a session (see DataHandler.session) such that
+    # it can be used like a file handle returned by h5py.File, but closing it 
+    # (explicitly or by leaving a with statement) does not close the session's file
+    def __init__(self, f: h5py.File):
+        self._f = f
+
+    def __enter__(self):
+        return self._f
+    
+    def __exit__(self, typ, val, tb):
+        pass
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+    
+    def __getitem__(self, key):
+        return self._f[key]
+    
+    def __contains__(self, key):
+        return key in self._f
+    
+    def __iter__(self):
+        return iter(self._f)
+    
+    def __len__(self):
+        return len(self._f)
+
+def _compress_chunk(data: np.ndarray, level: int, shuffle: bool):
+    # Applies HDF5's shuffle (optional) and deflate filters to a chunk
+    # (zlib releases the GIL, i.e. this can run in parallel threads)
+    buf = np.ascontiguousarray(data).view(np.uint8)
+    if shuffle: buf = buf.reshape(-1, data.dtype.itemsize).T
+    return zlib.compress(buf.tobytes(), level)
+
 # -----------------------------------------------------------
 # CLASS
 # -----------------------------------------------------------
@@ -136,8 +189,17 @@ class DataHandler(SimulateMixin,
                 else:
                     self.colors.append('red')
 
+        # HDF5 file handle of an active session (see self.session)
+        self._session = None
+
         print('DataHandler Instance created.')
 
+    def __getstate__(self):
+        # Open file handles cannot be pickled (e.g. when sending H5Iterators to other processes)
+        state = self.__dict__.copy()
+        state["_session"] = None
+        return state
+
     def __repr__(self):
         return f'{self.__class__.__name__}(record_length={self.record_length}, sample_frequency={self.sample_frequency}, dt_us={int(1e6/self.sample_frequency)}, channels={self.channels})'
 
@@ -283,13 +345,64 @@ class DataHandler(SimulateMixin,
             ...
             <KeysViewHDF5 ['events', 'noise', 'testpulses']>
             """
+            session = getattr(self, "_session", None)
+            if session is not None and (path is None or os.path.abspath(path) == os.path.abspath(self.get_filepath())):
+                if session.mode == "r" and mode != "r":
+                    raise OSError(f"The HDF5 file is opened read-only in the current session but mode '{mode}' was requested. Use dh.session(mode='r+') to be able to write to the file.")
+                if mode in ["w", "w-", "x"]:
+                    raise OSError(f"The HDF5 file cannot be opened in mode '{mode}' during a session.")
+                return _SessionFile(session)
+            
             if path is None:
                 f = h5py.File(self.get_filepath(), mode)
             else:
                 f = h5py.File(path, mode)
             return f
     
-    def get_event_iterator(self, group: str, channel: int = None, flag: List[bool] = None, batch_size: int = None):
+    @contextmanager
+    def session(self, 
+                mode: str = "r+", 
+                rdcc_nbytes: int = 64*2**20, 
+                rdcc_nslots: int = None, 
+                rdcc_w0: float = None,
+                page_buf_size: int = None):
+        """
+        Keep the HDF5 file open for the duration of a with statement. Within the session, :meth:`get_filehandle`, :meth:`get`, :meth:`set`, the event iterators (see :meth:`get_event_iterator`) and the methods of the DataHandler which open the file via :meth:`get_filehandle` use the same file handle instead of opening and closing the file for each call. This makes repeated (small) reads much faster, especially if many datasets are accessed (e.g. in notebooks) or if the file is on a network drive. Additionally, the session's chunk cache keeps recently read (and decompressed) chunks of chunked datasets in memory.
+
+        Note that other processes should not write to the HDF5 file during a session. Sessions cannot be nested.
+
+        :param mode: The mode in which the file is opened. Defaults to "r+", i.e. reading and writing is allowed. If "r" is used, all methods which write to the file raise an error.
+        :type mode: str, optional
+        :param rdcc_nbytes: The size of the chunk cache of each dataset in bytes (see h5py.File). Defaults to 64 MiB.
+        :type rdcc_nbytes: int, optional
+        :param rdcc_nslots: The number of slots in the chunk cache's hash table (see h5py.File). Should be a prime number about 100 times the number of chunks which fit into the cache. Defaults to None, i.e. the default of h5py.
+        :type rdcc_nslots: int, optional
+        :param rdcc_w0: The chunk preemption policy of the chunk cache between 0 and 1 (see h5py.File). Defaults to None, i.e. the default of h5py.
+        :type rdcc_w0: float, optional
+        :param page_buf_size: The size of the page buffer in bytes (see h5py.File). This is only supported for files which were created with the "page" file space strategy. Defaults to None, i.e. no page buffering.
+        :type page_buf_size: int, optional
+
+        >>> with dh.session():
+        ...     ph = dh.get("events", "pulse_height")
+        ...     t = dh.get("events", "hours")
+        ...     dh.set("events", ph_squared=ph**2)
+        """
+        if mode not in ["r", "r+", "a"]:
+            raise ValueError(f"Unsupported mode '{mode}' for a session. Choose one of ['r', 'r+', 'a'].")
+        if getattr(self, "_session", None) is not None:
+            raise RuntimeError("A session is already active for this DataHandler.")
+        
+        kwargs = dict(rdcc_nbytes=rdcc_nbytes, rdcc_nslots=rdcc_nslots, rdcc_w0=rdcc_w0)
+        if page_buf_size is not None: kwargs["page_buf_size"] = page_buf_size
+
+        self._session = h5py.File(self.get_filepath(), mode, **kwargs)
+        try:
+            yield self
+        finally:
+            f, self._session = self._session, None
+            f.close()
+    
+    def get_event_iterator(self, group: str, channel: int = None, flag: List[bool] = None, batch_size: int = None, prefetch: int = None, cache_size: int = None):
         """
         Returns H5Iterator object that can be used to iterate events in a dataset called 'event' of a given group and channel. When used within a with statement, the corresponding HDF5 file is kept open for faster access.
 
@@ -299,6 +412,12 @@ class DataHandler(SimulateMixin,
         :type channel: int
         :param flag: A boolean flag of events to include in the iterator
         :type flag: list of bool
+        :param batch_size: The number of events to be returned at once (these are all read together).
+        :type batch_size: int
+        :param prefetch: The number of batches (or events if no batches are used) which are read in a background thread while the current one is processed. Defaults to None, i.e. no prefetching.
+        :type prefetch: int
+        :param cache_size: The maximum number of bytes of event data which is kept in memory for repeated passes over the events. Defaults to None, i.e. no caching.
+        :type cache_size: int
 
         :return: H5Iterator
         :rtype: Context Manager / Iterator
@@ -314,25 +433,49 @@ class DataHandler(SimulateMixin,
         ...         print(np.max(ev))
         """
         # Reading number of events is much faster if we open the HDF5 file directly
-        with h5py.File(self.get_filepath(), 'r') as f:
+        with self.get_filehandle(mode="r") as f:
             n_events = f[group]["event"].shape[1]
             
         inds = np.arange(n_events)
 
         if flag is not None: inds = inds[flag]
 
-        return H5Iterator(self, group=group, channels=channel, inds=inds, batch_size=batch_size)
+        return H5Iterator(self, group=group, channels=channel, inds=inds, batch_size=batch_size, prefetch=prefetch, cache_size=cache_size)
     
-    def include_event_iterator(self, group: str, it: IteratorBaseClass, dtype: str = 'float32'):
+    def include_event_iterator(self, 
+                               group: str, 
+                               it: IteratorBaseClass, 
+                               dtype: str = 'float32',
+                               chunks: tuple = None,
+                               compression: Union[str, int] = None,
+                               compression_opts = None,
+                               shuffle: bool = False,
+                               n_threads: int = 1):
         """
         Includes the events returned by an iterator into dataset 'event' of a specified group. The timestamps of the iterator are saved in datasets 'time_s' and 'time_mus' of the same group, in alignment with the convention of cait.
 
+        The events are collected in blocks of chunks (along the event dimension) which are compressed and written in background threads while the next events are read from the iterator. For gzip compression with chunks which span all channels and samples (the default), the chunks are compressed in parallel by `n_threads` threads and written to the file directly. For other compressions (e.g. 'lzf' or filters provided by `hdf5plugin` like Blosc), HDF5 compresses the chunks itself in a single background thread.
+
         :param group: The target group in the HDF5 file.
         :type group: str
         :param it: The iterator whose events we want to include.
         :type it: IteratorBaseClass
         :param dtype: The datatype which the events should be stored as. Either 'float32' or 'float64'. Some `cait` methods expect 'float32' event datasets. Defaults to 'float32'
         :type dtype: str, optional
+        :param chunks: The chunk shape of the dataset, e.g. `(n_channels, 16, record_length)`. If None and a compression is used, chunks of all channels and samples and about 1 MiB are used. If None and no compression is used, the dataset is stored contiguously. Defaults to None.
+        :type chunks: tuple, optional
+        :param compression: The compression filter of the dataset (see h5py.Group.create_dataset), e.g. 'gzip' or 'lzf'. Defaults to None, i.e. no compression.
+        :type compression: Union[str, int], optional
+        :param compression_opts: Options for the compression filter, e.g. the compression level between 0 and 9 for 'gzip'. Defaults to None, i.e. the default of h5py.
+        :type compression_opts: Any, optional
+        :param shuffle: If True, the bytes of the values are shuffled before the compression, which usually improves the compression ratio. Defaults to False.
+        :type shuffle: bool, optional
+        :param n_threads: The number of threads used to compress chunks (for gzip compression). Defaults to 1.
+        :type n_threads: int, optional
+
+        >>> # Store events in gzip-compressed chunks of 16 events, compressed by 4 threads
+        >>> it = vai.Stream(...).get_event_iterator(..., batch_size=64)
+        >>> dh.include_event_iterator("events", it, chunks=(2, 16, dh.record_length), compression="gzip", shuffle=True, n_threads=4)
         """
         # Check if dataset exists (this function does not support overwriting)
         with self.get_filehandle(mode="r+") as f:
@@ -342,6 +485,8 @@ class DataHandler(SimulateMixin,
         
         if dtype not in ['float32', 'float64']:
             raise TypeError(f"Unsupported dtype '{dtype}'. Choose one of ['float32', 'float64']")
+        if n_threads < 1:
+            raise ValueError(f"'n_threads' has to be a positive integer, got {n_threads}.")
         
         # Cast to correct datatype:
         it = it.with_processing(lambda x: x.astype(dtype))    
@@ -360,26 +505,71 @@ class DataHandler(SimulateMixin,
         # build final shape. len(it) gives number of events in iterator
         target_shape.insert(1, len(it))  # event axis is 1st dim                  
         target_shape = (*target_shape, )
+        n_ch, n_events, n_samples = target_shape
+        itemsize = np.dtype(dtype).itemsize
+
+        # Chunks of all channels and samples with about 1 MiB
+        default_length = int(min(n_events, max(1, 2**20//(n_ch*n_samples*itemsize))))
+        if chunks is None and compression is not None:
+            chunks = (n_ch, default_length, n_samples)
 
         # Write iterator contents
         with self.get_filehandle(mode="r+") as f:
             hdf5group = f.require_group(group)
-            hdf5ds = hdf5group.require_dataset(name='event', shape=target_shape, dtype=np.array(out).dtype)
-
-            ind = 0
-            with it as events:
-                for ev in tqdm(events, total=it.n_batches):
-                    if it.uses_batches:
-                        step = len(ev)
-                        sl = slice(ind, ind+step)
-
-                        if it.n_channels > 1:
-                            ev = np.transpose(ev, axes=[1,0,2])
-                    else:
-                        step, sl = 1, ind
-
-                    hdf5ds[:, sl, :] = ev
-                    ind += step
+            hdf5ds = hdf5group.create_dataset(name='event', shape=target_shape, dtype=dtype, chunks=chunks, 
+                                              compression=compression, compression_opts=compression_opts, 
+                                              shuffle=shuffle)
+            
+            # Blocks which are written at once are aligned with the chunks
+            block_length = hdf5ds.chunks[1] if hdf5ds.chunks is not None else default_length
+
+            # Chunks which span all channels and samples can be gzip-compressed by us (in parallel) 
+            # and written directly, skipping the (single-threaded) filter pipeline of HDF5
+            direct = (compression == "gzip" and hdf5ds.chunks == (n_ch, block_length, n_samples))
+            level = hdf5ds.compression_opts if hdf5ds.compression_opts is not None else 4
+
+            def write_block(start: int, block: np.ndarray):
+                n = min(block_length, n_events - start)
+                if direct:
+                    # Chunks at the end of the dataset are stored with full size
+                    if n < block_length: block[:, n:] = 0
+                    return start, _compress_chunk(block, level, shuffle)
+                else:
+                    hdf5ds[:, start:start+n] = block[:, :n]
+                    return start, None
+            
+            # At most 2*n_threads blocks are kept in memory (besides the one being filled)
+            pending = deque()
+            def flush(max_pending: int):
+                while len(pending) > max_pending:
+                    start, chunk = pending.popleft().result()
+                    if chunk is not None: hdf5ds.id.write_direct_chunk((0, start, 0), chunk)
+
+            with ThreadPoolExecutor(n_threads if direct else 1) as executor:
+                block, block_start, ind = np.empty((n_ch, block_length, n_samples), dtype=dtype), 0, 0
+
+                with it as events:
+                    for ev in tqdm(events, total=it.n_batches):
+                        # Shape (n_events_in_batch, n_channels, n_samples)
+                        ev = np.asarray(ev)
+                        if not it.uses_batches: ev = ev[None]
+                        if it.n_channels == 1: ev = ev[:, None]
+                        
+                        pos = 0
+                        while pos < len(ev):
+                            n = min(len(ev) - pos, block_start + block_length - ind)
+                            block[:, ind-block_start:ind-block_start+n] = np.moveaxis(ev[pos:pos+n], 0, 1)
+                            pos += n
+                            ind += n
+
+                            if ind == block_start + block_length:
+                                pending.append(executor.submit(write_block, block_start, block))
+                                flush(2*n_threads)
+                                block, block_start = np.empty_like(block), ind
+
+                if ind > block_start:
+                    pending.append(executor.submit(write_block, block_start, block))
+                flush(0)
 
         # Include timestamps
         sec = (it.timestamps//1e6).astype(np.int32)
@@ -611,7 +801,7 @@ class DataHandler(SimulateMixin,
         :type repackage: bool
         """
 
-        with h5py.File(self.get_filepath(), 'r+') as h5f:
+        with self.get_filehandle(mode='r+') as h5f:
             if dataset is None:
                 del h5f[group]
                 print(f'Group {fmt_gr(group)} deleted.')
@@ -678,7 +868,7 @@ class DataHandler(SimulateMixin,
         if name_appendix == '' and not delete_old:
             raise KeyError('To keep the old events please choose appropriate name appendix for the new!')
 
-        with h5py.File(self.get_filepath(), 'r+') as h5f:
+        with self.get_filehandle(mode='r+') as h5f:
             if "event" in h5f[type]:
 
                 h5f[type]['event_temp_'] = h5f[type]['event']
@@ -755,7 +945,7 @@ class DataHandler(SimulateMixin,
         if name_appendix == '' and not delete_old:
             raise KeyError('To keep the old events please choose appropriate name appendix for the new!')
 
-        with h5py.File(self.get_filepath(), 'r+') as h5f:
+        with self.get_filehandle(mode='r+') as h5f:
             if "event" in h5f[type]:
                 events = np.array(h5f[type]['event'])
                 if delete_old:
@@ -798,54 +988,194 @@ class DataHandler(SimulateMixin,
         :rtype: numpy array
         """
 
-        # if requested dataset is a virtual dataset, we have to make sure that the original files still 
-        # exist. Otherwise the returned data is nonsensical
-        with self.get_filehandle(mode="r") as f:
-            if dataset in MAINPAR:
-                if dataset == "pulse_height" and 'pulse_height' in f[group]:
-                    available = ds_source_available(f, group, "pulse_height")
-                else: 
-                    available = ds_source_available(f, group, "mainpar")
-            elif dataset in ADD_MAINPAR:
-                available = ds_source_available(f, group, "add_mainpar")
-            else:
-                available = ds_source_available(f, group, dataset)
+        return self.get_many(group, [dataset], idx0, idx1, idx2)[0]
+    
+    def get_many(self, group: str, datasets: List[str],
+                 idx0: Union[int, List[Union[int, bool]]] = None, 
+                 idx1: Union[int, List[Union[int, bool]]] = None, 
+                 idx2: Union[int, List[Union[int, bool]]] = None):
+        """
+        Get multiple datasets from the same group of the HDF5 file at once. Works like :meth:`get` but the file is only opened once and the quantities which are derived from the main parameters (e.g. 'onset', 'rise_time', 'decay_time' and 'slope') are all calculated from a single read of the 'mainpar' dataset (instead of reading it again for each of them). The same holds for quantities taken from the 'add_mainpar' dataset.
+
+        :param group: The name of the group in the HDF5 set.
+        :type group: string
+        :param datasets: The names of the datasets in the HDF5 set. The same special key words as in :meth:`get` can be used.
+        :type datasets: List[str]
+        :param idx0: An index passed to the data sets inside the HDF5 file as the first index (see :meth:`get`).
+        :type idx0: int
+        :param idx1: An index passed to the data sets inside the HDF5 file as the second index (see :meth:`get`).
+        :type idx1: int
+        :param idx2: An index passed to the data sets inside the HDF5 file as the third index (see :meth:`get`).
+        :type idx2: int
+        :return: The datasets from the HDF5 file (in the order of `datasets`)
+        :rtype: List[numpy array]
+
+        >>> ph, onset, rise_time, decay_time = dh.get_many("events", ["pulse_height", "onset", "rise_time", "decay_time"], idx0=0)
+        """
+        if isinstance(datasets, str): datasets = [datasets]
 
-        if not available:
-            raise FileNotFoundError(f"One or more of the source files for the virtual dataset '{dataset}' in group '{group}' are unavailable.")
-        
         # For indices not specified we use all entries along the corresponding axis (equivalent to numpy's [:] operator)
         if idx0 is None: idx0 = slice(None)
         if idx1 is None: idx1 = slice(None)
         if idx2 is None: idx2 = slice(None)
 
         with self.get_filehandle(mode="r") as f:
-            if dataset == 'pulse_height' and 'pulse_height' not in f[group]:
-                data = np.array(f[group]['mainpar'][idx0, idx1, 0])
-            elif dataset == 'onset':
-                data = np.array((f[group]['mainpar'][idx0, idx1, 1] - self.record_length / 4) / self.sample_frequency * 1000)
-            elif dataset == 'rise_time':
-                data = np.array(
-                    (f[group]['mainpar'][idx0, idx1, 2] - f[group]['mainpar'][idx0, idx1, 1]) / self.sample_frequency * 1000)
-            elif dataset == 'decay_time':
-                data = np.array(
-                    (f[group]['mainpar'][idx0, idx1, 6] - f[group]['mainpar'][idx0, idx1, 4]) / self.sample_frequency * 1000)
-            elif dataset == 'slope':
-                data = np.array(f[group]['mainpar'][idx0, idx1, 8] * self.record_length)
-            else:
-                for i, name in enumerate(ADD_MAINPAR):
-                    if dataset == name and name not in f[group]:
-                        data = np.array(f[group]['add_mainpar'][idx0, idx1, i])
-                        break
+            # Determine the dataset in the HDF5 file that each requested dataset is read from
+            sources = []
+            for dataset in datasets:
+                if dataset in MAINPAR and not (dataset == "pulse_height" and "pulse_height" in f[group]):
+                    sources.append("mainpar")
+                elif dataset in ADD_MAINPAR and dataset not in f[group]:
+                    sources.append("add_mainpar")
+                else:
+                    sources.append(dataset)
+
+            # if requested dataset is a virtual dataset, we have to make sure that the original files still 
+            # exist. Otherwise the returned data is nonsensical
+            for dataset, source in zip(datasets, sources):
+                if not ds_source_available(f, group, source):
+                    raise FileNotFoundError(f"One or more of the source files for the virtual dataset '{dataset}' in group '{group}' are unavailable.")
+
+            # Each source dataset is read only once
+            read = dict()
+            for source in dict.fromkeys(sources):
+                data = f[group][source]
+                dim = data.ndim
+                # All columns of the main parameters are read at once (for all quantities derived from them)
+                if source in ["mainpar", "add_mainpar"]: data = data[idx0, idx1]
+                elif dim == 3: data = data[idx0, idx1, idx2]
+                elif dim == 2: data = data[idx0, idx1]
+                elif dim == 1: data = data[idx0]
+
+                read[source] = np.array(data)
+
+        out = []
+        for dataset, source in zip(datasets, sources):
+            data = read[source]
+            if source in ["mainpar", "add_mainpar"] and dataset == source:
+                # The third index was not yet applied (see above)
+                data = np.array(data[..., idx2])
+            elif source == "mainpar":
+                if dataset == 'pulse_height':
+                    data = np.array(data[..., 0])
+                elif dataset == 'onset':
+                    data = (data[..., 1] - self.record_length / 4) / self.sample_frequency * 1000
+                elif dataset == 'rise_time':
+                    data = (data[..., 2] - data[..., 1]) / self.sample_frequency * 1000
+                elif dataset == 'decay_time':
+                    data = (data[..., 6] - data[..., 4]) / self.sample_frequency * 1000
+                elif dataset == 'slope':
+                    data = data[..., 8] * self.record_length
+            elif source == "add_mainpar":
+                data = np.array(data[..., ADD_MAINPAR.index(dataset)])
+            elif datasets.count(dataset) > 1:
+                # Do not return the same array twice
+                data = data.copy()
+
+            out.append(data)
+
+        return out
+
+    def to_feature_table(self, group: str, datasets: List[str], path: str, chunk_size: int = 2**17, compression: str = "zstd"):
+        """
+        Export scalar per-event datasets of a group to a Parquet file (a compressed, column-oriented table with one row per event). Loading (a subset of) the columns from this file, e.g. using :meth:`read_feature_table`, is much faster than reading the datasets from the HDF5 file, especially for files which contain virtual datasets spanning many source files (see :func:`cait.versatile.combine`).
+
+        Datasets are expected to follow the convention of cait, i.e. 1-dimensional datasets have shape `(n_events,)`, 2-dimensional datasets have shape `(n_channels, n_events)` and 3-dimensional datasets have shape `(n_channels, n_events, n_features)`. They are stored in columns `name`, `name_ch{c}` and `name_{i}_ch{c}` respectively. Additionally, the column `event_index` holds the index of the event in the HDF5 file. The special key words of :meth:`get` (e.g. 'pulse_height' or 'rise_time') can be used as dataset names.
+
+        The events are written in row groups of `chunk_size` events. The minimum and maximum values of each column are stored for each row group, such that row groups which cannot match a filter are skipped when loading the table (see :meth:`read_feature_table`).
+
+        :param group: The name of the group in the HDF5 file.
+        :type group: str
+        :param datasets: The names of the datasets to export. All of them must have the same number of events.
+        :type datasets: List[str]
+        :param path: The path of the Parquet file to write. Existing files are overwritten.
+        :type path: str
+        :param chunk_size: The number of events which are read from the HDF5 file and written to the Parquet file at once (this is also the size of the row groups). Defaults to 2**17.
+        :type chunk_size: int, optional
+        :param compression: The compression used for the Parquet file. Defaults to "zstd".
+        :type compression: str, optional
+
+        >>> dh.to_feature_table("events", ["pulse_height", "rise_time", "decay_time", "of_ph", "hours"], "features.parquet")
+        >>> df = ai.DataHandler.read_feature_table("features.parquet", filters=[("pulse_height_ch0", ">", 0.1)])
+        """
+        if pa is None: raise RuntimeError("Install 'pyarrow>=8.0' to use this feature.")
+        if isinstance(datasets, str): datasets = [datasets]
+
+        # Number of dimensions and events of the datasets as returned by self.get_many
+        ndims, n_events = [], set()
+        with self.get_filehandle(mode="r") as f:
+            for name in datasets:
+                if name in MAINPAR and not (name == "pulse_height" and "pulse_height" in f[group]):
+                    source, ndim = f[group]["mainpar"], f[group]["mainpar"].ndim - 1
+                elif name in ADD_MAINPAR and name not in f[group]:
+                    source, ndim = f[group]["add_mainpar"], f[group]["add_mainpar"].ndim - 1
+                elif name in f[group]:
+                    source, ndim = f[group][name], f[group][name].ndim
                 else:
-                    data = f[group][dataset]
-                    dim = data.ndim
-                    if dim == 3: data = data[idx0, idx1, idx2]
-                    elif dim == 2: data = data[idx0, idx1]
-                    elif dim == 1: data = data[idx0]
+                    raise KeyError(f"Dataset '{name}' does not exist in group '{group}'.")
+                
+                if ndim not in [1, 2, 3]:
+                    raise ValueError(f"Only 1-, 2- and 3-dimensional datasets can be exported but '{name}' is {ndim}-dimensional.")
                 
-                    data = np.array(data)
-        return data
+                # The event dimension is the first dimension for 1-dimensional datasets and the second one otherwise
+                ndims.append(ndim)
+                n_events.add(source.shape[0 if ndim == 1 else 1])
+
+        if len(n_events) > 1:
+            raise ValueError(f"All datasets must have the same number of events but found {sorted(n_events)}.")
+        n_events = n_events.pop()
+
+        names_1d = [name for name, ndim in zip(datasets, ndims) if ndim == 1]
+        names_nd = [name for name, ndim in zip(datasets, ndims) if ndim > 1]
+
+        writer = None
+        try:
+            for start in tqdm(range(0, n_events, chunk_size)):
+                inds = slice(start, min(start + chunk_size, n_events))
+
+                columns = {"event_index": np.arange(inds.start, inds.stop)}
+                data = dict(zip(names_1d, self.get_many(group, names_1d, idx0=inds) if names_1d else []))
+                data.update(zip(names_nd, self.get_many(group, names_nd, idx1=inds) if names_nd else []))
+
+                for name in datasets:
+                    x = data[name]
+                    if x.ndim == 1:
+                        columns[name] = x
+                    elif x.ndim == 2:
+                        columns.update({f"{name}_ch{c}": x[c] for c in range(x.shape[0])})
+                    else:
+                        columns.update({f"{name}_{i}_ch{c}": x[c, :, i] for c in range(x.shape[0]) for i in range(x.shape[2])})
+
+                table = pa.table(columns)
+                if writer is None: writer = pq.ParquetWriter(path, table.schema, compression=compression)
+                writer.write_table(table, row_group_size=chunk_size)
+        finally:
+            if writer is not None: writer.close()
+
+    @staticmethod
+    def read_feature_table(path: str, columns: List[str] = None, filters: list = None):
+        """
+        Load a table written by :meth:`to_feature_table` as a pandas DataFrame.
+
+        Only the requested columns are read. If filters are given, row groups whose minimum and maximum values cannot satisfy the filters are skipped without reading them (and the remaining rows are filtered), which makes loading events that pass a cut fast even for very large tables.
+
+        :param path: The path of the Parquet file.
+        :type path: str
+        :param columns: The columns to load. Defaults to None, i.e. all columns are loaded.
+        :type columns: List[str], optional
+        :param filters: Filters for the rows in the format of `pyarrow.parquet.read_table`, e.g. ``[("pulse_height_ch0", ">", 0.1), ("rise_time_ch0", "<", 2)]`` (all conditions have to be met) or a list of such lists (any of them has to be met). Defaults to None, i.e. all rows are loaded.
+        :type filters: list, optional
+
+        :return: The table.
+        :rtype: pandas.DataFrame
+
+        >>> df = ai.DataHandler.read_feature_table("features.parquet", 
+        ...                                        columns=["event_index", "pulse_height_ch0"],
+        ...                                        filters=[("pulse_height_ch0", ">", 0.1)])
+        """
+        if pq is None: raise RuntimeError("Install 'pyarrow>=8.0' to use this feature.")
+
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
 
     def set(self, 
             group: str, 
@@ -1011,7 +1341,7 @@ class DataHandler(SimulateMixin,
         :param group: The name of a group in the HDF5 file of that we print the keys.
         :type group: string or None
         """
-        with h5py.File(self.get_filepath(), 'r+') as f:
+        with self.get_filehandle(mode='r+') as f:
             if group is None:
                 print(list(f.keys()))
             else:
@@ -1073,7 +1403,7 @@ class DataHandler(SimulateMixin,
 
         print('Generating Start Stop Metainfo.')
 
-        with h5py.File(self.get_filepath(), 'r+') as f:
+        with self.get_filehandle(mode='r+') as f:
 
             assert 'testpulses' in f, 'No testpulses in file!'
 
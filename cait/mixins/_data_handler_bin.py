@@ -4,8 +4,8 @@ import numpy as np
 import h5py
 from tqdm.auto import tqdm
 
-from ..trigger._csmpl import align_triggers, sample_to_time, exclude_testpulses
-from ..trigger._bin import get_record_window_vdaq, trigger_bin, read_header
+from ..trigger._csmpl import align_triggers, sample_to_time, exclude_testpulses, _index_batches, _trigger_parallel
+from ..trigger._bin import get_record_windows_vdaq, trigger_bin, read_header, memmap_bin
 
 # -----------------------------------------------------------
 # CLASS
@@ -97,6 +97,7 @@ class BinMixin(object):
                              window: bool = True,
                              overlap: float = None,
                              read_triggerstamps: bool = False,
+                             processes: int = 1,
                              ):
         """
         Trigger the `*.bin` file of a detector module and include them in the HDF5 set.
@@ -136,6 +137,9 @@ class BinMixin(object):
         :param read_triggerstamps: In case there is already a trigger_hours data set in the HDF5 stream group, we can read
             it instead of doing the triggering again. For this, set this argument to True.
         :type read_triggerstamps: bool
+        :param processes: The number of worker processes. If larger than 1, the channels are triggered in parallel
+            before the triggers are aligned.
+        :type processes: int
         """
 
         assert os.path.isfile(path), 'The bin file does not exist!'
@@ -160,28 +164,35 @@ class BinMixin(object):
                     of.imag = h5f['optimumfilter']['optimumfilter_imag']
 
                 # do the triggering
-                time = []
-                for c, k in enumerate(keys):
-                    print('TRIGGER CHANNEL ', k)
-                    # get triggers
-                    trig = trigger_bin(paths=[path],
-                                         dtype=dtype,
-                                         key=k,
-                                         header_size=header_size,
-                                         trigger_tres=thresholds[c],
-                                         bits=adc_bits,
-                                         transfer_function=of[c],
-                                         take_samples=take_samples,
-                                         record_length=self.record_length,
-                                         sample_length=1 / self.sample_frequency,
-                                         start_hours=0,
-                                         trigger_block=trigger_block,
-                                         down=down,
-                                         window=window,
-                                         overlap=overlap,
-                                         )
-
-                    time.append(trig)
+                trigger_kwargs = [dict(paths=[path],
+                                       dtype=dtype,
+                                       key=k,
+                                       header_size=header_size,
+                                       trigger_tres=thresholds[c],
+                                       bits=adc_bits,
+                                       transfer_function=of[c],
+                                       take_samples=take_samples,
+                                       record_length=self.record_length,
+                                       sample_length=1 / self.sample_frequency,
+                                       start_hours=0,
+                                       trigger_block=trigger_block,
+                                       down=down,
+                                       window=window,
+                                       overlap=overlap,
+                                       ) for c, k in enumerate(keys)]
+
+                if processes > 1:
+                    print('TRIGGER CHANNELS {} WITH {} PROCESSES'.format(keys, processes))
+                    length_stream = (os.path.getsize(path) - header_size) // np.dtype(dtype).itemsize
+                    time = _trigger_parallel(trigger_bin, trigger_kwargs,
+                                             total=len(keys) * (length_stream if take_samples < 0 else take_samples),
+                                             processes=processes)
+                else:
+                    time = []
+                    for k, kwargs in zip(keys, trigger_kwargs):
+                        print('TRIGGER CHANNEL ', k)
+                        # get triggers
+                        time.append(trigger_bin(**kwargs))
 
                 # fix the number of triggers
                 if len(keys) > 1:
@@ -250,7 +261,8 @@ class BinMixin(object):
                                       min_tpa=None,
                                       min_cpa=None,
                                       down=1,
-                                      origin=None):
+                                      origin=None,
+                                      batch_size=1000):
         """
         Include the triggered events from the BIN file.
 
@@ -289,6 +301,9 @@ class BinMixin(object):
         :type down: int
         :param origin: The name of the bin file from which we read, e.g. bck_xxx
         :type origin: str
+        :param batch_size: The number of record windows that are read from the stream and written to the HDF5 file
+            at once.
+        :type batch_size: int
         """
 
         if min_tpa is None:
@@ -401,12 +416,14 @@ class BinMixin(object):
                     iterable = range(len(trigger_hours))
                 else:
                     iterable = np.array([st.decode() == origin for st in h5f['events']['origin'][:]]).nonzero()[0]
-                for i in tqdm(iterable):
-                    write_events['event'][c, i, :], _ = get_record_window_vdaq(path=path,
-                                                                               start_time=trigger_hours[
-                                                                                              i] * 3600 - sample_to_time(
+                channel_stream = memmap_bin(path, dtype, header_size)[keys[c]]
+                for sel, inds in tqdm(list(_index_batches(iterable, batch_size))):
+                    write_events['event'][c, sel, :] = get_record_windows_vdaq(path=path,
+                                                                               start_times=trigger_hours[
+                                                                                               inds] * 3600 - sample_to_time(
                                                                                    self.record_length / 4,
                                                                                    sample_duration=sample_duration),
+                                                                               stream=channel_stream,
                                                                                record_length=self.record_length,
                                                                                sample_duration=sample_duration,
                                                                                dtype=dtype,
@@ -443,11 +460,13 @@ class BinMixin(object):
                     else:
                         iterable = np.array([st.decode() == origin for st in h5f['testpulses']['origin'][:]]).nonzero()[
                             0]
-                    for i in tqdm(range(len(iterable))):
-                        tp_ev[c, i, :], _ = get_record_window_vdaq(path=path,
-                                                                   start_time=this_hours[i] * 3600 - sample_to_time(
+                    channel_stream = memmap_bin(path, dtype, header_size)[keys[c]]
+                    for sel, inds in tqdm(list(_index_batches(range(len(iterable)), batch_size))):
+                        tp_ev[c, sel, :] = get_record_windows_vdaq(path=path,
+                                                                   start_times=this_hours[inds] * 3600 - sample_to_time(
                                                                        self.record_length / 4,
                                                                        sample_duration=sample_duration),
+                                                                   stream=channel_stream,
                                                                    record_length=self.record_length,
                                                                    sample_duration=sample_duration,
                                                                    dtype=dtype,
@@ -468,11 +487,13 @@ class BinMixin(object):
                     for c in range(self.nmbr_channels):
 
                         print('Channel ', c)
-                        for i in tqdm(range(len(this_hours))):
-                            cp_array, _ = get_record_window_vdaq(path=path,
-                                                                 start_time=this_hours[i] * 3600 - sample_to_time(
+                        channel_stream = memmap_bin(path, dtype, header_size)[keys[c]]
+                        for sel, inds in tqdm(list(_index_batches(range(len(this_hours)), batch_size))):
+                            cp_array = get_record_windows_vdaq(path=path,
+                                                                 start_times=this_hours[inds] * 3600 - sample_to_time(
                                                                      self.record_length / 4,
                                                                      sample_duration=sample_duration),
+                                                                 stream=channel_stream,
                                                                  record_length=self.record_length,
                                                                  sample_duration=sample_duration,
                                                                  dtype=dtype,
@@ -482,10 +503,10 @@ class BinMixin(object):
                                                                  down=down)
 
                             # subtract offset
-                            cp_array -= np.mean(cp_array[:int(len(cp_array) / 8)])
+                            cp_array -= np.mean(cp_array[:, :int(cp_array.shape[1] / 8)], axis=1, keepdims=True)
 
                             # write the heights to file
-                            cphs[c, ...] = np.max(cp_array)
+                            cphs[c, sel] = np.max(cp_array, axis=1)
 
             print('DONE')
 
@@ -663,6 +684,7 @@ class BinMixin(object):
                                   datatype='float32',
                                   origin=None,
                                   down=1,
+                                  batch_size=1000,
                                   ):
         """
         Include the events corresponding to chosen noise triggers from the `*.bin` file.
@@ -686,6 +708,9 @@ class BinMixin(object):
         :type origin: string
         :param down: The factor by which we want to downsample the included events.
         :type down: int
+        :param batch_size: The number of record windows that are read from the stream and written to the HDF5 file
+            at once.
+        :type batch_size: int
         """
 
         with h5py.File(self.path_h5, 'r+') as h5f:
@@ -728,12 +753,14 @@ class BinMixin(object):
                     iterable = range(nmbr_all_events)
                 else:
                     iterable = np.array([st.decode() == origin for st in noise['origin'][:]]).nonzero()[0]
-                for i in tqdm(iterable):
-                    noise['event'][c, i, :], _ = get_record_window_vdaq(path=path,
-                                                                        start_time=noise_hours[
-                                                                                       i] * 3600 - sample_to_time(
+                channel_stream = memmap_bin(path, dtype, header_size)[keys[c]]
+                for sel, inds in tqdm(list(_index_batches(iterable, batch_size))):
+                    noise['event'][c, sel, :] = get_record_windows_vdaq(path=path,
+                                                                        start_times=noise_hours[
+                                                                                        inds] * 3600 - sample_to_time(
                                                                             self.record_length / 4,
                                                                             sample_duration=1 / self.sample_frequency),
+                                                                        stream=channel_stream,
                                                                         record_length=self.record_length,
                                                                         sample_duration=1 / self.sample_frequency,
                                                                         dtype=dtype,
@@ -5,8 +5,8 @@ import h5py
 from tqdm.auto import tqdm
 
 from ..features._mp import calc_main_parameters
-from ..trigger._csmpl import trigger_csmpl, get_record_window, align_triggers, sample_to_time, \
-    exclude_testpulses, get_starttime, get_test_stamps, get_offset
+from ..trigger._csmpl import trigger_csmpl, get_record_windows, readcs, align_triggers, sample_to_time, \
+    exclude_testpulses, get_starttime, get_test_stamps, get_offset, _index_batches, _trigger_parallel
 from ..fit._pm_fit import fit_pulse_shape
 from ..fit._templates import pulse_template
 
@@ -140,6 +140,7 @@ class CsmplMixin(object):
                                window: bool = True,
                                overlap: float = None,
                                read_triggerstamps: bool = False,
+                               processes: int = 1,
                                ):
         """
         Trigger `*.csmpl` files of a detector module and include them in the HDF5 set.
@@ -195,6 +196,9 @@ class CsmplMixin(object):
         :param read_triggerstamps: In case there is already a trigger_hours data set in the HDF5 stream group, we can read
             it instead of doing the triggering again. For this, set this argument to True.
         :type read_triggerstamps: bool
+        :param processes: The number of worker processes. If larger than 1, the channels are triggered in parallel
+            before the triggers are aligned.
+        :type processes: int
         """
 
         assert all([os.path.isfile(p) for p in csmpl_paths]), 'One of the csmpl files does not exists!'
@@ -228,24 +232,31 @@ class CsmplMixin(object):
                     of.imag = h5f['optimumfilter']['optimumfilter_imag']
 
                 # do the triggering
-                time = []
-                for c in range(len(csmpl_paths)):
-                    print('TRIGGER CHANNEL ', c)
-                    # get triggers
-                    trig = trigger_csmpl(paths=[csmpl_paths[c]],
-                                         trigger_tres=thresholds[c],
-                                         transfer_function=of[c],
-                                         take_samples=take_samples,
-                                         record_length=self.record_length,
-                                         sample_length=1 / self.sample_frequency,
-                                         start_hours=0,
-                                         trigger_block=trigger_block,
-                                         down=down,
-                                         window=window,
-                                         overlap=overlap,
-                                         )
-
-                    time.append(trig)
+                trigger_kwargs = [dict(paths=[csmpl_paths[c]],
+                                       trigger_tres=thresholds[c],
+                                       transfer_function=of[c],
+                                       take_samples=take_samples,
+                                       record_length=self.record_length,
+                                       sample_length=1 / self.sample_frequency,
+                                       start_hours=0,
+                                       trigger_block=trigger_block,
+                                       down=down,
+                                       window=window,
+                                       overlap=overlap,
+                                       ) for c in range(len(csmpl_paths))]
+
+                if processes > 1:
+                    print('TRIGGER {} CHANNELS WITH {} PROCESSES'.format(len(csmpl_paths), processes))
+                    time = _trigger_parallel(trigger_csmpl, trigger_kwargs,
+                                             total=sum(os.path.getsize(p) // 2 if take_samples < 0 else take_samples
+                                                       for p in csmpl_paths),
+                                             processes=processes)
+                else:
+                    time = []
+                    for c, kwargs in enumerate(trigger_kwargs):
+                        print('TRIGGER CHANNEL ', c)
+                        # get triggers
+                        time.append(trigger_csmpl(**kwargs))
 
                 # fix the number of triggers
                 if len(csmpl_paths) > 1:
@@ -476,7 +487,8 @@ class CsmplMixin(object):
                                  down=1,
                                  noninteractive=True,
                                  origin=None,
-                                 individual_tpas=False,):
+                                 individual_tpas=False,
+                                 batch_size=1000,):
         """
         Include the triggered events from the CSMPL files.
 
@@ -510,6 +522,9 @@ class CsmplMixin(object):
         :param individual_tpas: Write individual TPAs for the all channels. This results in a testpulseamplitude dataset
             of shape (nmbr_channels, nmbr_testpulses). Otherwise we have (nmbr_testpulses).
         :type individual_tpas: bool
+        :param batch_size: The number of record windows that are read from the stream and written to the HDF5 file
+            at once.
+        :type batch_size: int
         """
 
         if sample_duration is None:
@@ -624,12 +639,14 @@ class CsmplMixin(object):
                     iterable = range(len(trigger_hours))
                 else:
                     iterable = np.array([st.decode() == origin for st in h5f['events']['origin'][:]]).nonzero()[0]
-                for i in tqdm(iterable):
-                    write_events['event'][c, i, :], _ = get_record_window(path=csmpl_paths[c],
-                                                                          start_time=trigger_hours[
-                                                                                         i] * 3600 - sample_to_time(
+                channel_stream = readcs(csmpl_paths[c])
+                for sel, inds in tqdm(list(_index_batches(iterable, batch_size))):
+                    write_events['event'][c, sel, :] = get_record_windows(path=csmpl_paths[c],
+                                                                          start_times=trigger_hours[
+                                                                                          inds] * 3600 - sample_to_time(
                                                                               self.record_length / 4,
                                                                               sample_duration=sample_duration),
+                                                                          stream=channel_stream,
                                                                           record_length=self.record_length,
                                                                           sample_duration=sample_duration,
                                                                           down=down)
@@ -662,11 +679,13 @@ class CsmplMixin(object):
                     else:
                         iterable = np.array([st.decode() == origin for st in h5f['testpulses']['origin'][:]]).nonzero()[
                             0]
-                    for i in tqdm(range(len(iterable))):
-                        tp_ev[c, i, :], _ = get_record_window(path=csmpl_paths[c],
-                                                              start_time=this_hours[i] * 3600 - sample_to_time(
+                    channel_stream = readcs(csmpl_paths[c])
+                    for sel, inds in tqdm(list(_index_batches(range(len(iterable)), batch_size))):
+                        tp_ev[c, sel, :] = get_record_windows(path=csmpl_paths[c],
+                                                              start_times=this_hours[inds] * 3600 - sample_to_time(
                                                                   self.record_length / 4,
                                                                   sample_duration=sample_duration),
+                                                              stream=channel_stream,
                                                               record_length=self.record_length,
                                                               sample_duration=sample_duration,
                                                               down=down)
@@ -683,19 +702,21 @@ class CsmplMixin(object):
                     for c in range(self.nmbr_channels):
 
                         print('Channel ', c)
-                        for i in tqdm(range(len(this_hours))):
-                            cp_array, _ = get_record_window(path=csmpl_paths[c],
-                                                            start_time=this_hours[i] * 3600 - sample_to_time(
-                                                                self.record_length / 4,
-                                                                sample_duration=sample_duration),
-                                                            record_length=self.record_length,
-                                                            sample_duration=sample_duration)
+                        channel_stream = readcs(csmpl_paths[c])
+                        for sel, inds in tqdm(list(_index_batches(range(len(this_hours)), batch_size))):
+                            cp_array = get_record_windows(path=csmpl_paths[c],
+                                                          start_times=this_hours[inds] * 3600 - sample_to_time(
+                                                              self.record_length / 4,
+                                                              sample_duration=sample_duration),
+                                                          stream=channel_stream,
+                                                          record_length=self.record_length,
+                                                          sample_duration=sample_duration)
 
                             # subtract offset
-                            cp_array -= np.mean(cp_array[:int(len(cp_array) / 8)])
+                            cp_array -= np.mean(cp_array[:, :int(cp_array.shape[1] / 8)], axis=1, keepdims=True)
 
                             # write the heights to file
-                            cphs[c, i] = np.max(cp_array)
+                            cphs[c, sel] = np.max(cp_array, axis=1)
 
             print('DONE')
 
@@ -931,6 +952,7 @@ class CsmplMixin(object):
                              datatype='float32',
                              origin=None,
                              down=1,
+                             batch_size=1000,
                              ):
         """
         Include the events corresponding to chosen noise triggers.
@@ -947,6 +969,9 @@ class CsmplMixin(object):
         :type origin: string
         :param down: The factor by which we want to downsample the included events.
         :type down: int
+        :param batch_size: The number of record windows that are read from the stream and written to the HDF5 file
+            at once.
+        :type batch_size: int
         """
 
         with h5py.File(self.path_h5, 'r+') as h5f:
@@ -991,12 +1016,14 @@ class CsmplMixin(object):
                     iterable = range(nmbr_all_events)
                 else:
                     iterable = np.array([st.decode() == origin for st in noise['origin'][:]]).nonzero()[0]
-                for i in tqdm(iterable):
-                    noise['event'][c, i, :], _ = get_record_window(path=csmpl_paths[c],
-                                                                   start_time=noise_hours[
-                                                                                  i] * 3600 - sample_to_time(
+                channel_stream = readcs(csmpl_paths[c])
+                for sel, inds in tqdm(list(_index_batches(iterable, batch_size))):
+                    noise['event'][c, sel, :] = get_record_windows(path=csmpl_paths[c],
+                                                                   start_times=noise_hours[
+                                                                                   inds] * 3600 - sample_to_time(
                                                                        self.record_length / 4,
                                                                        sample_duration=1 / self.sample_frequency),
+                                                                   stream=channel_stream,
                                                                    record_length=self.record_length,
                                                                    sample_duration=1 / self.sample_frequency,
                                                                    down=down)
@@ -55,7 +55,7 @@ class FeaturesMixin(object):
         if not path_h5:
             path_h5 = self.path_h5
 
-        with h5py.File(path_h5, 'r+') as h5f:
+        with self.get_filehandle(path=path_h5, mode='r+') as h5f:
             events = h5f[type]
             nmbr_ev = events['event'].shape[1]
 
@@ -209,7 +209,7 @@ class FeaturesMixin(object):
         if t0_start is None:
             t0_start = [-3 for i in range(self.nmbr_channels)]
 
-        with h5py.File(self.path_h5, 'r+') as h5f:
+        with self.get_filehandle(mode='r+') as h5f:
             events = h5f[type]['event']
             mainpar = h5f[type]['mainpar']
 
@@ -365,7 +365,7 @@ class FeaturesMixin(object):
         :type use_this_sev: list
         """
 
-        with h5py.File(self.path_h5, 'r+') as h5f:
+        with self.get_filehandle(mode='r+') as h5f:
             if use_this_sev is None:
                 stdevent_pulse = np.array([h5f['stdevent' + name_appendix]['event'][i]
                                            for i in range(self.nmbr_channels)])
@@ -461,7 +461,7 @@ class FeaturesMixin(object):
         assert len(onset_to_dominant_channel) == self.nmbr_channels, \
             'onset_to_dominant_channel must have length nmbr_channels!'
 
-        with h5py.File(self.path_h5, 'r+') as f:
+        with self.get_filehandle(mode='r+') as f:
             events = f[type]['event']
             sev = np.array(f['stdevent' + name_appendix_group]['event'])
             nps = np.array(f['noise']['nps'])
@@ -661,7 +661,7 @@ class FeaturesMixin(object):
         if sample_length is None:
             sample_length = 1000 / self.sample_frequency
 
-        with h5py.File(self.path_h5, 'r+') as h5f:
+        with self.get_filehandle(mode='r+') as h5f:
 
             if correct_label is None and use_idx is None:
                 raise KeyError('Provide either Correct Label or Index List!')
@@ -769,7 +769,7 @@ class FeaturesMixin(object):
             rms_cutoff = [None for c in range(self.nmbr_channels)]
 
         # open file
-        with h5py.File(self.path_h5, 'r+') as h5f:
+        with self.get_filehandle(mode='r+') as h5f:
             baselines = np.array(h5f['noise']['event'])
 
             mean_nps = []
@@ -841,7 +841,7 @@ class FeaturesMixin(object):
         if not path_h5:
             path_h5 = self.path_h5
 
-        with h5py.File(path_h5, 'r+') as h5f:
+        with self.get_filehandle(path=path_h5, mode='r+') as h5f:
             events = h5f[type]
 
             assert 'optimumfilter' in h5f or no_of, 'You need to calculate the optimal filter first, or activate no_of!'
@@ -904,7 +904,7 @@ class FeaturesMixin(object):
         :type delete_old: bool
         """
 
-        with h5py.File(self.path_h5, 'r+') as f:
+        with self.get_filehandle(mode='r+') as f:
 
             if delete_old:
                 if naming in f[type]:
@@ -942,7 +942,7 @@ class FeaturesMixin(object):
         :type delete_old: bool
         """
 
-        with h5py.File(self.path_h5, 'r+') as f:
+        with self.get_filehandle(mode='r+') as f:
 
             if delete_old:
                 if naming in f[type]:
@@ -984,7 +984,7 @@ class FeaturesMixin(object):
         >>> dh_stream.calc_ph_correlated()
         """
 
-        with h5py.File(self.path_h5, 'r+') as f:
+        with self.get_filehandle(mode='r+') as f:
             print('CALCULATE CORRELATED PULSE HEIGHTS.')
 
             nmbr_events = f[type]['event'].shape[1]
@@ -1022,7 +1022,7 @@ class FeaturesMixin(object):
         :type look_ahead: int
         """
 
-        with h5py.File(self.path_h5, 'r+') as f:
+        with self.get_filehandle(mode='r+') as f:
 
             print('CALCULATE NUMBER OF PEAKS.')
             nmbr_events = f[type]['event'].shape[1]
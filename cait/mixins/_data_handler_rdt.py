@@ -263,6 +263,7 @@ class RdtMixin(object):
                         batch_size=1000,
                         trace=False,
                         indiv_tpas=False,
+                        calc_add_mp=False,
                         ):
         """
         Wrapper for the gen_dataset_from_rdt function, creates HDF5 dataset from Rdt file.
@@ -304,6 +305,9 @@ class RdtMixin(object):
         :param individual_tpas: Write individual TPAs for the all channels. This results in a testpulseamplitude dataset
             of shape (nmbr_channels, nmbr_testpulses). Otherwise we have (nmbr_testpulses).
         :type individual_tpas: bool
+        :param calc_add_mp: If True the additional main parameters for all events are calculated and stored (without
+            the optimum filter, i.e. the filtered quantities are filled with zeros). Only available with memsafe.
+        :type calc_add_mp: bool
         """
 
         assert self.channels is not None, 'To use this function, you need to specify the channel numbers either in the ' \
@@ -313,6 +317,9 @@ class RdtMixin(object):
 
         if not memsafe:
             warnings.warn('Consider using the memsafe option! From the next release, it will be activated by default.')
+            if calc_add_mp:
+                warnings.warn('Only the memsafe implementation provides on-the-fly additional main parameter '
+                              'calculation. Please call the calc_additional_mp method instead.')
 
             if trace:
                 tracemalloc.start()
@@ -340,9 +347,6 @@ class RdtMixin(object):
                 print(f"Current memory usage is {current / 10 ** 6}MB; Peak was {peak / 10 ** 6}MB")
                 tracemalloc.stop()
         else:
-            if calc_mp:
-                warnings.warn('Memsafe implementation does not privide on-the-fly main paramter calculation. '
-                              'Please call the calc_mp method instead.')
             if calc_fit:
                 warnings.warn('Memsafe implementation does not privide on-the-fly parametric fit calculation. '
                               'Please call the calc_parametric_fit method instead.')
@@ -365,6 +369,9 @@ class RdtMixin(object):
                                          batch_size=batch_size,
                                          trace=trace,
                                          indiv_tpas=indiv_tpas,
+                                         calc_mp=calc_mp,
+                                         calc_add_mp=calc_add_mp,
+                                         processes=processes,
                                          )
 
         print('Hdf5 dataset created in  {}'.format(path_h5))
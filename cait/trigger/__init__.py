@@ -9,11 +9,14 @@ __all__=['MovingAverageTrigger',
          'time_to_sample',
          'sample_to_time',
          'get_record_window',
+         'get_record_windows',
          'plot_csmpl',
          'get_starttime',
          'find_nearest',
          'exclude_testpulses',
          'get_record_window_vdaq',
+         'get_record_windows_vdaq',
+         'memmap_bin',
          'get_triggers',
          'find_peaks',
          'add_to_moments',
@@ -1,8 +1,11 @@
+import os
+from contextlib import nullcontext
+
 import numpy as np
 from tqdm.auto import tqdm
 
 from ..data._raw import convert_to_V
-from ._csmpl import time_to_sample, get_max_index, sample_to_time
+from ._csmpl import time_to_sample, sample_to_time, _gather_windows, _finish_windows, _trigger_stream
 
 # functions
 
@@ -69,6 +72,81 @@ def get_record_window_vdaq(path,
     return event, time
 
 
+def memmap_bin(path, dtype, header_size):
+    """
+    Memory map the data of a stream `*.bin` file.
+
+    :param path: The full path of the `*.bin` file.
+    :type path: str
+    :param dtype: The data type with which we read the `*.bin` file.
+    :type dtype: numpy data type
+    :param header_size: The size of the file header of the bin file, in bytes.
+    :type header_size: int
+    :return: The memory mapped samples of all channels.
+    :rtype: 1D structured array
+    """
+    nmbr_samples = (os.path.getsize(path) - header_size) // np.dtype(dtype).itemsize
+    return np.memmap(path, dtype=dtype, mode='r', offset=header_size, shape=(nmbr_samples,))
+
+
+def get_record_windows_vdaq(path,
+                            start_times,  # in s
+                            record_length,
+                            dtype,
+                            key,
+                            header_size,
+                            sample_duration=0.00004,
+                            down=1,
+                            bits=16,
+                            vswing=39.3216,
+                            stream=None,
+                            ):
+    """
+    Get many record windows from a stream `*.bin` file at once.
+
+    The file is memory mapped once (or the given memory mapped channel is used) and the windows are copied in order of
+    their position in the file. The result is identical to calling `get_record_window_vdaq` for each start time.
+
+    :param path: The full path of the `*.bin` file.
+    :type path: str
+    :param start_times: The start times in seconds, from where we want to read the record windows, starting with 0 at
+        the beginning of the file.
+    :type start_times: 1D array
+    :param record_length: The record length to read from the bin file.
+    :type record_length: int
+    :param dtype: The data type with which we read the `*.bin` file.
+    :type dtype: numpy data type
+    :param key: The key of the dtype, corresponding to the channel that we want to read.
+    :type key: str
+    :param header_size: The size of the file header of the bin file, in bytes.
+    :type header_size: int
+    :param sample_duration: The duration of a sample, in seconds.
+    :type sample_duration: float
+    :param down: A factor by which the events are downsampled before they are returned.
+    :type down: int
+    :param bits: The precision of the digitizer.
+    :type bits: int
+    :param vswing: The total volt region covered by the ADC.
+    :type vswing: float
+    :param stream: The channel key of the memory mapped file, as returned by `memmap_bin(path, dtype, header_size)[key]`.
+        If many batches of windows are read from the same file, it can be opened once and passed for all of them. If
+        None, the file is memory mapped in this call.
+    :type stream: 1D array
+    :return: The record windows read from the `*.bin` file, shape (len(start_times), record_length/down).
+    :rtype: 2D array
+    """
+
+    start_times = np.asarray(start_times, dtype=float).reshape(-1)
+    if stream is None:
+        stream = memmap_bin(path, dtype, header_size)[key]
+
+    windows, lengths = _gather_windows(stream,
+                                       time_to_sample(start_times, sample_duration=sample_duration),
+                                       record_length)
+
+    return _finish_windows(convert_to_V(windows, bits=bits, max=vswing / 2, min=-vswing / 2), lengths, down)
+
+
 def bin(s, nmbr_bits=None):
     """
     Returns a string of 0/1 values for any datatype.
@@ -198,6 +276,8 @@ def trigger_bin(paths,
                 down=1,
                 window=True,
                 square=False,
+                batch_size=64,
+                progress=None,
                 ):
     """
     Trigger a number of BIN files in one channel and return the time stamps of all triggers.
@@ -241,6 +321,11 @@ def trigger_bin(paths,
     :type window: bool
     :param square: Square the stream values before triggering, this needs to be done for DAC channels.
     :type square: bool
+    :param batch_size: The number of consecutive record windows that are filtered at once.
+    :type batch_size: int
+    :param progress: An object with an update method, which receives the number of processed samples. If None, a
+        progress bar is shown for each file.
+    :type progress: object
     :return: The hours time stamps of all triggers.
     :rtype: 1D array
     """
@@ -274,61 +359,30 @@ def trigger_bin(paths,
         # TRIGGER ALGO
         # ---------------------------------------------------------------
 
-        with tqdm(total=take_samples - record_length) as pbar:
+        with tqdm(total=take_samples - record_length) if progress is None else nullcontext(progress) as pbar:
             pbar.update(record_length)
-            counter = np.copy(record_length)
-            block = 0
-            while counter < take_samples - record_length:
-                pbar.update(record_length - 2 * overlap)
-                if block >= record_length - overlap:
-                    block -= record_length - 2 * overlap
-                    counter += record_length - 2 * overlap
-                else:
-                    trig, height = get_max_index(stream=stream,  # memmap array
-                                                 counter=counter,  # in samples
-                                                 record_length=record_length,
-                                                 overlap=overlap,  # in samples
-                                                 block=block,  # in samples
-                                                 transfer_function=transfer_function,
-                                                 down=down,
-                                                 window=window,
-                                                 bits=bits,
-                                                 max=20,
-                                                 min=-20,
-                                                 square=square,
-                                                 )
-                    if height > trigger_tres:
-                        # resample in case higher trigger is in record window
-                        counter += (trig - overlap) - 1
-                        if counter > take_samples - record_length: #check if new record window would end outside sample
-                            continue
-                        pbar.update((trig - overlap) - 1)
-                        trig, height = get_max_index(stream=stream,  # memmap array
-                                                     counter=counter,  # in samples
-                                                     record_length=record_length,
-                                                     overlap=overlap,  # in samples
-                                                     block=block,  # in samples
-                                                     transfer_function=transfer_function,
-                                                     down=down,
-                                                     window=window,
-                                                     bits=bits,
-                                                     max=20,
-                                                     min=-20,
-                                                     square=square,
-                                                     )
-                        if height > trigger_tres:
-                            triggers.append(start_hours + sample_to_time(counter + trig, sample_duration=sample_length))
-                            trigger_heights.append(height)
-                            record_starts.append(start_hours + sample_to_time(counter, sample_duration=sample_length))
-                            blocks.append(block)
-
-                            block += trig + trigger_block
-
-                    # increment
-                    counter += record_length - 2 * overlap
-                    block -= record_length - 2 * overlap
-                    if block < 0:
-                        block = 0
+            trig, height, starts, block = _trigger_stream(stream=stream,
+                                                          trigger_tres=trigger_tres,
+                                                          record_length=record_length,
+                                                          overlap=overlap,
+                                                          take_samples=take_samples,
+                                                          trigger_block=trigger_block,
+                                                          pbar=pbar,
+                                                          batch_size=batch_size,
+                                                          transfer_function=transfer_function,
+                                                          down=down,
+                                                          window=window,
+                                                          bits=bits,
+                                                          max=20,
+                                                          min=-20,
+                                                          square=square,
+                                                          )
+        triggers.extend(start_hours + sample_to_time(np.array(trig, dtype=float), sample_duration=sample_length))
+        trigger_heights.extend(height)
+        record_starts.extend(start_hours + sample_to_time(np.array(starts, dtype=float),
+                                                          sample_duration=sample_length))
+        blocks.extend(block)
+
         # increment
         start_hours += (length_stream - 1) * sample_length
     print('#######################################')
@@ -1,14 +1,17 @@
 import sqlite3
-from time import strptime, mktime
+from contextlib import nullcontext
+from multiprocessing import get_context
+from time import strptime, mktime, monotonic
+from queue import Empty
 
 import numpy as np
 import numba as nb
+from numpy.fft import rfft, irfft
 from scipy import signal
 from tqdm.auto import tqdm
 import matplotlib.pyplot as plt
 
 from ..data._raw import convert_to_V
-from ..filter._of import filter_event
 from ..styles import use_cait_style, make_grid
 
 # functions
@@ -122,27 +125,89 @@ def get_max_index(stream,  # memmap array
     :rtype: 2-tuple (int, float)
     """
 
-    # get record window
-    record = stream[counter:counter + record_length]
+    filtered_record = _filter_windows(stream=stream,
+                                      starts=[counter],
+                                      record_length=record_length,
+                                      overlap=overlap,
+                                      transfer_function=transfer_function,
+                                      down=down,
+                                      window=window,
+                                      bits=bits,
+                                      max=max,
+                                      min=min,
+                                      square=square)[0]
+
+    return _max_index(filtered_record, overlap=overlap, block=block, down=down)
+
+
+def _filter_windows(stream,
+                    starts,  # in samples
+                    record_length,
+                    overlap,  # in samples
+                    transfer_function,
+                    down=1,
+                    window=True,
+                    bits=16,
+                    max=10,
+                    min=-10,
+                    square=False,
+                    ):
+    """
+    Filter several record windows from the stream array at once, the same way as in `get_max_index`.
+
+    :param stream: The stream array.
+    :type stream: 1D array
+    :param starts: The first samples of the record windows within the stream.
+    :type starts: 1D array
+    :return: The filtered record windows, downsampled by the factor down.
+    :rtype: 2D array
+
+    All other parameters are the same as in `get_max_index`.
+    """
+
+    # get record windows
+    records = np.stack([stream[s:s + record_length] for s in starts])
 
     # downsample
     if down > 1:
-        record = np.mean(record.reshape((int(len(record) / down), down)), axis=1)
+        records = np.mean(records.reshape((len(records), int(record_length / down), down)), axis=2)
         overlap = int(overlap / down)
-        block = int(block / down)
-    record = convert_to_V(record, bits=bits, max=max, min=min)
+    records = convert_to_V(records, bits=bits, max=max, min=min)
 
     # square the value in case its a DAC
     if square:
-        record **= 2
+        records **= 2
 
     # remove offset
-    record -= np.mean(record[:int(overlap / 2)])
-    # filter record window
+    records -= np.mean(records[:, :int(overlap / 2)], axis=1, keepdims=True)
+
+    # filter record windows
     if transfer_function is None:
-        filtered_record = signal.medfilt(record, 51)
-    else:
-        filtered_record = filter_event(record, transfer_function=transfer_function, window=window)
+        return signal.medfilt(records, (1, 51))
+    if window:
+        records *= signal.windows.tukey(records.shape[1], alpha=0.25)
+    return irfft(rfft(records, axis=1) * transfer_function, axis=1)
+
+
+def _max_index(filtered_record, overlap, block, down=1):
+    """
+    Find the maximum of a filtered record window outside of the overlap and the trigger block.
+
+    :param filtered_record: The filtered record window, downsampled by the factor down.
+    :type filtered_record: 1D array
+    :param overlap: The number of samples that overlap between two record windows, in original samples.
+    :type overlap: int
+    :param block: The trigger block value, in original samples.
+    :type block: int
+    :param down: The factor by which the record window was downsampled.
+    :type down: int
+    :return: (the trigger index inside the record window, the height of the triggered value)
+    :rtype: 2-tuple (int, float)
+    """
+
+    if down > 1:
+        overlap = int(overlap / down)
+        block = int(block / down)
 
     # get max
     if block > overlap:
@@ -160,6 +225,92 @@ def get_max_index(stream,  # memmap array
     return int(trig), h
 
 
+def _trigger_stream(stream,
+                    trigger_tres,
+                    record_length,
+                    overlap,
+                    take_samples,
+                    trigger_block,
+                    pbar,
+                    batch_size=64,
+                    **kwargs):
+    """
+    Run the trigger algorithm of `trigger_csmpl` on a single stream array.
+
+    Consecutive record windows are filtered in batches of up to batch_size. A batch is only invalidated when a trigger
+    moves the record window off the regular grid, such that the triggers are identical to filtering one window at a
+    time. After that, the batches grow again starting from a single window.
+
+    :param stream: The stream array.
+    :type stream: 1D array
+    :param pbar: The progress bar that is updated with the processed samples.
+    :type pbar: tqdm progress bar
+    :param batch_size: The number of consecutive record windows that are filtered at once.
+    :type batch_size: int
+    :param kwargs: Keyword arguments passed on to `_filter_windows`, i.e. transfer_function, down, window, bits, max,
+        min and square.
+    :type kwargs: dict
+    :return: (the trigger sample indices, the trigger heights, the start samples of the record windows, the trigger
+        block values of the individual trigger windows)
+    :rtype: 4-tuple of lists
+    """
+
+    step = record_length - 2 * overlap
+    last = take_samples - record_length
+    batch_start, batch, size = 0, None, 1
+
+    def filtered_window(counter):
+        # The batch size starts at one after a trigger moved the counter off the grid and doubles (up to batch_size)
+        # whenever a batch was used up, such that at most about twice as many windows are filtered as one by one
+        nonlocal batch_start, batch, size
+        k, r = divmod(counter - batch_start, step)
+        if batch is None or r != 0 or not 0 <= k < len(batch):
+            size = min(2 * size, batch_size) if batch is not None and r == 0 and k >= len(batch) else 1
+            n = int(np.clip(np.ceil((last - counter) / step), 1, size))
+            batch_start, k = counter, 0
+            batch = _filter_windows(stream=stream,
+                                    starts=counter + step * np.arange(n),
+                                    record_length=record_length,
+                                    overlap=overlap,
+                                    **kwargs)
+        return batch[k]
+
+    down = kwargs.get('down', 1)
+    triggers, trigger_heights, record_starts, blocks = [], [], [], []
+
+    counter = int(record_length)
+    block = 0
+    while counter < last:
+        pbar.update(step)
+        if block >= record_length - overlap:
+            block -= step
+            counter += step
+        else:
+            trig, height = _max_index(filtered_window(counter), overlap=overlap, block=block, down=down)
+            if height > trigger_tres:
+                # resample in case higher trigger is in record window
+                counter += (trig - overlap) - 1
+                if counter > last:  # check if new record window would end outside sample
+                    continue
+                pbar.update((trig - overlap) - 1)
+                trig, height = _max_index(filtered_window(counter), overlap=overlap, block=block, down=down)
+                if height > trigger_tres:
+                    triggers.append(counter + trig)
+                    trigger_heights.append(height)
+                    record_starts.append(counter)
+                    blocks.append(block)
+
+                    block += trig + trigger_block
+
+            # increment
+            counter += step
+            block -= step
+            if block < 0:
+                block = 0
+
+    return triggers, trigger_heights, record_starts, blocks
+
+
 def trigger_csmpl(paths,
                   trigger_tres,
                   transfer_function=None,
@@ -172,6 +323,8 @@ def trigger_csmpl(paths,
                   return_info=False,
                   down=1,
                   window=True,
+                  batch_size=64,
+                  progress=None,
                   ):
     """
     Trigger a number of CSMPL file of one channel and return the time stamps of all triggers.
@@ -208,6 +361,11 @@ def trigger_csmpl(paths,
     :type return_info: bool
     :param window: If true, a window function is applied to the record window before filtering. Recommended!
     :type window: bool
+    :param batch_size: The number of consecutive record windows that are filtered at once.
+    :type batch_size: int
+    :param progress: An object with an update method, which receives the number of processed samples. If None, a
+        progress bar is shown for each file.
+    :type progress: object
     :return: The hours time stamps of all triggers.
     :rtype: 1D array
     """
@@ -240,53 +398,26 @@ def trigger_csmpl(paths,
         # TRIGGER ALGO
         # ---------------------------------------------------------------
 
-        with tqdm(total=take_samples - record_length) as pbar:
+        with tqdm(total=take_samples - record_length) if progress is None else nullcontext(progress) as pbar:
             pbar.update(record_length)
-            counter = np.copy(record_length)
-            block = 0
-            while counter < take_samples - record_length:
-                pbar.update(record_length - 2 * overlap)
-                if block >= record_length - overlap:
-                    block -= record_length - 2 * overlap
-                    counter += record_length - 2 * overlap
-                else:
-                    trig, height = get_max_index(stream=stream,  # memmap array
-                                                 counter=counter,  # in samples
-                                                 record_length=record_length,
-                                                 overlap=overlap,  # in samples
-                                                 block=block,  # in samples
-                                                 transfer_function=transfer_function,
-                                                 down=down,
-                                                 window=window,
-                                                 )
-                    if height > trigger_tres:
-                        # resample in case higher trigger is in record window
-                        counter += (trig - overlap) - 1
-                        if counter > take_samples - record_length: #check if new record window would end outside sample
-                            continue
-                        pbar.update((trig - overlap) - 1)
-                        trig, height = get_max_index(stream=stream,  # memmap array
-                                                     counter=counter,  # in samples
-                                                     record_length=record_length,
-                                                     overlap=overlap,  # in samples
-                                                     block=block,  # in samples
-                                                     transfer_function=transfer_function,
-                                                     down=down,
-                                                     window=window,
-                                                     )
-                        if height > trigger_tres:
-                            triggers.append(start_hours + sample_to_time(counter + trig, sample_duration=sample_length))
-                            trigger_heights.append(height)
-                            record_starts.append(start_hours + sample_to_time(counter, sample_duration=sample_length))
-                            blocks.append(block)
-
-                            block += trig + trigger_block
-
-                    # increment
-                    counter += record_length - 2 * overlap
-                    block -= record_length - 2 * overlap
-                    if block < 0:
-                        block = 0
+            trig, height, starts, block = _trigger_stream(stream=stream,
+                                                          trigger_tres=trigger_tres,
+                                                          record_length=record_length,
+                                                          overlap=overlap,
+                                                          take_samples=take_samples,
+                                                          trigger_block=trigger_block,
+                                                          pbar=pbar,
+                                                          batch_size=batch_size,
+                                                          transfer_function=transfer_function,
+                                                          down=down,
+                                                          window=window,
+                                                          )
+        triggers.extend(start_hours + sample_to_time(np.array(trig, dtype=float), sample_duration=sample_length))
+        trigger_heights.extend(height)
+        record_starts.extend(start_hours + sample_to_time(np.array(starts, dtype=float),
+                                                          sample_duration=sample_length))
+        blocks.extend(block)
+
         # increment
         start_hours += (length_stream - 1) * sample_length
     print('#######################################')
@@ -299,6 +430,83 @@ def trigger_csmpl(paths,
         return np.array(triggers)
 
 
+class _QueueProgress:
+    """
+    Forward the progress updates of a trigger function in a worker process to a queue.
+
+    The updates are accumulated locally and only put to the queue once min_samples samples were processed or interval
+    seconds passed since the last put, such that the workers do not wait for the queue after every record window.
+
+    :param queue: The queue that is read by the main process.
+    :type queue: multiprocessing queue
+    :param min_samples: The number of accumulated samples after which the count is put to the queue.
+    :type min_samples: int
+    :param interval: The time in seconds after which the accumulated count is put to the queue.
+    :type interval: float
+    """
+
+    def __init__(self, queue, min_samples=2**20, interval=1.):
+        self.queue = queue
+        self.min_samples = min_samples
+        self.interval = interval
+        self.n = 0
+        self.last_put = monotonic()
+
+    def update(self, n):
+        self.n += int(n)
+        if self.n >= self.min_samples or monotonic() - self.last_put >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self.n != 0:
+            self.queue.put(self.n)
+            self.n = 0
+        self.last_put = monotonic()
+
+
+def _trigger_worker(args):
+    # Runs a trigger function (trigger_csmpl or trigger_bin) in a worker process.
+    fnc, kwargs, queue = args
+    progress = _QueueProgress(queue)
+    try:
+        return fnc(**kwargs, progress=progress)
+    finally:
+        progress.flush()
+
+
+def _trigger_parallel(fnc, kwargs, total=None, processes=1):
+    """
+    Run a trigger function for several channels or files in separate worker processes.
+
+    The progress of all workers is shown in one progress bar.
+
+    :param fnc: The trigger function, i.e. `trigger_csmpl` or `trigger_bin`.
+    :type fnc: callable
+    :param kwargs: The keyword arguments of the individual calls of fnc.
+    :type kwargs: list of dicts
+    :param total: The total number of samples that are triggered, for the progress bar.
+    :type total: int
+    :param processes: The number of worker processes.
+    :type processes: int
+    :return: The return values of the individual calls of fnc, in the order of kwargs.
+    :rtype: list
+    """
+
+    ctx = get_context("spawn")
+    with ctx.Manager() as manager, ctx.Pool(processes) as pool:
+        queue = manager.Queue()
+        result = pool.map_async(_trigger_worker, [(fnc, kw, queue) for kw in kwargs], chunksize=1)
+
+        with tqdm(total=total) as pbar:
+            while not result.ready() or not queue.empty():
+                try:
+                    pbar.update(queue.get(timeout=0.1))
+                except Empty:
+                    pass
+
+        return result.get()
+
+
 def get_record_window(path,
                       start_time,  # in s
                       record_length,
@@ -349,6 +557,125 @@ def get_record_window(path,
     return event, time
 
 
+def _gather_windows(stream, samples, record_length):
+    """
+    Copy record windows out of a memory mapped stream, visiting them in order of their position in the file.
+
+    :param stream: The memory mapped stream.
+    :type stream: 1D array
+    :param samples: The first sample index of each record window. Negative values are clipped to zero.
+    :type samples: 1D array
+    :param record_length: The length of the record windows in samples.
+    :type record_length: int
+    :return: (the raw record windows, the number of samples that were actually available in the stream)
+    :rtype: 2-tuple of a 2D and a 1D array
+    """
+    samples = np.maximum(np.asarray(samples, dtype=np.int64), 0)
+    windows = np.zeros((len(samples), record_length), dtype=stream.dtype)
+    lengths = np.clip(len(stream) - samples, 0, record_length)
+
+    # the windows that lie entirely inside the stream are copied with a single fancy index of a sliding window view
+    # (this does not create an index array of the size of the windows)
+    full = np.nonzero(lengths == record_length)[0]
+    if len(full) > 0:
+        full = full[np.argsort(samples[full], kind='stable')]
+        windows[full] = np.lib.stride_tricks.sliding_window_view(stream, record_length)[samples[full]]
+
+    # only the windows at the end of the stream are copied one by one
+    for i in np.nonzero(lengths < record_length)[0]:
+        windows[i, :lengths[i]] = stream[samples[i]:samples[i] + lengths[i]]
+
+    return windows, lengths
+
+
+def _finish_windows(events, lengths, down):
+    """
+    Fill up record windows that reach beyond the end of the stream and downsample them.
+
+    :param events: The record windows in volt.
+    :type events: 2D array
+    :param lengths: The number of valid samples in each record window.
+    :type lengths: 1D array
+    :param down: The factor by which the record windows get downsampled.
+    :type down: int
+    :return: The finished record windows.
+    :rtype: 2D array
+    """
+    record_length = events.shape[1]
+
+    # handling end of file and fill up with small random values to avoid division by zero
+    for i in np.nonzero(lengths < record_length)[0]:
+        events[i, lengths[i]:] = np.random.normal(scale=1e-5, size=record_length - lengths[i])
+
+    if down > 1:
+        events = np.mean(events.reshape(events.shape[0], int(record_length / down), down), axis=2)
+
+    return events
+
+
+def _index_batches(inds, batch_size):
+    """
+    Split event indices into batches and provide an HDF5 selection for each of them.
+
+    Consecutive indices are selected with a slice, such that the corresponding rows are written in one block.
+
+    :param inds: The increasing event indices.
+    :type inds: 1D array
+    :param batch_size: The maximal number of indices per batch.
+    :type batch_size: int
+    :return: Generator of (selection, indices) tuples.
+    :rtype: generator
+    """
+    inds = np.asarray(inds, dtype=np.int64)
+    for start in range(0, len(inds), batch_size):
+        batch = inds[start:start + batch_size]
+        if batch[-1] - batch[0] == len(batch) - 1:
+            yield slice(int(batch[0]), int(batch[-1]) + 1), batch
+        else:
+            yield batch, batch
+
+
+def get_record_windows(path,
+                       start_times,  # in s
+                       record_length,
+                       sample_duration=0.00004,
+                       down=1,
+                       stream=None,
+                       ):
+    """
+    Get many record windows from a stream `*.csmpl` file at once.
+
+    The file is memory mapped once (or the given memory mapped stream is used) and the windows are copied in order of
+    their position in the file. The result is identical to calling `get_record_window` for each start time.
+
+    :param path: The path to the `*.csmpl` file.
+    :type path: string
+    :param start_times: The start times of the record windows from beginning of the file, in seconds.
+    :type start_times: 1D array
+    :param record_length: The length of the record windows in samples.
+    :type record_length: int
+    :param sample_duration: The duration of the samples in the array.
+    :type sample_duration: float
+    :param down: The record windows get downsampled by this factor.
+    :type down: int
+    :param stream: The memory mapped file, as returned by `readcs(path)`. If many batches of windows are read from the
+        same file, it can be opened once and passed for all of them. If None, the file is memory mapped in this call.
+    :type stream: 1D array
+    :return: The values of the record windows, shape (len(start_times), record_length/down).
+    :rtype: 2D array
+    """
+
+    start_times = np.asarray(start_times, dtype=float).reshape(-1)
+    if stream is None:
+        stream = readcs(path)
+
+    windows, lengths = _gather_windows(stream,
+                                       time_to_sample(start_times, sample_duration=sample_duration),
+                                       record_length)
+
+    return _finish_windows(convert_to_V(windows), lengths, down)
+
+
 def plot_csmpl(path,
                start_time=0,
                record_length=None,
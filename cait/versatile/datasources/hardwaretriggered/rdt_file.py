@@ -6,6 +6,7 @@ import numpy as np
 import cait as ai
 
 from .par_file import PARFile
+from ....data._raw import get_record_indices
 from ..datasourcebase import DataSourceBaseClass
 from ...iterators.impl_rdt import RDTIterator
 
@@ -72,6 +73,7 @@ class RDTFile:
                        ('samples', 'i2', self._par.record_length),
                        ])
         
+        self._path = path
         self._raw_file = np.memmap(path, dtype=self._dtype, mode='r')
 
         # Copy the relevant data to memory so that we don't have to go through
@@ -94,7 +96,7 @@ class RDTFile:
         self._inds = dict()
         # DETERMINE INDICES FOR SINGLE CHANNELS:
         for c in self._available_channels:
-            self._inds[c] = np.nonzero(meta_copy["detector_nmbr"] == c)[0]
+            self._inds[c] = get_record_indices(meta_copy["detector_nmbr"], [c])
 
         # DETERMINE INDICES FOR CORRELATED CHANNELS (have same trig_count):
         vals, idx_start, count = np.unique(meta_copy["trig_count"], return_counts=True, return_index=True)
@@ -183,6 +185,17 @@ class RDTFile:
         
         return RDTChannel(self, key=channels)
     
+    def __getstate__(self):
+        # The memory map is not pickled (this would copy the entire file) but 
+        # re-created from the file path when unpickling (e.g. in worker processes)
+        state = self.__dict__.copy()
+        del state["_raw_file"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._raw_file = np.memmap(self._path, dtype=self._dtype, mode='r')
+
     @property
     def _file(self):
         """The `numpy.memmap` object to the underlying `*.rdt` file."""
@@ -366,12 +379,14 @@ class RDTChannel(DataSourceBaseClass):
         """The unique testpulse amplitudes of the events in this RDTChannel."""
         return sorted(list(set(self.tpas)))
     
-    def get_event_iterator(self, batch_size: int = None):
+    def get_event_iterator(self, batch_size: int = None, prefetch: int = None):
         """
         Get an iterator over the events present in this RDTChannel instance. 
 
         :param batch_size: The number of events to be returned at once (these are all read together). There will be a trade-off: large batch_sizes cause faster read speed but increase the memory usage.
         :type batch_size: int
+        :param prefetch: The number of batches (or events if no batches are used) which are read in a background thread while the current one is processed. Defaults to None, i.e. no prefetching.
+        :type prefetch: int, optional
 
         :return: Iterable object
         :rtype: RDTIterator
@@ -396,4 +411,4 @@ class RDTChannel(DataSourceBaseClass):
             # Have a look:
             vai.Preview(it_testpulses)
         """
-        return RDTIterator(self, batch_size=batch_size)
\ No newline at end of file
+        return RDTIterator(self, batch_size=batch_size, prefetch=prefetch)
\ No newline at end of file
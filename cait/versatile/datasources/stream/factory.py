@@ -1,5 +1,7 @@
 from typing import Union, List
 
+import numpy as np
+
 from .streambase import StreamBaseClass
 from .impl_cresst import Stream_CRESST
 from .impl_vdaq2 import Stream_VDAQ2
@@ -42,6 +44,9 @@ class Stream(StreamBaseClass):
         # Get data for one channel, slice it, and return the voltage 
         # values instead of the ADC values
         s['ADC1', 10:20, 'as_voltage']
+
+        # Get the voltage values in single precision (default is np.float64)
+        s['ADC1', 10:20, 'as_voltage', np.float32]
     """
     def __init__(self, hardware: str, src: Union[str, List[str]]):
         if hardware.lower() == "cresst":
@@ -62,8 +67,14 @@ class Stream(StreamBaseClass):
     def get_channel(self, key: str):
         return self._stream.get_channel(key)
         
-    def get_voltage_trace(self, key: str, where: slice):
-        return self._stream.get_voltage_trace(key, where)
+    def get_voltage_scale(self, key: str):
+        return self._stream.get_voltage_scale(key)
+
+    def get_raw_trace(self, key: str, where: slice):
+        return self._stream.get_raw_trace(key, where)
+
+    def get_voltage_trace(self, key: str, where: slice, dtype: np.dtype = np.float64):
+        return self._stream.get_voltage_trace(key, where, dtype)
 
     @property
     def keys(self):
@@ -4,7 +4,7 @@ from typing import List
 import numpy as np
 import cait as ai
 
-from .streambase import StreamBaseClass
+from .streambase import StreamBaseClass, _voltage_scale
 from ..hardwaretriggered.par_file import PARFile
 
 class Stream_CRESST(StreamBaseClass):
@@ -33,10 +33,12 @@ class Stream_CRESST(StreamBaseClass):
         self._dt = self._par_file.time_base_us
 
         self._data = dict()
+        self._csmpl_paths = dict()
 
         for f in csmpl_paths:
             name = os.path.splitext(os.path.basename(f))[0]
             self._data[name] = ai.trigger._csmpl.readcs(f)
+            self._csmpl_paths[name] = f
 
         if test_path:
             if not dig_path:
@@ -58,14 +60,26 @@ class Stream_CRESST(StreamBaseClass):
 
         self._keys = list(self._data.keys())
 
+    def __getstate__(self):
+        # The memory maps are not pickled (this would copy the entire files) but 
+        # re-created from the file paths when unpickling (e.g. in worker processes)
+        state = self.__dict__.copy()
+        del state["_data"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._data = {k: ai.trigger._csmpl.readcs(f) for k, f in self._csmpl_paths.items()}
+
     def __len__(self):
         return len(self._data[self.keys[0]])
     
     def get_channel(self, key: str):
         return self._data[key]
     
-    def get_voltage_trace(self, key: str, where: slice):
-       return ai.data.convert_to_V(self._data[key][where], bits=16, min=-10, max=10)
+    def get_voltage_scale(self, key: str):
+        # Same conversion as ai.data.convert_to_V(..., bits=16, min=-10, max=10)
+        return _voltage_scale(bits=16, min=-10, max=10)
     
     @property
     def start_us(self):
@@ -56,11 +56,32 @@ class StreamSum(StreamBaseClass):
         
         return self._stream.get_channel(key)
     
-    def get_voltage_trace(self, key: str, where: slice):
+    def get_voltage_scale(self, key: str):
+        if key == "sum": 
+            raise KeyError("Key 'sum' has no linear conversion from raw values. Use e.g. stream['sum', :100, 'as_voltage'] instead.")
+        
+        return self._stream.get_voltage_scale(key)
+
+    def get_voltage_trace(self, key: str, where: slice, dtype: np.dtype = np.float64):
         if key == "sum":
-            return np.sum([self._stream.get_voltage_trace(k, where) for k in self._sum_keys], axis=0)
+            trace = self._stream.get_voltage_trace(self._sum_keys[0], where, dtype)
+            for k in self._sum_keys[1:]:
+                trace += self._stream.get_voltage_trace(k, where, dtype)
+            return trace
         else:
-            return self._stream.get_voltage_trace(key, where)
+            return self._stream.get_voltage_trace(key, where, dtype)
+
+    def get_voltage_traces(self, keys: List[str], where: slice, dtype: np.dtype = np.float64):
+        # The channels (and the channels of the sum) are read together from the
+        # underlying stream
+        read_keys = list(dict.fromkeys([k for k in keys if k != "sum"] + (self._sum_keys if "sum" in keys else [])))
+        traces = self._stream.get_voltage_traces(read_keys, where, dtype)
+        out = {k: traces[k] for k in keys if k != "sum"}
+        if "sum" in keys:
+            out["sum"] = traces[self._sum_keys[0]].copy()
+            for k in self._sum_keys[1:]:
+                out["sum"] += traces[k]
+        return out
     
     @property
     def start_us(self):
@@ -1,7 +1,9 @@
+from typing import List
+
 import numpy as np
 import cait as ai
 
-from .streambase import StreamBaseClass
+from .streambase import StreamBaseClass, _voltage_scale
 from ...functions.trigger.trigger_zscore import trigger_zscore
 from ...eventfunctions.processing.removebaseline import RemoveBaseline
 
@@ -44,19 +46,39 @@ class Stream_VDAQ2(StreamBaseClass):
         self._keys = list(set(keys) - set(['Time', 'Settings']))
 
         # Create memory map to binary file
+        self._file = file
+        self._dt_tcp = dt_tcp
+        self._offset = header.nbytes
         self._data = np.memmap(file, dtype=dt_tcp, mode='r', offset=header.nbytes)
 
         # Create placeholders for testpulses
         self._tp_timestamps = None
         self._tpas = None
         
+    def __getstate__(self):
+        # The memory map is not pickled (this would copy the entire file) but 
+        # re-created from the file path when unpickling (e.g. in worker processes)
+        state = self.__dict__.copy()
+        del state["_data"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._data = np.memmap(self._file, dtype=self._dt_tcp, mode='r', offset=self._offset)
+
     def __len__(self):
         return len(self._data)
     
     def get_channel(self, key: str):
         return self._data[key]
+
+    def get_voltage_traces(self, keys: List[str], where: slice, dtype: np.dtype = np.float64):
+        # All channels are interleaved in the same records, i.e. the slice is
+        # read from the file once and the channels are taken from the copy
+        block = np.array(self._data[where])
+        return {k: self._to_voltage(k, block[k], dtype) for k in keys}
     
-    def get_voltage_trace(self, key: str, where: slice):
+    def get_voltage_scale(self, key: str):
         if key.lower().startswith('adc'): 
             bits = self._adc_bits
         elif key.lower().startswith('dac'):
@@ -64,7 +86,8 @@ class Stream_VDAQ2(StreamBaseClass):
         else:
             raise ValueError(f'Unable to assign the correct itemsize to name "{key}" as it does not start with "ADC" or "DAC".')
             
-        return ai.data.convert_to_V(self._data[key][where], bits=bits, min=-20, max=20)
+        # Same conversion as ai.data.convert_to_V(..., bits=bits, min=-20, max=20)
+        return _voltage_scale(bits=bits, min=-20, max=20)
     
     @property
     def start_us(self):
@@ -3,7 +3,7 @@ from typing import Union, List
 import numpy as np
 import cait as ai
 
-from .streambase import StreamBaseClass
+from .streambase import StreamBaseClass, _voltage_scale
 
 # TODO: finally implement and test cases    
 class Stream_VDAQ3(StreamBaseClass):
@@ -68,15 +68,18 @@ class Stream_VDAQ3(StreamBaseClass):
     def get_channel(self, key: str):
         return self._data[key]
     
-    def get_voltage_trace(self, key: str, where: slice):
+    def get_raw_trace(self, key: str, where: slice):
         # VDAQ3 writes 24bit values, here, we convert them to 32 bits such that numpy can handle them
-        adc_32bit = np.vstack([self._data[key]["byte1"][where], 
-                               self._data[key]["byte2"][where], 
-                               self._data[key]["f3"][where],
-                               np.zeros_like(self._data[key]["byte1"][where]),
-                               ]).flatten("F").view("<u4")
- 
-        return ai.data.convert_to_V(adc_32bit, bits=32, min=-20, max=20)
+        # (this cannot be done without a copy)
+        return np.vstack([self._data[key]["byte1"][where], 
+                          self._data[key]["byte2"][where], 
+                          self._data[key]["f3"][where],
+                          np.zeros_like(self._data[key]["byte1"][where]),
+                          ]).flatten("F").view("<u4")
+
+    def get_voltage_scale(self, key: str):
+        # Same conversion as ai.data.convert_to_V(..., bits=32, min=-20, max=20)
+        return _voltage_scale(bits=32, min=-20, max=20)
     
     @property
     def start_us(self):
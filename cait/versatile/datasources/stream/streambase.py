@@ -6,6 +6,15 @@ import numpy as np
 from ..datasourcebase import DataSourceBaseClass
 from ...iterators.impl_stream import StreamIterator
 
+def _voltage_scale(bits: int, max: float, min: float, offset: float = 0):
+    # Returns (scale, offset) such that scale*raw + offset is the same as
+    # ai.data.convert_to_V(raw, bits, max, min, offset)
+    a = 2 ** (bits - 1)
+    b = (max - min) / 2 ** bits
+    c = min - offset
+
+    return b, c + a*b
+
 class StreamBaseClass(DataSourceBaseClass):
     @abstractmethod
     def __len__(self):
@@ -16,14 +25,63 @@ class StreamBaseClass(DataSourceBaseClass):
         ...
         
     @abstractmethod
-    def get_voltage_trace(self, key: str, where: slice):
+    def get_voltage_scale(self, key: str):
+        """
+        Get the linear conversion from the raw (ADC) values of channel 'key' to voltages, i.e. ``voltage = scale*raw + offset``.
+        
+        :return: Tuple of scale and offset.
+        :rtype: Tuple[float, float]
+        """
+        ...
+
+    def get_raw_trace(self, key: str, where: Union[slice, np.ndarray]):
+        """
+        Get the raw (ADC) values for a given channel 'key' and slice 'where'. For slices, this is a view of the underlying (memory-mapped) data, i.e. no copy is made. Together with :meth:`get_voltage_scale`, this can be used to convert to voltages only when (and in the precision) needed.
+        
+        :return: Raw trace.
+        :rtype: np.ndarray
+        """
+        return self.get_channel(key)[where]
+
+    def get_voltage_trace(self, key: str, where: Union[slice, np.ndarray], dtype: np.dtype = np.float64):
         """
         Get the voltage trace for a given channel 'key' and slice 'where'.
+
+        :param dtype: The floating point data type of the returned trace. Using ``np.float32`` halves the memory (bandwidth) needed compared to the default ``np.float64``.
+        :type dtype: np.dtype, optional
         
         :return: Voltage trace.
         :rtype: np.ndarray
         """
-        ...
+        return self._to_voltage(key, self.get_raw_trace(key, where), dtype)
+
+    def get_voltage_traces(self, keys: List[str], where: slice, dtype: np.dtype = np.float64):
+        """
+        Get the voltage traces of several channels 'keys' for the same slice 'where'. The result is the same as calling :meth:`get_voltage_trace` for each key, but streams which store all channels in the same file (e.g. hardware 'vdaq2') read the slice only once.
+
+        :param dtype: The floating point data type of the returned traces.
+        :type dtype: np.dtype, optional
+
+        :return: Dictionary of voltage traces (one for each key).
+        :rtype: dict of np.ndarray
+        """
+        return {k: self.get_voltage_trace(k, where, dtype) for k in keys}
+
+    def _to_voltage(self, key: str, raw: np.ndarray, dtype: np.dtype):
+        # Converts raw (ADC) values of channel 'key' to voltages of type 'dtype'
+        dtype = np.dtype(dtype)
+        if dtype.kind != "f":
+            raise TypeError(f"Voltage traces can only be returned as floating point numbers, got dtype {dtype}.")
+        
+        scale, offset = self.get_voltage_scale(key)
+
+        # Only one array (of the requested type) is allocated, the 
+        # conversion is done in place
+        trace = raw.astype(dtype)
+        trace *= dtype.type(scale)
+        if offset != 0: trace += dtype.type(offset)
+
+        return trace
 
     @property
     @abstractmethod
@@ -83,7 +141,7 @@ class StreamBaseClass(DataSourceBaseClass):
     def __repr__(self):
         return f'{self.__class__.__name__}(start_us={self.start_us}, dt_us={self.dt_us}, length={self.__len__()}, keys={self.keys}, measuring_time_h={self.__len__()*self.dt_us/1e6/3600:.2f})'
 
-    def __getitem__(self, val: Union[str, Tuple[str, Union[int, slice, list, np.ndarray]], Tuple[str, Union[int, slice, list, np.ndarray], str]]):
+    def __getitem__(self, val: Union[str, Tuple[str, Union[int, slice, list, np.ndarray]], Tuple[str, Union[int, slice, list, np.ndarray], str], Tuple[str, Union[int, slice, list, np.ndarray], str, np.dtype]]):
         # Only names and tuples are supported for slicing (no int)
         if type(val) not in [str, tuple]:
             raise TypeError(f'Unsupported type {type(val)} for slicing.')
@@ -110,7 +168,8 @@ class StreamBaseClass(DataSourceBaseClass):
                 else:
                     raise TypeError('When slicing with two arguments, the first and second one have to be of type string and int/slice, respectively.')
             # Return the voltage values for the stream 'name' if everything else is fine
-            elif len(val) == 3:
+            # (optionally, the data type of the voltage values is given as fourth argument)
+            elif len(val) in [3, 4]:
                 if type(val[0]) is str and type(val[1]) in [int, slice, list, np.ndarray] and type(val[2]) is str:
                     if val[0] not in self.keys:
                         raise KeyError(f'{val[0]} not in stream. Available names: {self.keys}')
@@ -118,9 +177,10 @@ class StreamBaseClass(DataSourceBaseClass):
                         raise ValueError(f'Unrecognized string "{val[2]}". Did you mean "as_voltage"?')
                     
                     where = slice(val[1], val[1]+1) if type(val[1]) is int else val[1]
-                    return self.get_voltage_trace(key=val[0], where=where)
+                    dtype = val[3] if len(val) == 4 else np.float64
+                    return self.get_voltage_trace(key=val[0], where=where, dtype=dtype)
                 else:
-                    raise TypeError('When slicing with three arguments, the first, second and third one have to be of type string, int/slice and string, respectively.')
+                    raise TypeError('When slicing with three (four) arguments, the first, second and third one have to be of type string, int/slice and string, respectively (the fourth one is the data type).')
             else:  
                 raise NotImplementedError(f'Tuples of length {len(val)} are not supported for slicing')
     
@@ -142,7 +202,9 @@ class StreamBaseClass(DataSourceBaseClass):
                            inds: Union[int, List[int]] = None, 
                            timestamps: Union[int, List[int]] = None, 
                            alignment: float = 1/4,
-                           batch_size: int = None):
+                           batch_size: int = None,
+                           dtype: np.dtype = np.float64,
+                           prefetch: int = None):
         """
         Returns an iterator object over voltage traces for given trigger indices or timestamps of a stream file. 
 
@@ -158,6 +220,10 @@ class StreamBaseClass(DataSourceBaseClass):
         :type alignment: float
         :param batch_size: The number of events to be returned at once (these are all read together). There will be a trade-off: large batch_sizes cause faster read speed but increase the memory usage.
         :type batch_size: int
+        :param dtype: The floating point data type of the returned voltage traces. Defaults to ``np.float64``.
+        :type dtype: np.dtype, optional
+        :param prefetch: The number of batches (or events if no batches are used) which are read in a background thread while the current one is processed. Defaults to None, i.e. no prefetching.
+        :type prefetch: int, optional
 
         :return: Iterable object
         :rtype: StreamIterator
@@ -172,7 +238,9 @@ class StreamBaseClass(DataSourceBaseClass):
                               inds=inds, 
                               record_length=record_length, 
                               alignment=alignment, 
-                              batch_size=batch_size)
+                              batch_size=batch_size,
+                              dtype=dtype,
+                              prefetch=prefetch)
     
 class StreamTime:
     """
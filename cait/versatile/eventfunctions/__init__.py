@@ -6,4 +6,5 @@ from .processing.removebaseline import RemoveBaseline
 from .processing.tukey import TukeyFiltering
 
 from .scalarfunctions.calcmp import CalcMP
-from .scalarfunctions.fitbaseline import FitBaseline
\ No newline at end of file
+from .scalarfunctions.fitbaseline import FitBaseline
+from .pipeline import Pipeline
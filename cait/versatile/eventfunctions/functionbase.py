@@ -8,6 +8,15 @@ class FncBaseClass(ABC):
     This class defines two necessary methods: `__call__` which takes one argument (the event voltage trace; can be multiple channels, depending on the function implementation) and returns the result. Multiple results are returned as tuples (e.g. `return result1, result2`) and if one result is a list/vector, it is encouraged to return a `numpy.ndarray`.
     The `preview` method is called when the function is used in combination with the :class:`Preview` class and (if implemented) is expected to return a dictionary of the form specified in :class:`Preview`. 
     """
+    def __new__(cls, *args, **kwargs):
+        # Keep the constructor arguments (before __init__ or any call can alter the
+        # corresponding attributes) such that the function can be identified by them
+        obj = super().__new__(cls)
+        bound = signature(cls.__init__).bind_partial(None, *args, **kwargs)
+        bound.apply_defaults()
+        obj._init_args = dict(list(bound.arguments.items())[1:])
+        return obj
+
     def __repr__(self):
         params = signature(self.__init__).parameters.keys()
         p = ", ".join([f"{k}={getattr(self, '_'+k)}" 
@@ -0,0 +1,139 @@
+from typing import Callable
+from inspect import signature
+
+import numpy as np
+
+from .functionbase import FncBaseClass
+
+class Pipeline(FncBaseClass):
+    """
+    Chain several event functions (processing and scalar functions) into a single function. The event is passed through the functions in the given order, i.e. ``Pipeline(f1, f2, f3)(event)`` is the same as ``f3(f2(f1(event)))``.
+
+    The batch support of the pipeline is inferred from its functions: If all functions support batches, the entire chain is applied to a batch at once (instead of resolving the batches for each function separately like it is done for the processing of iterators). If any of the functions does not support batches (or is not a :class:`FncBaseClass`), the pipeline is applied to each event separately.
+
+    Functions which accept an ``out`` argument (e.g. :class:`RemoveBaseline`, :class:`TukeyFiltering` and :class:`OptimumFiltering`) write their intermediate results into scratch buffers which are kept by the pipeline and reused for all following events (or batches) of the same shape. The output of the last function is never such a buffer, i.e. the returned results are not overwritten by later calls.
+
+    If the pipeline is used in :class:`Preview`, the preview of the last function in the chain is displayed (for the event processed by all previous functions).
+
+    :param fncs: The functions to chain.
+    :type fncs: Callable
+
+    :return: The output of the last function in the chain.
+    :rtype: Any
+
+    **Example:**
+    ::
+        import cait.versatile as vai
+
+        # Construct mock data (which provides event iterator and optimum filter)
+        md = vai.MockData()
+        it = md.get_event_iterator(batch_size=100)
+
+        # Main parameters of optimum filtered events
+        f = vai.Pipeline(vai.RemoveBaseline(),
+                         vai.TukeyFiltering(),
+                         vai.OptimumFiltering(md.of),
+                         vai.CalcMP())
+        mp = vai.apply(f, it)
+
+        # Look at the main parameters of the filtered events
+        vai.Preview(md.get_event_iterator(), f)
+    """
+    def __init__(self, *fncs: Callable):
+        if len(fncs) == 0:
+            raise ValueError("At least one function has to be specified.")
+        for f in fncs:
+            if not callable(f):
+                raise TypeError(f"All inputs must be callable, got '{type(f)}'.")
+
+        self._fncs = list(fncs)
+
+        supports = [getattr(f, "batch_support", "none") for f in fncs]
+        for s in supports:
+            if s not in ["none", "trivial", "full"]:
+                raise NotImplementedError(f"{s} is not a valid batch_support string.")
+
+        # Functions with 'trivial' batch support can be used in a 'full' pipeline
+        # because the pipeline takes care of flattening the batches for them
+        if "none" in supports:
+            self._batch_support = "none"
+        elif all(s == "trivial" for s in supports):
+            self._batch_support = "trivial"
+        else:
+            self._batch_support = "full"
+
+        self._supports = supports
+
+        # Scratch buffers for the intermediate results (all but the last function)
+        # of functions which can write into a given array
+        self._scratch = [_accepts_out(f) for f in fncs[:-1]] + [False]
+        self._buffers = dict()
+
+    def __call__(self, event):
+        out = event
+        for i, (f, s) in enumerate(zip(self._fncs, self._supports)):
+            kwargs = dict()
+            if self._scratch[i]:
+                # The buffer of a function is reused for inputs of the same shape and type
+                key = (np.shape(out), np.result_type(out))
+                if i in self._buffers and self._buffers[i][0] == key: kwargs["out"] = self._buffers[i][1]
+
+            out = _flat_call(f, out, **kwargs) if s == "trivial" else f(out, **kwargs)
+
+            if self._scratch[i] and not kwargs and isinstance(out, np.ndarray): self._buffers[i] = (key, out)
+
+        # Functions which return (views of) their input could hand out a buffer
+        if isinstance(out, np.ndarray) and any(np.may_share_memory(out, b) for _, b in self._buffers.values()):
+            out = out.copy()
+
+        return out
+
+    def __getstate__(self):
+        # The scratch buffers are not pickled (e.g. when the pipeline is sent to 
+        # worker processes)
+        state = self.__dict__.copy()
+        state["_buffers"] = dict()
+        return state
+
+    def __len__(self):
+        return len(self._fncs)
+
+    @property
+    def batch_support(self):
+        return self._batch_support
+
+    def preview(self, event) -> dict:
+        out = event
+        for f in self._fncs[:-1]:
+            out = f(out)
+
+        return self._fncs[-1].preview(out)
+
+def _accepts_out(f: Callable):
+    # Whether a function can write its result into a given array 'out'
+    try:
+        return "out" in signature(f).parameters
+    except (TypeError, ValueError):
+        return False
+
+def _flat_call(f: Callable, x, out: np.ndarray = None):
+    # Calls a function with 'trivial' batch support, i.e. one which can only
+    # process 1d or 2d arrays of traces. Higher dimensional inputs (batches of
+    # multiple channels) are flattened to 2d and the result is reshaped to the
+    # original leading dimensions afterwards. If given, 'out' is flattened the
+    # same way (this is a view, i.e. the result is written into 'out').
+    kwargs = dict() if out is None else dict(out=out)
+    x = np.asarray(x)
+    if x.ndim <= 2:
+        return f(x, **kwargs)
+
+    lead = x.shape[:-1]
+    if out is not None: kwargs["out"] = out.reshape(-1, out.shape[-1])
+    result = f(x.reshape(-1, x.shape[-1]), **kwargs)
+
+    if isinstance(result, tuple):
+        # Scalar outputs (one value per trace) do not get an extra dimension
+        return tuple(np.reshape(r, lead) if np.size(r) == np.prod(lead) else np.reshape(r, (*lead, -1))
+                     for r in result)
+
+    return np.reshape(result, (*lead, *np.shape(result)[1:]))
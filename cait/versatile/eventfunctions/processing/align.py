@@ -7,6 +7,7 @@ class Align(FncBaseClass):
     """
     Align a voltage trace relative to a reference trace by shifting its indices.
     This function calculates the lags (shift between two signals) using cross-correlations and shifts it afterwards. Note that the output has the same size as the input, i.e. samples are just periodically shifted.
+    Multiple channels and batches of events are aligned at once (each trace is shifted by its own lag).
 
     :param ref_event: The reference voltage trace.
     :type ref_event: np.ndarray
@@ -24,12 +25,17 @@ class Align(FncBaseClass):
         self._lags = Lags(ref_event)
 
     def __call__(self, event):
-        self._shifted_event = np.roll(event, self._lags(event))
+        event = np.asarray(event)
+        lags = np.expand_dims(self._lags(event), -1)
+
+        # Periodic shift of each trace by its lag (like np.roll)
+        inds = (np.arange(event.shape[-1]) - lags) % event.shape[-1]
+        self._shifted_event = np.take_along_axis(event, inds, axis=-1)
         return self._shifted_event
     
     @property
     def batch_support(self):
-        return 'none'
+        return 'full'
     
     def preview(self, event):
         self(event)
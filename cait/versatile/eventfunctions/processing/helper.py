@@ -32,17 +32,41 @@ class Unity(FncBaseClass):
                          })
     
 class Lags(FncBaseClass):
+    """
+    Calculates the lag (shift) between a reference trace and voltage traces using FFT cross-correlations. The result is the same as ``scipy.signal.correlation_lags(...)[np.argmax(scipy.signal.correlate(ref_event, event))]``.
+    The lags of multiple channels and batches of events (arrays with arbitrary leading dimensions) are calculated at once (one lag for each trace).
+
+    :param ref_event: The reference voltage trace.
+    :type ref_event: np.ndarray
+
+    :return: The lag(s) of the voltage trace(s) with respect to the reference trace.
+    :rtype: int, np.ndarray
+    """
     def __init__(self, ref_event: np.ndarray):
         if np.array(ref_event).ndim > 1:
             raise Exception("Only one-dimensional events are supported.")
         self._ref_event = np.array(ref_event)
+        # Spectra of the reference event for the FFT sizes used so far
+        self._ref_spectra = dict()
 
     def __call__(self, event):
-        corr = sp.signal.correlate(self._ref_event, event, mode="full", method="fft")
-        lags = sp.signal.correlation_lags(self._ref_event.size, event.size, mode="full")
-        self._lag = lags[np.argmax(corr)]
+        event = np.asarray(event)
+        n_ref, n_ev = self._ref_event.size, event.shape[-1]
+
+        # The FFT size has to be at least the length of the full cross-correlation
+        # to avoid circular overlap
+        n = sp.fft.next_fast_len(n_ref + n_ev - 1, real=True)
+        if n not in self._ref_spectra:
+            self._ref_spectra[n] = np.fft.rfft(self._ref_event, n)
+        
+        circ_corr = np.fft.irfft(self._ref_spectra[n]*np.conj(np.fft.rfft(event, n, axis=-1)), n, axis=-1)
+        
+        # Reorder the circular cross-correlation to the lags -(n_ev-1),...,n_ref-1 
+        # of the full cross-correlation
+        corr = np.concatenate([circ_corr[..., n-n_ev+1:], circ_corr[..., :n_ref]], axis=-1)
+        self._lag = (np.argmax(corr, axis=-1) - (n_ev - 1))[()]
         return self._lag
     
     @property
     def batch_support(self):
-        return 'none'
\ No newline at end of file
+        return 'full'
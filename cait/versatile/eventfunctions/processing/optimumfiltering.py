@@ -2,10 +2,15 @@ import numpy as np
 
 from ..functionbase import FncBaseClass
 
+# numpy.fft can write into preallocated arrays since numpy 2.0
+_FFT_OUT = np.lib.NumpyVersion(np.__version__) >= "2.0.0"
+
 class OptimumFiltering(FncBaseClass):
     """
     Apply an optimum filter to a voltage trace. 
     Works for multiple channels simultaneously if optimum filter is also given for multiple channels.
+    Batches of events (of shape ``(n_events, n_channels, record_length)`` or ``(n_events, record_length)``) are filtered at once, i.e. the filtering of an entire batch is done with a single FFT.
+    If an array is passed as ``out`` when calling the function, the filtered event is written into it (see :class:`Pipeline`).
 
     :param of: The optimum filter to use.
     :type of: np.ndarray
@@ -30,17 +35,27 @@ class OptimumFiltering(FncBaseClass):
     def __init__(self, of):
         self._of = of
 
-    def __call__(self, event):
-        if np.ndim(event) != np.ndim(self._of):
-            raise ValueError(f"Number of dimensions of OF ({np.ndim(self._of)}) and event ({np.ndim(event)}) are incompatible.")
+    def __call__(self, event, out=None):
+        # The event can have additional leading (batch) dimensions but the 
+        # channel dimensions have to match the ones of the filter
+        if np.ndim(event) < np.ndim(self._of) or np.shape(event)[np.ndim(event)-np.ndim(self._of):-1] != np.shape(self._of)[:-1]:
+            raise ValueError(f"Shapes of OF {np.shape(self._of)} and event {np.shape(event)} are incompatible.")
         
-        # Note that this works for multiple channels simultaneously
-        self._filtered_event = np.fft.irfft(np.fft.rfft(event)*self._of)
+        # Note that this works for multiple channels (and batches) simultaneously
+        spectrum = np.fft.rfft(event)
+        spectrum *= self._of
+        if out is None:
+            self._filtered_event = np.fft.irfft(spectrum)
+        elif _FFT_OUT:
+            self._filtered_event = np.fft.irfft(spectrum, out=out)
+        else:
+            out[...] = np.fft.irfft(spectrum)
+            self._filtered_event = out
         return self._filtered_event
     
     @property
     def batch_support(self):
-        return 'none'
+        return 'full'
     
     def preview(self, event) -> dict:
         self(event)
@@ -6,7 +6,7 @@ from ..scalarfunctions.fitbaseline import FitBaseline
 class RemoveBaseline(FncBaseClass):
     """
     Remove baseline of given baseline model from an event voltage trace and return the new event.
-    Also works for multiple channels simultaneously.
+    Also works for multiple channels simultaneously. If an array is passed as ``out`` when calling the function, the result is written into it (see :class:`Pipeline`).
 
     :param fit_baseline: Dictionary of keyword arguments that are passed on to :class:`FitBaseline`.
     :type fit_baseline: dict
@@ -35,18 +35,17 @@ class RemoveBaseline(FncBaseClass):
         else:
             self._xdata = None
 
-    def __call__(self, event):
+    def __call__(self, event, out=None):
         par, *_ = self._fit_baseline(event)
+        # Fit and baseline evaluation are done for all traces at once, 
+        # i.e. batches are supported as well
         if self._fit_baseline._model == 0:
-            if np.ndim(event) > 1:
-                self._shifted_event = event - np.array(par)[:, None]
-            else:
-                self._shifted_event = event - par
+            self._shifted_event = np.subtract(event, np.expand_dims(par, -1), out=out)
         else:
             # ATTENTION: This is set only once! (we have to set it here because 
             # previously we didn't know the length of 'event')
             if self._xdata is None: self._xdata = np.linspace(0, 1, np.array(event).shape[-1])
-            self._shifted_event = event - self._fit_baseline.model(self._xdata, par)
+            self._shifted_event = np.subtract(event, self._fit_baseline.model(self._xdata, par), out=out)
 
         return self._shifted_event
     
@@ -6,7 +6,7 @@ from ..functionbase import FncBaseClass
 class TukeyFiltering(FncBaseClass):
     """
     Apply the Tukey window function to a voltage trace. 
-    Also works for multiple channels simultaneously.
+    Also works for multiple channels simultaneously. If an array is passed as ``out`` when calling the function, the result is written into it (see :class:`Pipeline`).
 
     :param alpha: The parameter of the Tukey window function. Defaults to 0.25.
     :type alpha: float
@@ -30,8 +30,8 @@ class TukeyFiltering(FncBaseClass):
     def __init__(self, alpha: float = 0.25):
         self._alpha = alpha
 
-    def __call__(self, event):
-        self._new_event = event*tukey(event.shape[-1], alpha=self._alpha)
+    def __call__(self, event, out=None):
+        self._new_event = np.multiply(event, tukey(event.shape[-1], alpha=self._alpha), out=out)
         return self._new_event
     
     @property
@@ -1,16 +1,95 @@
 import numpy as np
+import numba as nb
 
 from ..functionbase import FncBaseClass
 from ..processing.removebaseline import RemoveBaseline
 from ..processing.boxcarsmoothing import BoxCarSmoothing
 
-#### HAS NO TESTCASE YET ####
+@nb.njit
+def _mp_kernel(events: np.ndarray, smooth_length: int, bl_start: int, bl_stop: int, peak_start: int, peak_stop: int, edge: int):
+    # Calculates the main parameters for each trace of 'events' (2d array) 
+    # in one go, i.e. without allocating full-length temporary arrays except 
+    # for the smoothed trace. The results are identical to the step-by-step 
+    # numpy implementation in 'CalcMP._calc' (for a constant baseline model).
+    # Returns an array of shape (n_traces, 9), see 'CalcMP'.
+    n, length = events.shape
+    mp = np.empty((n, 9))
+    smooth = np.empty(length)
+    
+    # The moving average of BoxCarSmoothing (edge-padded convolution in 'same'
+    # mode) averages the samples [j-smooth_length+1+h, j+h]
+    h = (smooth_length - 1)//2
+
+    for k in range(n):
+        ev = events[k]
+
+        # Moving average as a running sum (indices outside of the trace are 
+        # clipped to the edges like for edge-padding)
+        s = 0.0
+        for q in range(-smooth_length+1+h, h+1):
+            s += ev[min(max(q, 0), length-1)]
+        smooth[0] = s/smooth_length
+        for j in range(1, length):
+            s += ev[min(j+h, length-1)] - ev[max(j-smooth_length+h, 0)]
+            smooth[j] = s/smooth_length
+        
+        # Linear drift, offset and (constant) baseline 
+        lin_drift = (np.mean(smooth[length-edge:]) - np.mean(smooth[:edge]))/length
+        offset = np.mean(ev[:edge])
+        baseline = np.mean(smooth[bl_start:bl_stop])
+        
+        # Peak search (first maximum like np.argmax)
+        t_max = peak_start
+        ph = smooth[peak_start] - baseline
+        for i in range(peak_start+1, peak_stop):
+            if smooth[i] - baseline > ph:
+                ph = smooth[i] - baseline
+                t_max = i
+        
+        # Last sample before the maximum below 20% of the pulse height
+        t0 = length - 1
+        for i in range(t_max-1, -1, -1):
+            if smooth[i] - baseline < 0.2*ph:
+                t0 = i
+                break
+        
+        # First sample between onset and maximum above 80% of the pulse height
+        t_rise = 0
+        for i in range(t0, t_max):
+            if smooth[i] - baseline > 0.8*ph:
+                t_rise = i
+                break
+        
+        # First samples after the maximum below 90%, 73.6% and 36.8% of the 
+        # pulse height (all are searched in the same loop)
+        t_decaystart, t_half, t_end = -1, -1, -1
+        for i in range(t_max, length):
+            v = smooth[i] - baseline
+            if t_decaystart < 0 and v < 0.9*ph: t_decaystart = i
+            if t_half < 0 and v < 0.736*ph: t_half = i
+            if t_end < 0 and v < 0.368*ph: t_end = i
+            if t_decaystart >= 0 and t_half >= 0 and t_end >= 0: break
+        
+        mp[k, 0] = ph
+        mp[k, 1] = t0
+        mp[k, 2] = t_rise
+        mp[k, 3] = t_max
+        # Like for np.argmax, index 0 means that no sample was found
+        mp[k, 4] = t_decaystart if t_decaystart > 0 else length - 1
+        mp[k, 5] = t_half if t_half > 0 else length - 1
+        mp[k, 6] = t_end if t_end > 0 else length - 1
+        mp[k, 7] = offset
+        mp[k, 8] = lin_drift
+    
+    return mp
+
 class CalcMP(FncBaseClass):
     """
     Calculates main parameters for an event. 
     If the argument ``dT`` is set to ``None``, the output is an array of shape ``(n_channels, 9)``, where the nine entries are ``ph, t_0, t_rise, t_max, t_decaystart, t_half, t_end, offset, lin_drift``, and quantities starting with ``t_`` are given as sample indices.
     If the argument ``dT`` is set (to the microsecond time base of the recording), the (human readable) quantities ``pulse_height (V), onset (ms), rise_time (ms), decay_time (ms), slope (V)`` as a tuple.
     Also works for multiple channels simultaneously.
+    For constant baseline models (the default), the calculation is done by a compiled kernel which processes each trace in a single pass (without keeping intermediate traces). Other baseline models are handled step-by-step using numpy.
 
     :param dt_us: The microsecond time base of the recording. If not provided, physical time constants cannot be computed and the function outputs indices. See above.
     :type dt_us: int, optional
@@ -76,8 +155,59 @@ class CalcMP(FncBaseClass):
         self._remove_baseline = RemoveBaseline(fit_baseline)
     
     def __call__(self, event):
+        event = np.asarray(event)
         length = event.shape[-1]
-        sl = slice(int(self._peak_bounds[0]*length), int(self._peak_bounds[1]*length))
+        bl_bounds = self._baseline_bounds(length)
+
+        # The fused kernel is used for constant baseline models (which is the
+        # default). Otherwise, we fall back to the numpy implementation
+        if bl_bounds is None:
+            mp = self._calc(event)
+        else:
+            sl = self._peak_slice(length)
+            mp = _mp_kernel(np.ascontiguousarray(event.reshape(-1, length), dtype=np.float64),
+                            self._box_car_smoothing._length,
+                            *bl_bounds,
+                            sl.start, sl.stop,
+                            int(self._edge_size*length)
+                            ).reshape(*event.shape[:-1], 9)
+
+        # If no time base is specified, the indices are returned (all in one numpy array)
+        if self._dt_us is None:
+            return mp
+        
+        else:
+            return (np.squeeze(mp[..., 0])[()],                                            # pulse height
+                    (np.squeeze((mp[..., 1] - length/4)*self._dt_us/1000))[()],            # onset (ms)
+                    (np.squeeze((mp[..., 2] - mp[..., 1])*self._dt_us/1000))[()],          # rise time (ms)
+                    (np.squeeze((mp[..., 6] - mp[..., 4])*self._dt_us/1000))[()],          # decay time (ms)
+                    (np.squeeze(mp[..., 8]*length))[()]                                    # slope (V)
+                    )
+    
+    def _peak_slice(self, length: int):
+        return slice(int(self._peak_bounds[0]*length), int(self._peak_bounds[1]*length))
+    
+    def _baseline_bounds(self, length: int):
+        # Returns the start and stop index of the region used for the constant
+        # baseline fit or None if the baseline model is not supported by the 
+        # fused kernel
+        fit_baseline = self._remove_baseline._fit_baseline
+        where = fit_baseline._where
+
+        if fit_baseline._model != 0: 
+            return None
+        if isinstance(where, float):
+            return 0, int(length*where)
+        if isinstance(where, slice) and where.step in [None, 1]:
+            return where.indices(length)[:2]
+        
+        return None
+    
+    def _calc(self, event):
+        # Step-by-step calculation of the main parameters (keeping the 
+        # intermediate results for the preview)
+        length = event.shape[-1]
+        sl = self._peak_slice(length)
         self._smooth_event = self._box_car_smoothing(event)
 
         self._lin_drift = (np.mean(self._smooth_event[..., -int(self._edge_size*length):], axis=-1, keepdims=True) - 
@@ -130,23 +260,14 @@ class CalcMP(FncBaseClass):
             axis=-1, keepdims=True)
         self._t_half[self._t_half == 0] = length - 1
 
-        # If no time base is specified, the indices are returned (all in one numpy array)
-        if self._dt_us is None:
-            return np.concatenate([self._ph, self._t0, self._t_rise, self._t_max, self._t_decaystart, self._t_half, self._t_end, self._offset, self._lin_drift], axis=-1)
-        
-        else:
-            return (np.squeeze(self._ph)[()],                                              # pulse height
-                    (np.squeeze((self._t0 - length/4)*self._dt_us/1000))[()],              # onset (ms)
-                    (np.squeeze((self._t_rise - self._t0)*self._dt_us/1000))[()],          # rise time (ms)
-                    (np.squeeze((self._t_end - self._t_decaystart)*self._dt_us/1000))[()], # decay time (ms)
-                    (np.squeeze(self._lin_drift*length))[()]                               # slope (V)
-                    )
+        return np.concatenate([self._ph, self._t0, self._t_rise, self._t_max, self._t_decaystart, self._t_half, self._t_end, self._offset, self._lin_drift], axis=-1)
+    
     @property
     def batch_support(self):
         return 'trivial'
     
     def preview(self, event) -> dict:
-        self(event)
+        self._calc(np.asarray(event))
         mp = np.concatenate([self._t0, self._t_rise, self._t_max, self._t_decaystart, self._t_half, self._t_end], axis=-1)
         x = np.arange(event.shape[-1])
         if self._dt_us is not None:
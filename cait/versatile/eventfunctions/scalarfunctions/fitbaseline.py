@@ -1,21 +1,75 @@
 from typing import Union, List
-import warnings
 
 import numpy as np
-from scipy.optimize import curve_fit
 
 from ..functionbase import FitFncBaseClass
 
-# We do not use scipy's parameter error estimation anyways so we can suppress this warning
-warnings.filterwarnings("ignore", "Covariance of the parameters could not be estimated")
-
 def exponential_decay(x, a, b, c):
     return a*np.exp(-b*x) + c
 
+def _fit_exponential(x: np.ndarray, y: np.ndarray, max_iter: int = 100):
+    # Least squares fit of 'exponential_decay' (with a, b >= 0) to all traces of
+    # 'y' (arbitrary leading dimensions) at once. For a fixed decay constant b,
+    # the model is linear in a and c, i.e. for a grid of b values, the optimal
+    # a and c are calculated in closed form and the best point is used as 
+    # starting point for a (projected) Levenberg-Marquardt optimization which 
+    # is done for all traces simultaneously. Returns the fit parameters and RMS.
+    shape = y.shape[:-1]
+    y = np.reshape(y, (-1, y.shape[-1])).astype(np.float64)
+    n = x.size
+
+    def cost(par):
+        return np.mean((y - exponential_decay(x, par[:, 0, None], par[:, 1, None], par[:, 2, None]))**2, axis=-1)
+
+    # Starting values from grid search over b (with linear least squares for a and c)
+    b_grid = np.geomspace(1e-2, 1e3, 51)/max(np.ptp(x), np.finfo(float).tiny)
+    e = np.exp(-b_grid[:, None]*x)
+    se, see = np.sum(e, axis=-1), np.sum(e**2, axis=-1)
+    sy, sey = np.sum(y, axis=-1, keepdims=True), y @ e.T
+    a = np.maximum((n*sey - se*sy)/(n*see - se**2), 0)
+    c = (sy - a*se)/n
+    ssr = np.sum(y**2, axis=-1, keepdims=True) - 2*a*sey - 2*c*sy + a**2*see + 2*a*c*se + n*c**2
+    best = np.argmin(ssr, axis=-1)
+    k = np.arange(y.shape[0])
+    par = np.stack([a[k, best], b_grid[best], c[k, best]], axis=-1)
+
+    # Levenberg-Marquardt with individual damping for each trace. Traces are 
+    # no longer updated once they converged (so the result does not depend on 
+    # the other traces in the batch)
+    lam = np.full(y.shape[0], 1e-3)
+    current = cost(par)
+    active = np.ones(y.shape[0], dtype=bool)
+    for _ in range(max_iter):
+        e = np.exp(-par[:, 1, None]*x)
+        r = y - (par[:, 0, None]*e + par[:, 2, None])
+        J = np.stack([e, -par[:, 0, None]*x*e, np.ones_like(e)], axis=-1)
+        JTJ = np.einsum("tni,tnj->tij", J, J)
+        JTr = np.einsum("tni,tn->ti", J, r)
+
+        # The (batched) pseudo-inverse also handles degenerate cases (e.g. a=0)
+        damped = JTJ + lam[:, None, None]*np.einsum("tii->ti", JTJ)[:, :, None]*np.eye(3)
+        step = (np.linalg.pinv(damped) @ JTr[..., None])[..., 0]
+        new = par + step
+        new[:, :2] = np.maximum(new[:, :2], 0)
+
+        new_cost = cost(new)
+        improved = (new_cost < current) & active
+        converged = np.abs(current - new_cost) <= 1e-12*current
+
+        par[improved] = new[improved]
+        current = np.where(improved, new_cost, current)
+        lam = np.where(improved, lam/10, lam*10)
+
+        active &= ~(converged | (lam > 1e10))
+        if not np.any(active): break
+
+    return par.reshape(*shape, 3), np.sqrt(current).reshape(shape)[()]
+
 class FitBaseline(FitFncBaseClass):
     """
     Fit voltage traces with a polynomial or decaying exponential and return the fit parameters as well as the RMS.
     Also works for multiple channels simultaneously.
+    Batches of traces are fitted at once: Polynomial fits are solved in closed form (using the pseudo-inverse of the design matrix which is calculated only once) and exponential fits use a vectorized Levenberg-Marquardt solver.
 
     :param model: Order of the polynomial or 'exponential'/'exp', defaults to 0, i.e. a constant baseline.
     :type model: Union[int, str]
@@ -72,40 +126,20 @@ class FitBaseline(FitFncBaseClass):
 
             # Exponential fit
             if self._model in ['exponential', 'exp']:
-                if np.array(event).ndim > 1:
-                    self._fitpar = np.array(
-                        [
-                          curve_fit(exponential_decay, 
-                                    self._xdata[self._where], 
-                                    event[k, self._where],
-                                    bounds=([0, 0, -np.inf],[np.inf,np.inf,np.inf]))[0]
-                          for k in range(np.array(event).shape[0])
-                        ]
-                    )
-                    
-                    self._rms = np.array(
-                        [
-                            np.sqrt(np.mean((event[k, self._where] - exponential_decay(self._xdata[self._where], *self._fitpar[k]))**2)) 
-                            for k in range(np.array(event).shape[0])
-                        ]
-                    ) 
-                
-                else:
-                    self._fitpar, *_ = curve_fit(exponential_decay, 
-                                                self._xdata[self._where], 
-                                                event[self._where],
-                                                bounds=([0, 0, -np.inf],[np.inf, np.inf, np.inf]))
-
-                    self._rms = np.sqrt(np.mean((event[self._where] - exponential_decay(self._xdata[self._where], *self._fitpar))**2))
+                self._fitpar, self._rms = _fit_exponential(self._xdata[self._where], np.array(event)[..., self._where])
             
             # Polynomial fit
             else:
+                # The pseudo-inverse of the design matrix is calculated only once
+                # such that the fits for all traces (of a batch) are a single matrix 
+                # multiplication
                 if self._A is None:
                     self._A = np.array([self._xdata[self._where]**k for k in range(self._model+1)]).T
+                    self._A_pinv = np.linalg.pinv(self._A)
 
-                par, err, *_ = np.linalg.lstsq(self._A, event[..., self._where].T, rcond=None)
-                self._fitpar = par.T
-                self._rms = np.sqrt(err)
+                y = np.array(event)[..., self._where]
+                self._fitpar = y @ self._A_pinv.T
+                self._rms = np.sqrt(np.sum((y - self._fitpar @ self._A.T)**2, axis=-1))[()]
 
         return self._fitpar, self._rms
     
@@ -115,28 +149,29 @@ class FitBaseline(FitFncBaseClass):
     
     def model(self, x: List, par: List):
         """
-        
+        Evaluate the baseline model for the given fit parameters. The parameters can have arbitrary leading dimensions (e.g. channels and/or events) which are kept in the output.
+
+        :param x: The x-data at which the model is evaluated.
+        :type x: List
+        :param par: The fit parameters (last dimension).
+        :type par: List
+
+        :return: The baseline model evaluated at ``x``.
+        :rtype: np.ndarray
         """
         par = np.array(par)
+        x = np.array(x)
         
         if self._model in ['exponential', 'exp']:
             if par.shape[-1] != 3:
                 raise ValueError(f"3 parameters are required to fully describe this model, {len(par)} given.")
                 
-            if par.ndim > 1: # i.e. we have multiple channels
-                return np.array([exponential_decay(x, *par[k]) for k in range(par.shape[0])])
-            else:
-                return exponential_decay(x, *par)
+            return exponential_decay(x, par[..., 0, None], par[..., 1, None], par[..., 2, None])
         else:
             if par.shape[-1] != self._model+1:
                 raise ValueError(f"{self._model+1} parameter(s) are required to fully describe this model.")
             
-            if par.ndim > 1: # i.e. we have multiple channels
-                return np.array(
-                    [np.sum(np.array([par[k][j]*x**j for j in range(self._model+1)]), axis=0) for k in range(par.shape[0])]
-                )
-            else:
-                return np.sum(np.array([par[k]*x**k for k in range(self._model+1)]), axis=0)
+            return par @ np.array([x**k for k in range(self._model+1)])
     
     def preview(self, event):
         # Call function (this will set all class attributes to be accessed for plotting)
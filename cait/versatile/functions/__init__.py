@@ -1,5 +1,7 @@
 from .file import combine, merge
-from .apply import apply
+from .apply import apply, apply_to_dh
+from .cache import ResultCache
 from .trigger.trigger_zscore import trigger_zscore
-from .trigger.trigger_of import trigger_of
+from .trigger.trigger_of import trigger_of, trigger_of_multi
+from .trigger.streamfilter import StreamFilter
 from .utils import timestamp_coincidence, sample_noise
\ No newline at end of file
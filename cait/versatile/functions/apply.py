@@ -1,20 +1,26 @@
-from typing import Callable
+from typing import Callable, Union, List
 from inspect import signature, _empty
-from multiprocessing import Pool
+from contextlib import nullcontext
+from collections import deque
+from multiprocessing import Pool, shared_memory
 import itertools
+import pickle
 
 import numpy as np
 from tqdm.auto import tqdm
 
 from ..iterators.iteratorbase import IteratorBaseClass
 from ..iterators.batchresolver import BatchResolver
+from .cache import ResultCache
 
-def apply(f: Callable, ev_iter: IteratorBaseClass, n_processes: int = 1):
+def apply(f: Callable, ev_iter: IteratorBaseClass, n_processes: int = 1, cache: Union[bool, ResultCache] = False):
     """
     Apply a function to events provided by an EventIterator. 
 
     Multiprocessing and resolving batches as returned by the iterator is done automatically. The function returns a numpy array where the first dimension corresponds to the events returned by the iterator. Higher dimensions are as returned by the function that is applied. Batches are resolved, i.e. calls with an `EventIterator(..., batch_size=1)` and `EventIterator(..., batch_size=100)` yield identical results. 
 
+    If multiple processes are used, the events are not sent to the worker processes. Instead, each worker reads its share of the events itself from a sliced copy of the iterator (which only contains the information needed to reconstruct it) and writes the results directly into shared memory. This requires that the iterator (including the processing added to it) can be pickled and that the outputs of `f` are numeric and have the same shape for all events. If this is not the case, the events and results are sent between processes instead (which is slower). In any case, the results are the same as for ``n_processes=1``.
+
     *Important*: Since `apply` uses multiprocessing, it is best not to use functions that are defined locally within jupyter lab, but rather to define them in a separate `.py` file and load them from the notebook. This is only relevant if you are trying to define your own function and not if you are just using already existing `cait` functions.
 
     :param f: Function to be applied to events. Note the restriction above.
@@ -23,6 +29,8 @@ def apply(f: Callable, ev_iter: IteratorBaseClass, n_processes: int = 1):
     :type ev_iter: `~class:cait.versatile.file.EventIterator`
     :param n_processes: Number of processes to use for multiprocessing.
     :type n_processes: int
+    :param cache: If a :class:`ResultCache` is given, the results are loaded from it if `f` was already applied to the same events (with the same processing) before. Otherwise, the results are calculated and stored in the cache. If True, a :class:`ResultCache` in the default directory is used. Defaults to False, i.e. no caching.
+    :type cache: Union[bool, ResultCache]
 
     :return: Results of `f` for all events in `ev_iter`. Has same structure as output of `f` (just with an additional event dimension).
     :rtype: Any
@@ -60,8 +68,25 @@ def apply(f: Callable, ev_iter: IteratorBaseClass, n_processes: int = 1):
     if n_req_args != 1:
         raise TypeError(f"Input function {f} has too many required arguments ({n_req_args}). Only functions which take one (non-default) argument (the event) are supported.")
     
+    # An empty ResultCache is falsy (it defines __len__), i.e. it has to be
+    # checked for explicitly
+    if cache is True: cache = ResultCache()
+    if cache is not False and cache is not None:
+        if not isinstance(cache, ResultCache):
+            raise TypeError(f"Input argument 'cache' must be a bool or an instance of {ResultCache} not '{type(cache)}'.")
+        key = cache.key(f, ev_iter)
+        out = cache.load(key)
+        if out is None:
+            out = apply(f, ev_iter, n_processes=n_processes)
+            cache.store(key, out)
+        return out
+
     if ev_iter.uses_batches: f = BatchResolver(f, ev_iter.n_channels)
 
+    if n_processes > 1:
+        out = _apply_shared(f, ev_iter, n_processes)
+        if out is not None: return out
+
     with ev_iter as ev_it:
         if n_processes > 1:
             with Pool(n_processes) as pool:
@@ -80,4 +105,273 @@ def apply(f: Callable, ev_iter: IteratorBaseClass, n_processes: int = 1):
     else:
         out = np.array(out)
 
-    return out
\ No newline at end of file
+    return out
+
+def apply_to_dh(f: Callable, 
+                ev_iter: IteratorBaseClass, 
+                dh, 
+                group: str, 
+                names: Union[str, List[str]], 
+                n_processes: int = 1, 
+                chunk_size: int = 1000,
+                dtype: str = None):
+    """
+    Apply a function to events provided by an EventIterator and write the results directly into datasets of an HDF5 file. 
+    
+    In contrast to :func:`apply`, the results are not collected in memory but written to the HDF5 file chunk by chunk as they are produced (the datasets are created beforehand). The memory usage is therefore independent of the number of events, which makes this function suitable for functions that return large arrays per event (e.g. filtered events) and for large datasets.
+
+    The datasets follow cait's convention: If the iterator has multiple channels and the output of `f` has the channels in its first dimension (as is the case for most functions in cait.versatile), the event dimension is the second dimension of the dataset, i.e. it has shape `(n_channels, n_events, ...)`. Otherwise, the event dimension is the first dimension. 
+
+    If multiple processes are used, each process reads and processes its chunks of events itself (see :func:`apply`) and the results are written to the HDF5 file by the main process. At most ``2*n_processes`` chunks are processed ahead of writing, so memory stays bounded even if writing is slower than processing.
+
+    :param f: Function to be applied to events. The outputs have to be numeric and have the same shape for all events.
+    :type f: Callable
+    :param ev_iter: Events for which the function should be applied.
+    :type ev_iter: `~class:cait.versatile.file.EventIterator`
+    :param dh: The DataHandler instance connected to the HDF5 file to write to.
+    :type dh: DataHandler
+    :param group: The group in the HDF5 file to write to. It is created if it does not exist yet.
+    :type group: str
+    :param names: The names of the datasets to create (one for each output of `f`). The datasets must not exist yet.
+    :type names: Union[str, List[str]]
+    :param n_processes: Number of processes to use for multiprocessing.
+    :type n_processes: int
+    :param chunk_size: The number of events whose results are kept in memory before they are written to the HDF5 file. Defaults to 1000.
+    :type chunk_size: int
+    :param dtype: The data type of the datasets. If none is specified, "bool" and "float32" are used for boolean and numeric outputs, respectively (like in :meth:`DataHandler.set`).
+    :type dtype: str, optional
+
+    **Example:**
+    ::
+        import cait as ai
+        import cait.versatile as vai
+
+        dh = ai.DataHandler(...)
+        it = dh.get_event_iterator("events", batch_size=100)
+
+        # Write the baseline subtracted events to dataset 'event_rmbl' and
+        # the main parameters to datasets 'ph', 't0', ... in group 'events'
+        vai.apply_to_dh(vai.RemoveBaseline(), it, dh, "events", "event_rmbl")
+        vai.apply_to_dh(vai.CalcMP(dt_us=it.dt_us), it, dh, "events", 
+                        ["ph", "t0", "t_rise", "t_decay", "lin_slope"])
+    """
+    if not isinstance(ev_iter, IteratorBaseClass):
+        raise TypeError(f"Input argument 'ev_iter' must be an instance of {IteratorBaseClass} not '{type(ev_iter)}'.")
+    if len(ev_iter)==0:
+        raise IndexError(f"Input argument 'ev_iter' must contain at least 1 event (iterator is empty).")
+    if not callable(f):
+        raise TypeError(f"Input argument 'f' must be callable.")
+    
+    if isinstance(names, str): names = [names]
+
+    if ev_iter.uses_batches: f = BatchResolver(f, ev_iter.n_channels)
+
+    multiple, first = _probe_output(f, ev_iter)
+    if any(x.dtype.kind not in "biufc" for x in first):
+        raise TypeError("Only numeric outputs can be written to an HDF5 file.")
+    if len(first) != len(names):
+        raise ValueError(f"The function has {len(first)} output(s) but {len(names)} name(s) were given.")
+
+    n_events = len(ev_iter)
+    n_channels = ev_iter.n_channels
+    
+    # For outputs with channels in the first dimension, the event dimension is 
+    # the second one in the HDF5 file (cait convention)
+    channels_first = [n_channels > 1 and x.ndim > 0 and x.shape[0] == n_channels for x in first]
+    specs = [(x.shape, x.dtype) for x in first]
+
+    with dh.get_filehandle(mode="r+") as h5f:
+        hdf5group = h5f.require_group(group)
+        for name in names:
+            if name in hdf5group.keys():
+                raise ValueError(f"Dataset '{name}' already exists in group '{group}'. If you want to overwrite it, delete it first using dh.drop('{group}', '{name}')")
+        
+        datasets = []
+        for name, x, cf in zip(names, first, channels_first):
+            ds_dtype = dtype if dtype is not None else ("bool" if x.dtype == bool else "float32")
+            shape = (x.shape[0], n_events, *x.shape[1:]) if cf else (n_events, *x.shape)
+            datasets.append(hdf5group.create_dataset(name, shape=shape, dtype=ds_dtype))
+        
+        tasks = _split_tasks(ev_iter, chunk_size)
+
+        if n_processes > 1:
+            try:
+                pickle.dumps(tasks[0][1])
+            except Exception:
+                raise TypeError("The iterator cannot be pickled (e.g. because a locally defined function was added as processing). Use 'n_processes=1' in this case.")
+            
+            pool = Pool(n_processes, initializer=_init_worker, initargs=(f, specs, multiple, False))
+            # Only a few chunks are processed ahead of writing such that memory
+            # stays bounded if writing is slower than processing
+            results = _bounded_imap(pool, _apply_chunk_worker, tasks, 2*n_processes)
+        else:
+            pool = nullcontext()
+            results = (_apply_chunk(f, specs, multiple, task) for task in tasks)
+
+        with pool, tqdm(total=n_events) as pbar:
+            for start, outputs in results:
+                n = len(outputs[0])
+                for ds, out, cf in zip(datasets, outputs, channels_first):
+                    if cf:
+                        ds[:, start:start+n] = np.moveaxis(out, 0, 1)
+                    else:
+                        ds[start:start+n] = out
+                pbar.update(n)
+
+def _bounded_imap(pool: Pool, f: Callable, tasks: list, max_pending: int):
+    # Like pool.imap, but at most 'max_pending' tasks are submitted whose 
+    # results were not consumed yet
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(f, (task,)))
+        if len(pending) == max_pending: yield pending.popleft().get()
+    while pending: yield pending.popleft().get()
+
+# Function and output arrays of the worker processes 
+_worker = dict()
+
+def _init_worker(f: Callable, specs: list, multiple: bool, shared: bool = True):
+    # 'specs' holds tuples (name of shared memory, shape, dtype) of the output 
+    # arrays if 'shared' is True and tuples (shape, dtype) of the output of a
+    # single event otherwise
+    _worker["f"] = f
+    _worker["multiple"] = multiple
+    _worker["specs"] = specs
+
+    if shared:
+        # Keep references to the shared memory blocks as long as the arrays are used
+        _worker["shms"] = [shared_memory.SharedMemory(name=name) for name, *_ in specs]
+        _worker["outputs"] = [np.ndarray(shape, dtype=dtype, buffer=shm.buf) 
+                              for shm, (_, shape, dtype) in zip(_worker["shms"], specs)]
+
+def _split_tasks(ev_iter: IteratorBaseClass, task_size: int, first: int = 0):
+    # Splits the events (starting at index 'first') into tasks of whole batches 
+    # (of at least 'task_size' events). Each task is a tuple of the index of its 
+    # first event and a sliced copy of the iterator (which is cheap to send to 
+    # other processes)
+    n_events = len(ev_iter)
+    batch_size = max(1, round(n_events/ev_iter.n_batches))
+    task_size = batch_size*int(np.ceil(task_size/batch_size))
+
+    return [(start, ev_iter[:, start:start+task_size]) for start in range(first, n_events, task_size)]
+
+def _probe_output(f: Callable, ev_iter: IteratorBaseClass):
+    # Determines the structure of the output of 'f' (already resolving batches) 
+    # from the first event. Returns whether 'f' has multiple outputs and a list 
+    # of the outputs as arrays
+    with ev_iter[:, :1] as it:
+        first = f(next(iter(it)))
+        if ev_iter.uses_batches: first = first[0]
+
+    multiple = isinstance(first, tuple)
+
+    return multiple, [np.asarray(x) for x in (first if multiple else (first,))]
+
+class _OutputMismatch(TypeError):
+    # Raised if the output of an event does not fit into the output arrays
+    # (which are set up according to the output of the first event)
+    pass
+
+def _storage_dtype(dtype: np.dtype):
+    # The widest data type of the same kind as 'dtype'. Outputs are stored with
+    # this type such that later events can return wider types (e.g. float64 
+    # after float32) without loss. The arrays are cast to the actual result type
+    # in the end
+    dtype = np.dtype(dtype)
+    if dtype.kind in "fc": return np.promote_types(dtype, np.float64 if dtype.kind == "f" else np.complex128)
+    if dtype == np.uint64: return dtype
+    return np.dtype(np.int64)
+
+def _allocate_outputs(specs: list, n: int):
+    # Allocates output arrays for n events (specs is a list of tuples of the 
+    # output shape and dtype of a single event)
+    return [np.empty((n, *shape), dtype=_storage_dtype(dtype)) for shape, dtype in specs]
+
+def _fill_outputs(f: Callable, it: IteratorBaseClass, outputs: list, multiple: bool, start: int = 0):
+    # Applies the function to the events of the (sliced) iterator and writes 
+    # the results into 'outputs' (starting at index 'start'). Returns the result
+    # data types (promoted over all events) for each output
+    dtypes = [None]*len(outputs)
+    i = start
+    with it as opened_it:
+        for ev in opened_it:
+            results = f(ev) if it.uses_batches else [f(ev)]
+            for res in results:
+                if isinstance(res, tuple) != multiple or (multiple and len(res) != len(outputs)):
+                    raise _OutputMismatch(f"The function returns a different number of outputs for event {i} than for the first event.")
+                for k, (out, x) in enumerate(zip(outputs, res if multiple else (res,))):
+                    x = np.asarray(x)
+                    if x.shape != out.shape[1:] or not np.can_cast(x.dtype, out.dtype, "safe"):
+                        raise _OutputMismatch(f"The output of the function for event {i} (shape {x.shape}, data type {x.dtype}) does not fit into the output array (shape {out.shape[1:]}, data type {out.dtype}) set up for the first event. Make sure that the function returns the same shape and type for all events.")
+                    out[i] = x
+                    dtypes[k] = x.dtype if dtypes[k] is None else np.promote_types(dtypes[k], x.dtype)
+                i += 1
+    
+    return dtypes
+
+def _apply_chunk(f: Callable, specs: list, multiple: bool, task: tuple):
+    # Returns the index of the first event and the results for a task
+    start, it = task
+    outputs = _allocate_outputs(specs, len(it))
+    _fill_outputs(f, it, outputs, multiple)
+
+    return start, outputs
+
+def _apply_shared_worker(task: tuple):
+    # Writes the results for a task into the shared output arrays and returns
+    # the number of events and the result data types
+    start, it = task
+    dtypes = _fill_outputs(_worker["f"], it, _worker["outputs"], _worker["multiple"], start)
+
+    return len(it), dtypes
+
+def _apply_chunk_worker(task: tuple):
+    # Returns the results for a task (to be written by the main process)
+    return _apply_chunk(_worker["f"], _worker["specs"], _worker["multiple"], task)
+
+def _apply_shared(f: Callable, ev_iter: IteratorBaseClass, n_processes: int):
+    # Applies 'f' (already resolving batches) to 'ev_iter' using worker processes 
+    # which read the events themselves and write the results to shared memory.
+    # Returns None if this is not possible (in which case 'apply' falls back to
+    # sending events and results between processes, which gives the same results)
+    n_events = len(ev_iter)
+
+    try:
+        pickle.dumps(ev_iter[:, :1])
+    except Exception:
+        return None
+
+    multiple, first = _probe_output(f, ev_iter)
+    if any(x.dtype.kind not in "biufc" for x in first): return None
+
+    # The first event was already processed. Several tasks per process for load balancing
+    tasks = _split_tasks(ev_iter, int(np.ceil(n_events/(8*n_processes))), first=1)
+    dtypes = [x.dtype for x in first]
+
+    shms, specs = [], []
+    try:
+        for x in first:
+            shape = (n_events, *x.shape)
+            dtype = _storage_dtype(x.dtype)
+            shms.append(shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape))*dtype.itemsize)))
+            specs.append((shms[-1].name, shape, dtype))
+            np.ndarray(shape, dtype=dtype, buffer=shms[-1].buf)[0] = x
+
+        with Pool(n_processes, initializer=_init_worker, initargs=(f, specs, multiple)) as pool:
+            with tqdm(total=n_events, initial=1) as pbar:
+                for n, task_dtypes in pool.imap_unordered(_apply_shared_worker, tasks):
+                    dtypes = [a if b is None else np.promote_types(a, b) for a, b in zip(dtypes, task_dtypes)]
+                    pbar.update(n)
+
+        # Copy the results (with the data types a serial 'apply' would give) 
+        # such that the shared memory can be released
+        out = tuple(np.ndarray(shape, dtype=dtype, buffer=shm.buf).astype(res_dtype) 
+                    for shm, (_, shape, dtype), res_dtype in zip(shms, specs, dtypes))
+    except _OutputMismatch:
+        return None
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    return out if multiple else out[0]
@@ -0,0 +1,273 @@
+from typing import Callable, Any
+from inspect import signature
+import os
+import types
+import pickle
+import hashlib
+import functools
+
+import numpy as np
+
+from ..iterators.iteratorbase import IteratorBaseClass, IteratorCollection
+from ..eventfunctions.functionbase import FncBaseClass
+
+class ResultCache:
+    """
+    On-disk cache for the results of :func:`apply`. Results are stored under a key which is calculated from the data source and the events of the iterator (see below), the processing added to the iterator, and the function that is applied. If :func:`apply` is called again with unchanged inputs, the results are loaded from disk instead of recalculated.
+
+    The cache has a maximum size. If it is exceeded, the least recently used results are removed.
+
+    The key identifies files (e.g. HDF5 or stream files) by their path, size and time of the last modification, i.e. results are recalculated if a file changes. Data which is held in memory (e.g. numpy arrays) is identified by its content and functions are identified by their class and constructor arguments (like in their ``repr``, but including the full content of arrays) or, for plain Python functions, by their code. Note that this means that changes in functions which are called by the applied function (but not part of it) are not detected.
+
+    :param directory: The directory in which the results are stored. It is created if it does not exist. Defaults to None, in which case ``$XDG_CACHE_HOME/cait/apply`` (or ``~/.cache/cait/apply``) is used.
+    :type directory: str, optional
+    :param max_size: The maximum size of the cache in bytes. Defaults to 2**30 (1 GiB).
+    :type max_size: int, optional
+
+    **Example:**
+    ::
+        import cait as ai
+        import cait.versatile as vai
+
+        dh = ai.DataHandler(...)
+        it = dh.get_event_iterator("events", batch_size=100)
+
+        # The first call calculates the main parameters and stores them in the cache,
+        # the second call just loads them from disk
+        cache = vai.ResultCache("path/to/cache", max_size=10*2**30)
+        mp = vai.apply(vai.CalcMP(), it, cache=cache)
+        mp = vai.apply(vai.CalcMP(), it, cache=cache)
+
+        # Alternatively, use the default cache directory
+        mp = vai.apply(vai.CalcMP(), it, cache=True)
+    """
+    def __init__(self, directory: str = None, max_size: int = 2**30):
+        if directory is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+            directory = os.path.join(cache_home, "cait", "apply")
+        if max_size <= 0:
+            raise ValueError(f"'max_size' has to be positive, got {max_size}.")
+
+        self._directory = directory
+        self._max_size = max_size
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(directory={self._directory}, max_size={self._max_size})"
+
+    def __len__(self):
+        return len(self._entries())
+
+    def key(self, f: Callable, ev_iter: IteratorBaseClass):
+        """
+        Calculate the key under which the results of ``apply(f, ev_iter)`` are stored.
+
+        :param f: The function that is applied.
+        :type f: Callable
+        :param ev_iter: The iterator the function is applied to.
+        :type ev_iter: IteratorBaseClass
+
+        :return: The key (a hexadecimal hash).
+        :rtype: str
+        """
+        h = hashlib.blake2b(digest_size=20)
+        _fingerprint((ev_iter, f), h, set())
+
+        return h.hexdigest()
+
+    def load(self, key: str):
+        """
+        Load results from the cache.
+
+        :param key: The key of the results (see :meth:`key`).
+        :type key: str
+
+        :return: The results or None if no results are stored under this key.
+        :rtype: Any
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+        # Mark as recently used
+        os.utime(path)
+
+        return value
+
+    def store(self, key: str, value: Any):
+        """
+        Store results in the cache. If the cache exceeds its maximum size afterwards, the least recently used results are removed.
+
+        :param key: The key of the results (see :meth:`key`).
+        :type key: str
+        :param value: The results.
+        :type value: Any
+        """
+        path = self._path(key)
+
+        # Write to a temporary file first such that other processes never
+        # read incomplete results
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+        self._evict()
+
+    def clear(self):
+        """
+        Remove all results from the cache.
+        """
+        for path, *_ in self._entries():
+            _remove(path)
+
+    @property
+    def size(self):
+        """
+        The size of the cache in bytes.
+        """
+        return sum(size for _, size, _ in self._entries())
+
+    @property
+    def directory(self):
+        """
+        The directory in which the results are stored.
+        """
+        return self._directory
+
+    def _path(self, key: str):
+        return os.path.join(self._directory, f"{key}.pkl")
+
+    def _entries(self):
+        # Returns a list of tuples (path, size, time of last use) of all results
+        entries = []
+        with os.scandir(self._directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".pkl"): continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime_ns))
+
+        return entries
+
+    def _evict(self):
+        # Removes the least recently used results until the maximum size is met
+        entries = sorted(self._entries(), key=lambda x: x[2])
+        total = sum(size for _, size, _ in entries)
+
+        for path, size, _ in entries:
+            if total <= self._max_size: break
+            _remove(path)
+            total -= size
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _fingerprint(obj: Any, h, seen: set):
+    # Feeds a representation of 'obj' into the hash object 'h' which only
+    # depends on the content of 'obj' (and not e.g. on memory addresses).
+    # 'seen' holds the ids of the objects already visited (to break cycles).
+    def update(*args):
+        h.update(repr(args).encode())
+
+    if obj is None or isinstance(obj, (bool, int, float, complex, bytes, np.generic)):
+        update(type(obj).__name__, obj)
+
+    elif isinstance(obj, str):
+        update("str", obj)
+        # Files are identified by their size and the time of the last modification
+        if os.path.isfile(obj):
+            stat = os.stat(obj)
+            update("file", stat.st_size, stat.st_mtime_ns)
+
+    elif isinstance(obj, slice):
+        update("slice", obj.start, obj.stop, obj.step)
+
+    elif isinstance(obj, np.memmap) and isinstance(obj.filename, str):
+        # The content of memory mapped files is not read
+        update("memmap", obj.dtype.str, obj.shape, obj.strides, obj.offset)
+        _fingerprint(obj.filename, h, seen)
+
+    elif isinstance(obj, np.ndarray):
+        update("ndarray", obj.dtype.str, obj.shape)
+        if obj.dtype.hasobject:
+            for x in obj.flat: _fingerprint(x, h, seen)
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+
+    elif id(obj) in seen:
+        update("cycle", type(obj).__qualname__)
+
+    else:
+        seen.add(id(obj))
+
+        if isinstance(obj, (list, tuple)):
+            update(type(obj).__name__, len(obj))
+            for x in obj: _fingerprint(x, h, seen)
+
+        elif isinstance(obj, (set, frozenset)):
+            update(type(obj).__name__, sorted(repr(x) for x in obj))
+
+        elif isinstance(obj, dict):
+            update("dict", len(obj))
+            for k in sorted(obj.keys(), key=repr):
+                _fingerprint(k, h, seen)
+                _fingerprint(obj[k], h, seen)
+
+        elif isinstance(obj, IteratorCollection):
+            update("IteratorCollection")
+            _fingerprint(obj.iterators, h, seen)
+            _fingerprint(obj.fncs, h, seen)
+
+        elif isinstance(obj, IteratorBaseClass):
+            # Batch size, prefetching and caching do not change the events
+            params, _ = obj._slice_info
+            update(type(obj).__qualname__)
+            _fingerprint({k: v for k, v in params.items() if k not in ["batch_size", "prefetch", "cache_size"]}, h, seen)
+            _fingerprint(obj.fncs, h, seen)
+
+        elif isinstance(obj, FncBaseClass):
+            # Functions are identified by the arguments they were constructed with
+            update(type(obj).__module__, type(obj).__qualname__)
+            if hasattr(obj, "_init_args"):
+                _fingerprint(obj._init_args, h, seen)
+            else:
+                for k in signature(obj.__init__).parameters.keys():
+                    if hasattr(obj, "_"+k):
+                        update(k)
+                        _fingerprint(getattr(obj, "_"+k), h, seen)
+
+        elif isinstance(obj, functools.partial):
+            update("partial")
+            _fingerprint((obj.func, obj.args, obj.keywords), h, seen)
+
+        elif isinstance(obj, types.MethodType):
+            update("method")
+            _fingerprint((obj.__func__, obj.__self__), h, seen)
+
+        elif isinstance(obj, types.FunctionType):
+            code = obj.__code__
+            update("function", obj.__module__, obj.__qualname__, code.co_code, code.co_names)
+            closure = [c.cell_contents for c in obj.__closure__] if obj.__closure__ else []
+            _fingerprint((code.co_consts, obj.__defaults__, obj.__kwdefaults__, closure), h, seen)
+
+        elif isinstance(obj, types.CodeType):
+            update("code", obj.co_code, obj.co_names)
+            _fingerprint(obj.co_consts, h, seen)
+
+        elif hasattr(obj, "__dict__"):
+            # Generic objects (e.g. data sources) are identified by their attributes
+            update(type(obj).__module__, type(obj).__qualname__)
+            _fingerprint(vars(obj), h, seen)
+
+        else:
+            update(type(obj).__qualname__, repr(obj))
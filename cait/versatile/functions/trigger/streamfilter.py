@@ -0,0 +1,105 @@
+import numpy as np
+
+from ...eventfunctions.processing.optimumfiltering import _FFT_OUT
+
+class StreamFilter:
+    """
+    Filter engine for (long) stream data which convolves the data with the time-domain kernel of an optimum filter using the overlap-save algorithm. The spectrum of the kernel is calculated only once (when the object is constructed) and the data is filtered in blocks of size ``fft_size`` which are all transformed at once. If ``block_size`` is given, the buffers needed to filter data of this length (input, spectra, filtered blocks and output) are allocated once and reused for all subsequent calls. The spectra are multiplied with the kernel in place and, for numpy>=2.0, the FFTs write directly into the buffers (for older numpy versions, the FFTs allocate their results). This makes the class well suited for filtering a stream chunk by chunk (like it is done for triggering).
+
+    Calling the object returns the 'valid' part of the convolution (like ``scipy.signal.oaconvolve(data, kernel, mode='valid')``), i.e. an array of length ``len(data) - record_length + 1`` whose first entry corresponds to sample ``record_length - 1`` of ``data``.
+
+    :param of: The optimum filter (in frequency domain). The record length of the filter is ``2*(len(of)-1)``.
+    :type of: np.ndarray
+    :param block_size: The length of the data that is going to be filtered. If given, the buffers for this length are preallocated and reused. Note that in this case, the array returned by a call is overwritten by the next call with data of the same length (copy it if you want to keep it). Data of different lengths can still be filtered (the buffers are allocated for each call then). Defaults to None.
+    :type block_size: int, optional
+    :param fft_size: The size of the FFTs used for the overlap-save algorithm. Has to be larger than the record length of the filter. Defaults to None, i.e. the next power of 2 which is larger than or equal to 4 times the record length.
+    :type fft_size: int, optional
+
+    **Example:**
+    ::
+        import numpy as np
+        import cait.versatile as vai
+
+        of = vai.MockData().of[0]
+        stream_filter = vai.StreamFilter(of, block_size=2**20)
+
+        # Filter the first 2**20 samples of a channel of a stream
+        stream = vai.Stream(hardware="vdaq2", src="path/to/stream_file.bin")
+        filtered = stream_filter(stream["ADC1", :2**20, "as_voltage"])
+    """
+    def __init__(self, of: np.ndarray, block_size: int = None, fft_size: int = None):
+        of = np.array(of)
+        if of.ndim != 1:
+            raise ValueError(f"Only single-channel filters are supported (i.e. 'of' has to be 1d), got shape {of.shape}.")
+
+        # Time-domain kernel of the filter (has length record_length)
+        self._kernel = np.fft.irfft(of)
+        self._record_length = self._kernel.size
+
+        if fft_size is None: fft_size = int(2**np.ceil(np.log2(4*self._record_length)))
+        if fft_size <= self._record_length:
+            raise ValueError(f"'fft_size' ({fft_size}) has to be larger than the record length of the filter ({self._record_length}).")
+
+        self._fft_size = fft_size
+        # Number of valid output samples per block
+        self._step = fft_size - self._record_length + 1
+        # Spectrum of the zero-padded kernel (calculated only once)
+        self._kernel_fft = np.fft.rfft(self._kernel, fft_size)
+
+        self._block_size = block_size
+        if block_size is not None: self._buffers = self._allocate(block_size)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(record_length={self._record_length}, fft_size={self._fft_size}, block_size={self._block_size})"
+
+    def __call__(self, data: np.ndarray):
+        n = data.shape[-1]
+        if data.ndim != 1:
+            raise ValueError(f"Only 1d data is supported, got shape {data.shape}.")
+        if n < self._record_length:
+            raise ValueError(f"The data has to be at least as long as the record length of the filter ({self._record_length}), got {n}.")
+
+        padded, spectra, filtered, out = self._buffers if n == self._block_size else self._allocate(n)
+
+        # Copy the data into the zero-padded input buffer
+        padded[:n] = data
+        padded[n:] = 0
+
+        # The blocks overlap by record_length-1 samples. They are views into the
+        # input buffer (no copy) and are all transformed at once
+        blocks = np.lib.stride_tricks.sliding_window_view(padded, self._fft_size)[::self._step]
+        if _FFT_OUT:
+            np.fft.rfft(blocks, axis=-1, out=spectra)
+        else:
+            spectra[:] = np.fft.rfft(blocks, axis=-1)
+        spectra *= self._kernel_fft
+
+        if _FFT_OUT:
+            np.fft.irfft(spectra, n=self._fft_size, axis=-1, out=filtered)
+        else:
+            filtered[:] = np.fft.irfft(spectra, n=self._fft_size, axis=-1)
+
+        # The first record_length-1 samples of each block are corrupted by the
+        # circular convolution and are discarded. The remaining 'step' samples
+        # of each block are written to consecutive rows of the output buffer
+        out.reshape(-1, self._step)[:] = filtered[:, self._record_length-1:]
+
+        return out[:n - self._record_length + 1]
+
+    def _allocate(self, n: int):
+        # Allocates the zero-padded input buffer, the spectra and filtered blocks 
+        # and the output array (a multiple of the block step) for data of length n
+        n_out = n - self._record_length + 1
+        n_blocks = -(-n_out//self._step)
+
+        return (np.zeros((n_blocks-1)*self._step + self._fft_size), 
+                np.empty((n_blocks, self._fft_size//2 + 1), dtype=complex),
+                np.empty((n_blocks, self._fft_size)),
+                np.empty(n_blocks*self._step))
+
+    @property
+    def record_length(self):
+        """
+        The record length of the filter (i.e. the length of its time-domain kernel).
+        """
+        return self._record_length
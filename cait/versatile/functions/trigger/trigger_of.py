@@ -2,29 +2,34 @@ from typing import Union, List
 from functools import partial
 
 import numpy as np
-import scipy as sp
 
-from .triggerbase import trigger_base
+from .triggerbase import trigger_base, trigger_base_multi, _merge_triggers
+from .streamfilter import StreamFilter
 
 ####################################################
 ### FUNCTIONS IN THIS FILE HAVE NO TESTCASES YET ###
 ####################################################
 
-def filter_chunk(data: np.ndarray, of: np.ndarray, record_length: int):
+def filter_chunk(data: np.ndarray, of: Union[np.ndarray, StreamFilter], record_length: int):
     """
-    Filters 'data' with an optimum filter 'of' according to the overlap-add-algorithm.
+    Filters 'data' with an optimum filter 'of' according to the overlap-save-algorithm.
 
     :param data: The data to filter.
     :type data: np.ndarray
-    :param of: The filter to use.
-    :type of: np.ndarray
+    :param of: The filter to use. If a :class:`StreamFilter` is given, the spectrum of the filter kernel and the buffers are reused, which is much faster if many chunks are filtered.
+    :type of: Union[np.ndarray, StreamFilter]
     :param record_length: The record length as determined by the filter length (this determines, how many samples are discarded in the beginning and end of the data to avoid edge effects).
     :type record_length: int
 
     :return: Filtered chunk
     :rtype: np.ndarray
     """
-    return sp.signal.oaconvolve(data, np.fft.irfft(of))[record_length:-record_length]
+    stream_filter = of if isinstance(of, StreamFilter) else StreamFilter(of)
+
+    # The valid part of the convolution starts at sample record_length-1. 
+    # To discard record_length samples on either side of the full convolution, 
+    # we drop the first and last sample of the valid part.
+    return stream_filter(data)[1:-1]
 
 def trigger_of(stream, 
                key: str, 
@@ -32,7 +37,9 @@ def trigger_of(stream,
                of: np.ndarray, 
                n_triggers: int = None,
                chunk_size: int = 100,
-               apply_first: Union[callable, List[callable]] = None):
+               apply_first: Union[callable, List[callable]] = None,
+               n_processes: int = 1,
+               checkpoint: str = None):
     """
     Trigger a single channel of a stream object using the optimum filter triggering algorithm described in https://edoc.ub.uni-muenchen.de/23762/. 
 
@@ -50,6 +57,10 @@ def trigger_of(stream,
     :type chunk_size: int
     :param apply_first: A function or list of functions to be applied to the stream data BEFORE the filter function is applied. E.g. ``lambda x: -x`` to trigger on the inverted stream.
     :type apply_first: Union[callable, List[callable]], optional
+    :param n_processes: The number of processes to use for the triggering. The stream is split into search areas which are processed in parallel. The result is identical to the one obtained with a single process. Defaults to 1.
+    :type n_processes: int, optional
+    :param checkpoint: Path to an HDF5 file in which the state of the triggering is stored (in the group ``trigger_checkpoint/{key}``). If the file already contains a checkpoint for this channel, the triggering resumes from there, i.e. only data which was not processed before is triggered. This is useful for streams which are still being written (e.g. during data taking). The file can also be the HDF5 file of a :class:`DataHandler`. See :func:`trigger_base` for details. Defaults to None, i.e. no checkpoint is used.
+    :type checkpoint: str, optional
 
     :return: Tuple of trigger indices and trigger heights.
     :rtype: Tuple[List[int], List[float]]
@@ -75,7 +86,9 @@ def trigger_of(stream,
     record_length = 2*(of.shape[-1] - 1)
 
     # before samples exceeding threshold are searched, the chunks are filtered
-    filter_fnc = partial(filter_chunk, of=of, record_length=record_length)
+    # (the filter is prepared for the size of the chunks used in 'trigger_base')
+    stream_filter = StreamFilter(of, block_size=(chunk_size + 3)*record_length)
+    filter_fnc = partial(filter_chunk, of=stream_filter, record_length=record_length)
 
     return trigger_base(stream=stream, 
                         key=key, 
@@ -84,4 +97,82 @@ def trigger_of(stream,
                         record_length=record_length,
                         n_triggers=n_triggers,
                         chunk_size=chunk_size,
-                        apply_first=apply_first)
\ No newline at end of file
+                        apply_first=apply_first,
+                        n_processes=n_processes,
+                        checkpoint=checkpoint)
+
+def trigger_of_multi(stream, 
+                     keys: List[str], 
+                     thresholds: List[float], 
+                     ofs: Union[List[np.ndarray], np.ndarray], 
+                     coincidence_interval: int = None,
+                     n_triggers: int = None,
+                     chunk_size: int = 100,
+                     apply_first: Union[callable, List[callable]] = None):
+    """
+    Trigger multiple channels of a stream object using the optimum filter triggering algorithm described in https://edoc.ub.uni-muenchen.de/23762/. The stream is traversed only once, i.e. each chunk of the stream is read and filtered for all channels before moving on to the next one. The triggers of the individual channels are identical to the ones obtained with :func:`trigger_of`. Additionally, they are merged into a list of events: Triggers of different channels which lie within ``coincidence_interval`` samples of the first trigger of an event are assigned to the same event, and the event is assigned to the channel with the largest trigger height relative to its threshold (the dominant channel).
+
+    :param stream: The stream object with the channels to trigger.
+    :type stream: StreamBaseClass
+    :param keys: The names of the channels in 'stream' to trigger.
+    :type keys: List[str]
+    :param thresholds: The thresholds (in Volts) above which events should be triggered (one for each channel).
+    :type thresholds: List[float]
+    :param ofs: The optimum filters to be used for filtering (one for each channel). All filters must have the same length (i.e. they have to correspond to the same record length). It is assumed that the filters' first entries are set to zero to correctly remove the offset.
+    :type ofs: Union[List[np.ndarray], np.ndarray]
+    :param coincidence_interval: The number of samples within which triggers of different channels are assigned to the same event. Defaults to None, i.e. half the record length (which is the dead-time of a channel after a trigger).
+    :type coincidence_interval: int, optional
+    :param n_triggers: The number of events to trigger in any of the channels (might be more, depending on 'chunk_size'). E.g. useful to look at the first 100 triggered events. Defaults to None, i.e. all events in the stream are triggered
+    :type n_triggers: int
+    :param chunk_size: The number of record windows that are processed (i.e. filter + peak search) at a time.
+    :type chunk_size: int
+    :param apply_first: A function or list of functions to be applied to the stream data of all channels BEFORE the filter function is applied. E.g. ``lambda x: -x`` to trigger on the inverted stream.
+    :type apply_first: Union[callable, List[callable]], optional
+
+    :return: Tuple of the triggers of the individual channels and the merged events. The former is a dictionary which holds tuples of trigger indices and trigger heights for each key. The latter is a dictionary with keys ``inds`` (the event indices), ``channels`` (the keys of the dominant channels) and ``vals`` (the trigger heights of all channels for each event, NaN if a channel did not trigger, shape ``(n_events, n_channels)``).
+    :rtype: Tuple[dict, dict]
+
+    **Example:**
+    ::
+        import cait.versatile as vai
+
+        # Construct stream object
+        stream = vai.Stream(hardware="vdaq2", src="path/to/stream_file.bin")
+        # Get optimum filters from somewhere (e.g. from an OF object of the 
+        # two channels which you created before)
+        ofs = [of_phonon, of_light]
+        
+        # Perform triggering
+        triggers, events = vai.trigger_of_multi(stream, ["ADC1", "ADC2"], [0.1, 0.2], ofs)
+        # Get timestamps of triggers in the first channel
+        timestamps_phonon = stream.time[triggers["ADC1"][0]]
+        # Get timestamps of the merged events
+        timestamps = stream.time[events["inds"]]
+    """
+    if len(set([np.array(of).shape[-1] for of in ofs])) != 1:
+        raise ValueError("All optimum filters in 'ofs' must have the same length.")
+    
+    # size of record window (as determined by the size of the filters)
+    record_length = 2*(np.array(ofs[0]).shape[-1] - 1)
+
+    if coincidence_interval is None: coincidence_interval = record_length//2
+
+    # before samples exceeding threshold are searched, the chunks are filtered
+    # (the filters are prepared for the size of the chunks used in 'trigger_base_multi')
+    filter_fncs = [partial(filter_chunk, 
+                           of=StreamFilter(of, block_size=(chunk_size + 3)*record_length), 
+                           record_length=record_length) for of in ofs]
+
+    triggers = trigger_base_multi(stream=stream, 
+                                  keys=keys, 
+                                  thresholds=thresholds,
+                                  filter_fncs=filter_fncs,
+                                  record_length=record_length,
+                                  n_triggers=n_triggers,
+                                  chunk_size=chunk_size,
+                                  apply_first=apply_first)
+    
+    inds, channels, vals = _merge_triggers(triggers, thresholds, coincidence_interval)
+
+    return (dict(zip(keys, triggers)), 
+            dict(inds=inds, channels=np.array(keys)[channels], vals=vals))
\ No newline at end of file
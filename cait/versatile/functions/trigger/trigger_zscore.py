@@ -37,7 +37,9 @@ def trigger_zscore(stream,
                    threshold: float = 5,
                    n_triggers: int = None,
                    chunk_size: int = 100,
-                   apply_first: Union[callable, List[callable]] = None):
+                   apply_first: Union[callable, List[callable]] = None,
+                   n_processes: int = 1,
+                   checkpoint: str = None):
     """
     Trigger a single channel of a stream object using a moving z-score.
 
@@ -53,6 +55,10 @@ def trigger_zscore(stream,
     :type chunk_size: int
     :param apply_first: A function or list of functions to be applied to the stream data BEFORE the filter function is applied. E.g. ``lambda x: -x`` to trigger on the inverted stream.
     :type apply_first: Union[callable, List[callable]], optional
+    :param n_processes: The number of processes to use for the triggering. The stream is split into search areas which are processed in parallel. The result is identical to the one obtained with a single process. Defaults to 1.
+    :type n_processes: int, optional
+    :param checkpoint: Path to an HDF5 file in which the state of the triggering is stored (in the group ``trigger_checkpoint/{key}``). If the file already contains a checkpoint for this channel, the triggering resumes from there, i.e. only data which was not processed before is triggered. This is useful for streams which are still being written (e.g. during data taking). The file can also be the HDF5 file of a :class:`DataHandler`. See :func:`trigger_base` for details. Defaults to None, i.e. no checkpoint is used.
+    :type checkpoint: str, optional
 
     :return: Tuple of trigger indices and trigger heights.
     :rtype: Tuple[List[int], List[float]]
@@ -81,7 +87,9 @@ def trigger_zscore(stream,
                             record_length=record_length,
                             n_triggers=n_triggers,
                             chunk_size=chunk_size,
-                            apply_first=apply_first)
+                            apply_first=apply_first,
+                            n_processes=n_processes,
+                            checkpoint=checkpoint)
     
     if not inds: return [], []
     
@@ -1,7 +1,12 @@
 from typing import Union, List
+from contextlib import nullcontext
+from multiprocessing import Pool
+import itertools
+from bisect import bisect_left
 
 import numpy as np
 import numba as nb
+import h5py
 
 from tqdm.auto import tqdm
 
@@ -9,10 +14,117 @@ from tqdm.auto import tqdm
 ### FUNCTIONS IN THIS FILE HAVE NO TESTCASES YET ###
 ####################################################
 
+@nb.njit
+def _search_chunk_serial(data: np.ndarray, threshold: float, record_length: int, skip_first: int = 0):
+    # Searches the data sample by sample. After a trigger, the search directly 
+    # continues after the dead-time (half a record window after the maximum).
+    # Additionally to the trigger indices and values, the indices at which
+    # the threshold was first exceeded for each trigger are returned. Those are 
+    # needed to resolve the blinding at the boundaries of search areas/blocks 
+    # that were processed in parallel (see '_resolve_skip').
+    trigger_inds = []
+    trigger_vals = []
+    search_inds = []
+    
+    search_len = len(data)-record_length
+
+    i = skip_first
+    while i < search_len:
+        if data[i] > threshold:
+            t = i + np.argmax(data[i:i+record_length])
+            trigger_inds.append(t)
+            trigger_vals.append(data[t])
+            search_inds.append(i)
+            i = t + record_length//2 + 1
+        else:
+            i += 1
+
+    return trigger_inds, trigger_vals, search_inds
+
+@nb.njit(parallel=True)
+def _search_chunk_parallel(data: np.ndarray, threshold: float, record_length: int, skip_first: int, n_blocks: int):
+    # Same as '_search_chunk_serial' but the data is split into 'n_blocks' blocks
+    # which are searched in parallel (each one starting at its first sample).
+    # Afterwards, the blocks are stitched together in order: The search only keeps
+    # track of the current sample, i.e. as soon as the search coming from the 
+    # previous block arrives at a sample which was also visited by the search of
+    # the current block, both coincide. Until then, the search is continued serially.
+    half = record_length//2
+    search_len = len(data)-record_length
+    bounds = np.linspace(skip_first, search_len, n_blocks+1).astype(np.int64)
+
+    # Consecutive triggers are at least half a record window apart
+    max_triggers = np.max(bounds[1:]-bounds[:-1])//(half+1) + 1
+    block_trigger_inds = np.empty((n_blocks, max_triggers), dtype=np.int64)
+    block_search_inds = np.empty((n_blocks, max_triggers), dtype=np.int64)
+    block_counts = np.zeros(n_blocks, dtype=np.int64)
+    block_exits = np.empty(n_blocks, dtype=np.int64)
+
+    for b in nb.prange(n_blocks):
+        i, n = bounds[b], 0
+        while i < bounds[b+1]:
+            if data[i] > threshold:
+                t = i + np.argmax(data[i:i+record_length])
+                block_trigger_inds[b, n] = t
+                block_search_inds[b, n] = i
+                n += 1
+                i = t + half + 1
+            else:
+                i += 1
+        block_counts[b] = n
+        block_exits[b] = i
+
+    trigger_inds = []
+    trigger_vals = []
+    search_inds = []
+
+    i = skip_first
+    for b in range(n_blocks):
+        k = 0
+        while i < bounds[b+1]:
+            # The samples (search_ind, trigger_ind + half] of each trigger were 
+            # skipped by the search of this block. Find the first such interval
+            # which does not end before i.
+            while k < block_counts[b] and block_trigger_inds[b, k] + half < i: k += 1
+
+            # Sample i was visited by the search of this block: take over its triggers
+            if k == block_counts[b] or block_search_inds[b, k] >= i:
+                for m in range(k, block_counts[b]):
+                    trigger_inds.append(block_trigger_inds[b, m])
+                    trigger_vals.append(data[block_trigger_inds[b, m]])
+                    search_inds.append(block_search_inds[b, m])
+                i = block_exits[b]
+                break
+
+            # Otherwise, continue searching serially
+            if data[i] > threshold:
+                t = i + np.argmax(data[i:i+record_length])
+                trigger_inds.append(t)
+                trigger_vals.append(data[t])
+                search_inds.append(i)
+                i = t + half + 1
+            else:
+                i += 1
+
+    return trigger_inds, trigger_vals, search_inds
+
+@nb.njit
+def _search_chunk(data: np.ndarray, threshold: float, record_length: int, skip_first: int = 0, n_blocks: int = 0):
+    # Dispatches to the parallel search if multiple threads are available and
+    # the data is long enough (each block should span several record windows).
+    # If 'n_blocks' is 0, it is determined from the number of threads.
+    if n_blocks == 0:
+        n_blocks = min(nb.get_num_threads(), (len(data) - record_length - skip_first)//(4*record_length))
+
+    if n_blocks > 1:
+        return _search_chunk_parallel(data, threshold, record_length, skip_first, n_blocks)
+    else:
+        return _search_chunk_serial(data, threshold, record_length, skip_first)
+
 @nb.njit
 def search_chunk(data: np.ndarray, threshold: float, record_length: int, skip_first: int = 0):
     """
-    Searches samples in 'data' exceeding the 'threshold' according to the algorithm discussed in https://edoc.ub.uni-muenchen.de/23762/.
+    Searches samples in 'data' exceeding the 'threshold' according to the algorithm discussed in https://edoc.ub.uni-muenchen.de/23762/. If numba is configured to use multiple threads, long chunks are split into blocks which are searched in parallel (the result is identical to a serial search).
 
     :param data: The data to search.
     :type data: np.ndarray
@@ -26,25 +138,206 @@ def search_chunk(data: np.ndarray, threshold: float, record_length: int, skip_fi
     :return: Tuple of trigger indices and trigger heights.
     :rtype: Tuple[List[int], List[float]]
     """
-    trigger_inds = []
-    trigger_vals = []
+    trigger_inds, trigger_vals, _ = _search_chunk(data, threshold, record_length, skip_first)
+
+    return trigger_inds, trigger_vals
+
+def _search_areas(stream_length: int, record_length: int, search_length: int):
+    # Splits the stream into search areas of size 'search_length' and returns
+    # their start and end indices as well as their sizes.
+
+    # number of such search chunks (the first and last record window is not
+    # searched because those regions cannot be filtered correctly)
+    n_search_areas = (stream_length - 3*record_length)//search_length
+    remainder = (stream_length - 3*record_length)%search_length
+
+    search_area_sizes = [search_length]*n_search_areas
+    if remainder!=0: search_area_sizes += [remainder]
+
+    # create lists of start and end indices of search areas
+    starts = [record_length + x*search_length for x in range(len(search_area_sizes))]
+    ends = [s+sz for s,sz in zip(starts, search_area_sizes)]
+
+    return starts, ends, search_area_sizes
+
+def _check_apply_first(apply_first: Union[callable, List[callable]]):
+    # Makes sure that 'apply_first' is a list of callables
+    if apply_first is not None:
+        if type(apply_first) in [list, tuple]:
+            if not all([callable(f) for f in apply_first]):
+                raise TypeError("All entries of list 'apply_first' must be callable.")
+        elif callable(apply_first):
+            apply_first = [apply_first]
+        else:
+            raise TypeError(f"Unsupported type '{type(apply_first)}' for input argument 'apply_first'.")
+    else:
+        apply_first = []
+
+    return list(apply_first)
+
+def _filter_search_area(stream, 
+                        key: str, 
+                        start: int, 
+                        size: int, 
+                        filter_fnc: callable,
+                        record_length: int,
+                        search_length: int,
+                        apply_first: List[callable]):
+    # Reads and filters a single search area of the stream. The chunk used for
+    # the filtering has to start one record window early and end two record 
+    # windows after the search stop. It always has the same size (padded with 
+    # zeros) such that the filtering yields identical results irrespective of 
+    # whether the search areas are processed serially or in parallel.
+    trace = stream[key, start-record_length:start+size+2*record_length, "as_voltage"]
+
+    return _filter_trace(trace, filter_fnc, record_length, search_length, apply_first)
+
+def _filter_search_area_multi(stream, 
+                              keys: List[str], 
+                              start: int, 
+                              size: int, 
+                              filter_fncs: List[callable],
+                              record_length: int,
+                              search_length: int,
+                              apply_first: List[callable]):
+    # Same as '_filter_search_area' for multiple channels. The search area is 
+    # read once for all channels (for streams which store the channels 
+    # together, this is a single read) and filtered for each channel.
+    traces = stream.get_voltage_traces(keys, slice(start-record_length, start+size+2*record_length))
+
+    return [_filter_trace(traces[k], f, record_length, search_length, apply_first) 
+            for k, f in zip(keys, filter_fncs)]
+
+def _filter_trace(trace: np.ndarray,
+                  filter_fnc: callable,
+                  record_length: int,
+                  search_length: int,
+                  apply_first: List[callable]):
+    # Pads the voltage trace of a search area to the fixed chunk size and filters it
+    chunk = np.zeros(search_length + 3*record_length)
+    chunk[:trace.size] = trace
+
+    for f in apply_first: chunk[:] = f(chunk)
+
+    return filter_fnc(chunk)
+
+def _resolve_skip(trigger_inds: List[int], 
+                  trigger_vals: List[float], 
+                  search_inds: List[int],
+                  head: np.ndarray,
+                  search_len: int,
+                  skip_first: int,
+                  threshold: float,
+                  record_length: int):
+    # Converts the result of a search area which was searched without blinding 
+    # (skip_first=0) into the result for the given 'skip_first'. The search 
+    # algorithm only keeps track of the current sample. Therefore, as soon as
+    # the blinded search arrives at a sample which was also visited by the 
+    # unblinded search, both searches coincide from there on. Until then, the
+    # blinded search is repeated using the first samples of the filtered chunk 
+    # ('head'). If those are not sufficient, None is returned and the area has 
+    # to be searched again.
+    # The samples (search_inds[k], trigger_inds[k] + record_length//2] were 
+    # skipped by the unblinded search. These intervals are disjoint and sorted, 
+    # and 'p' only increases, so a single pointer 'k' walks through them.
+    k = 0
+    new_inds, new_vals = [], []
+    p = skip_first
+
+    while p < search_len:
+        while k < len(search_inds) and trigger_inds[k] + record_length//2 < p: k += 1
+
+        # Sample was visited by unblinded search, i.e. searches coincide from here on
+        if k == len(search_inds) or not search_inds[k] < p:
+            keep = bisect_left(search_inds, p, lo=k)
+            return (new_inds + list(trigger_inds[keep:]), 
+                    new_vals + list(trigger_vals[keep:]))
+        
+        if p + record_length > head.size: return None
+
+        if head[p] > threshold:
+            j = int(np.argmax(head[p:p+record_length]))
+            new_inds.append(p+j)
+            new_vals.append(head[p+j])
+
+            if p+j+record_length//2 > search_len: break
+            p += j + record_length//2 + 1
+        else:
+            p += 1
+
+    return new_inds, new_vals
+
+# Arguments which are shared by all search areas. They are set once per worker 
+# process (see '_init_worker') such that only the start and size of a search area
+# have to be sent to the workers.
+_worker_kwargs = dict()
+
+def _init_worker(kwargs: dict):
+    # The processes already run in parallel, i.e. the search of a chunk 
+    # should not be split into multiple threads in addition
+    nb.set_num_threads(1)
+    _worker_kwargs.update(kwargs)
+
+def _search_area_worker(area: tuple):
+    # Filters and searches a search area without blinding. Additionally to the
+    # triggers, the first samples of the filtered chunk are returned such that 
+    # the blinding can be resolved afterwards (see '_resolve_skip').
+    threshold = _worker_kwargs["threshold"]
+    record_length = _worker_kwargs["record_length"]
+    filtered = _filter_search_area(start=area[0], 
+                                   size=area[1],
+                                   stream=_worker_kwargs["stream"],
+                                   key=_worker_kwargs["key"],
+                                   filter_fnc=_worker_kwargs["filter_fnc"],
+                                   record_length=record_length,
+                                   search_length=_worker_kwargs["search_length"],
+                                   apply_first=_worker_kwargs["apply_first"])
     
-    search_len = len(data)-record_length
+    trigger_inds, trigger_vals, search_inds = _search_chunk(filtered, threshold, record_length)
 
-    inds = iter(range(skip_first, search_len))
-    for i in inds:
-        if data[i] > threshold:
-            j = np.argmax(data[i:i+record_length])
-            trigger_inds.append(i+j)
-            trigger_vals.append(data[i+j])
-            
-            if i+j+record_length//2 > search_len: 
-                break
-            else:
-                for _ in range(j+record_length//2): 
-                    next(inds)
+    return (list(trigger_inds), list(trigger_vals), list(search_inds), 
+            filtered[:3*record_length].copy(), filtered.size - record_length)
 
-    return trigger_inds, trigger_vals
+def _checkpoint_settings(key, threshold, record_length, chunk_size):
+    # Settings which have to agree between the run that wrote a checkpoint
+    # and the run that resumes from it
+    return dict(key=key, threshold=float(threshold), record_length=int(record_length), chunk_size=int(chunk_size))
+
+def _load_checkpoint(path: str, settings: dict):
+    # Returns (trigger_inds, trigger_vals, n_areas, skip_first) stored in the 
+    # checkpoint file or None if the file (or the group for this channel) does not exist yet
+    try:
+        f = h5py.File(path, "r")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        group = f"trigger_checkpoint/{settings['key']}"
+        if group not in f: return None
+        g = f[group]
+
+        for k, v in settings.items():
+            if g.attrs[k] != v:
+                raise ValueError(f"The checkpoint in '{path}' was created with {k}={g.attrs[k]} but {k}={v} was requested. Use a different checkpoint file or delete the existing one.")
+
+        return (g["trigger_inds"][:].tolist(), 
+                g["trigger_vals"][:].tolist(), 
+                int(g.attrs["n_areas"]), 
+                int(g.attrs["skip_first"]))
+
+def _save_checkpoint(path: str, settings: dict, trigger_inds: list, trigger_vals: list, n_areas: int, skip_first: int):
+    # Writes the state of the triggering to the group 'trigger_checkpoint/{key}'
+    # of the HDF5 file 'path' (an existing group is replaced)
+    with h5py.File(path, "a") as f:
+        group = f"trigger_checkpoint/{settings['key']}"
+        if group in f: del f[group]
+        g = f.create_group(group)
+
+        g.create_dataset("trigger_inds", data=np.array(trigger_inds, dtype=np.int64))
+        g.create_dataset("trigger_vals", data=np.array(trigger_vals, dtype=np.float64))
+        g.attrs.update(settings)
+        g.attrs["n_areas"] = n_areas
+        g.attrs["skip_first"] = skip_first
 
 def trigger_base(stream, 
                  key: str, 
@@ -53,7 +346,9 @@ def trigger_base(stream,
                  record_length: int,
                  n_triggers: int = None,
                  chunk_size: int = 100,
-                 apply_first: Union[callable, List[callable]] = None):
+                 apply_first: Union[callable, List[callable]] = None,
+                 n_processes: int = 1,
+                 checkpoint: str = None):
     """
     Trigger a single channel of a stream object after pre-processing the stream. This function is used both for optimum filter triggering as well as for z-score triggering.
 
@@ -73,75 +368,221 @@ def trigger_base(stream,
     :type chunk_size: int
     :param apply_first: A function or list of functions to be applied to the stream data BEFORE the filter function is applied. E.g. ``lambda x: -x`` to trigger on the inverted stream.
     :type apply_first: Union[callable, List[callable]], optional
+    :param n_processes: The number of processes to use for the filtering and peak search. If larger than 1, the search areas are processed in parallel and the blinding at their boundaries is resolved afterwards, such that the result is identical to the one obtained with a single process. Defaults to 1.
+    :type n_processes: int, optional
+    :param checkpoint: Path to an HDF5 file in which the state of the triggering (number of completed search areas, blinding at the end of the last completed search area and triggers found so far) is stored in the group ``trigger_checkpoint/{key}`` when the triggering is done (or interrupted). If this group already exists, the triggering resumes from the stored state, i.e. only the part of the stream which was not processed before is searched. This is useful for streams which are still being written: Re-triggering the grown stream only processes the new data. The file can be a separate (sidecar) file or the HDF5 file of a :class:`DataHandler`. The checkpoint can only be resumed with the same key, threshold, record length and chunk size (it is the user's responsibility to use the same filter function). Defaults to None, i.e. no checkpoint is used.
+    :type checkpoint: str, optional
 
     :return: Tuple of trigger indices and trigger heights.
     :rtype: Tuple[List[int], List[float]]
     """
 
-    if apply_first is not None:
-        if type(apply_first) in [list, tuple]:
-            if not all([callable(f) for f in apply_first]):
-                raise TypeError("All entries of list 'apply_first' must be callable.")
-        elif callable(apply_first):
-            apply_first = [apply_first]
-        else:
-            raise TypeError(f"Unsupported type '{type(apply_first)}' for input argument 'apply_first'.")
-    else:
-        apply_first = []
+    apply_first = _check_apply_first(apply_first)
 
-    # total number of samples in the stream
-    stream_length = len(stream)
     # number of samples to be searched for triggers at a time
     search_length = chunk_size*record_length
+    starts, ends, search_area_sizes = _search_areas(len(stream), record_length, search_length)
 
-    # number of such search chunks (the first and last record window is not
-    # searched because those regions cannot be filtered correctly)
-    n_search_areas = (stream_length - 3*record_length)//search_length
-    remainder = (stream_length - 3*record_length)%search_length
-
-    search_area_sizes = [search_length]*n_search_areas
-    if remainder!=0: search_area_sizes += [remainder]
-
-    # create lists of start and end indices of search areas
-    starts = [record_length + x*search_length for x in range(len(search_area_sizes))]
-    ends = [s+sz for s,sz in zip(starts, search_area_sizes)]
-
-    # initialize a chunk for the filtering (this has to start one record window
-    # early and end two record windows after the search stop)
-    chunk = np.zeros(search_length + 3*record_length)
+    # Arguments needed to filter a search area (besides its start and size)
+    filter_kwargs = dict(stream=stream,
+                         key=key,
+                         filter_fnc=filter_fnc,
+                         record_length=record_length,
+                         search_length=search_length,
+                         apply_first=apply_first)
 
     # Initialize the lists that will collect the triggers
     trigger_inds = []
     trigger_vals = []
-    triggers_found = 0
 
     # Number of samples to skip in the beginning of a chunk
     # (needed if beginning of chunk needs to be blinded 
     # because trigger was found close to edge of previous chunk)
     skip_first = 0
 
-    for s, e, sz in zip(pbar := tqdm(starts), ends, search_area_sizes):
-        chunk[:sz+3*record_length] = stream[key, s-record_length:e+2*record_length, "as_voltage"]
+    # Number of search areas which were already processed. Only search areas
+    # of full size are counted because they do not change if the stream grows
+    # (the last one is usually smaller and is processed again when resuming)
+    n_areas = 0
 
-        for f in apply_first: chunk[:] = f(chunk)
+    if checkpoint is not None:
+        settings = _checkpoint_settings(key, threshold, record_length, chunk_size)
+        state = _load_checkpoint(checkpoint, settings)
+        if state is not None:
+            trigger_inds, trigger_vals, n_areas, skip_first = state
+            if n_areas > len(starts) or (n_areas > 0 and search_area_sizes[n_areas-1] != search_length):
+                raise ValueError(f"The checkpoint in '{checkpoint}' covers more of the stream than is available ({len(stream)} samples).")
 
-        filtered_chunk = filter_fnc(chunk)
-        inds, vals = search_chunk(filtered_chunk, threshold, record_length, skip_first=skip_first)
+            starts, ends, search_area_sizes = starts[n_areas:], ends[n_areas:], search_area_sizes[n_areas:]
 
-        trigger_inds += [s+i for i in inds]
-        trigger_vals += vals
-        triggers_found += len(inds)
+    # State to be stored in the checkpoint (updated after each full search area)
+    checkpoint_state = (len(trigger_inds), n_areas, skip_first)
+    triggers_found = 0
 
-        pbar.set_postfix({"triggers found": triggers_found})
-        if (n_triggers is not None) and (triggers_found > n_triggers): break
+    try:
+        with Pool(n_processes, 
+                  initializer=_init_worker, 
+                  initargs=(dict(threshold=threshold, **filter_kwargs),)) if n_processes > 1 else nullcontext() as pool:
+        
+            # In the parallel case, all search areas are searched without blinding
+            # and the blinding is resolved below (in order of the search areas)
+            if pool is not None:
+                results = pool.imap(_search_area_worker, zip(starts, search_area_sizes))
+            else:
+                results = itertools.repeat(None)
 
-        chunk[:] = 0
+            for s, e, sz, res in zip(pbar := tqdm(starts), ends, search_area_sizes, results):
+                if res is not None:
+                    res = res[:2] if skip_first == 0 else _resolve_skip(*res, 
+                                                                        skip_first=skip_first, 
+                                                                        threshold=threshold, 
+                                                                        record_length=record_length)
+                if res is None:
+                    filtered_chunk = _filter_search_area(start=s, size=sz, **filter_kwargs)
+                    res = search_chunk(filtered_chunk, threshold, record_length, skip_first=skip_first)
 
-        # If trigger is found in last window of search area, we blind the
-        # beginning of the following chunk
-        if inds and (s + inds[-1] > e):
-            skip_first = s + inds[-1] - e + record_length//2
-        else:
-            skip_first = 0
+                inds, vals = res
+
+                trigger_inds += [s+i for i in inds]
+                trigger_vals += vals
+                triggers_found += len(inds)
+
+                pbar.set_postfix({"triggers found": triggers_found})
+
+                # If trigger is found in last window of search area, we blind the
+                # beginning of the following chunk
+                if inds and (s + inds[-1] > e):
+                    skip_first = s + inds[-1] - e + record_length//2
+                else:
+                    skip_first = 0
+
+                if sz == search_length:
+                    n_areas += 1
+                    checkpoint_state = (len(trigger_inds), n_areas, skip_first)
+
+                if (n_triggers is not None) and (triggers_found > n_triggers): break
+    finally:
+        if checkpoint is not None:
+            n, n_areas, skip_first = checkpoint_state
+            _save_checkpoint(checkpoint, settings, trigger_inds[:n], trigger_vals[:n], n_areas, skip_first)
         
-    return trigger_inds, trigger_vals
\ No newline at end of file
+    return trigger_inds, trigger_vals
+
+def trigger_base_multi(stream, 
+                       keys: List[str], 
+                       thresholds: List[float],
+                       filter_fncs: List[callable],
+                       record_length: int,
+                       n_triggers: int = None,
+                       chunk_size: int = 100,
+                       apply_first: Union[callable, List[callable]] = None):
+    """
+    Trigger multiple channels of a stream object in a single pass through the stream, i.e. every search area is read once for all channels (see :meth:`StreamBaseClass.get_voltage_traces`), pre-processed and searched for each channel before moving on to the next one. The triggering of each channel is identical to :func:`trigger_base`.
+
+    :param stream: The stream object with the channels to trigger.
+    :type stream: StreamBaseClass
+    :param keys: The names of the channels in 'stream' to trigger.
+    :type keys: List[str]
+    :param thresholds: The thresholds above which events should be triggered (one for each channel, interpretation depends on 'filter_fncs').
+    :type thresholds: List[float]
+    :param filter_fncs: The functions to be applied to the data before triggering (one for each channel).
+    :type filter_fncs: List[callable]
+    :param record_length: The desired record length (this determines the dead-time after a trigger). It is the same for all channels.
+    :type record_length: int
+    :param n_triggers: The number of events to trigger in any of the channels (might be more, depending on 'chunk_size'). Defaults to None, i.e. all events in the stream are triggered
+    :type n_triggers: int
+    :param chunk_size: The number of record windows that are processed (i.e. filter + peak search) at a time.
+    :type chunk_size: int
+    :param apply_first: A function or list of functions to be applied to the stream data of all channels BEFORE the filter functions are applied. E.g. ``lambda x: -x`` to trigger on the inverted stream.
+    :type apply_first: Union[callable, List[callable]], optional
+
+    :return: List of tuples of trigger indices and trigger heights (one tuple for each channel, in the order of 'keys').
+    :rtype: List[Tuple[List[int], List[float]]]
+    """
+    if not (len(keys) == len(thresholds) == len(filter_fncs)):
+        raise ValueError(f"The number of 'keys' ({len(keys)}), 'thresholds' ({len(thresholds)}) and 'filter_fncs' ({len(filter_fncs)}) has to be the same.")
+    
+    apply_first = _check_apply_first(apply_first)
+
+    # number of samples to be searched for triggers at a time
+    search_length = chunk_size*record_length
+    starts, ends, search_area_sizes = _search_areas(len(stream), record_length, search_length)
+
+    # Initialize the lists that will collect the triggers (for each channel)
+    trigger_inds = [[] for _ in keys]
+    trigger_vals = [[] for _ in keys]
+    triggers_found = [0 for _ in keys]
+
+    # Number of samples to skip in the beginning of a chunk (for each channel)
+    skip_first = [0 for _ in keys]
+
+    for s, e, sz in zip(pbar := tqdm(starts), ends, search_area_sizes):
+        filtered_chunks = _filter_search_area_multi(stream=stream, 
+                                                    keys=keys, 
+                                                    start=s, 
+                                                    size=sz, 
+                                                    filter_fncs=filter_fncs,
+                                                    record_length=record_length,
+                                                    search_length=search_length,
+                                                    apply_first=apply_first)
+        for c, (filtered_chunk, threshold) in enumerate(zip(filtered_chunks, thresholds)):
+            inds, vals = search_chunk(filtered_chunk, threshold, record_length, skip_first=skip_first[c])
+
+            trigger_inds[c] += [s+i for i in inds]
+            trigger_vals[c] += vals
+            triggers_found[c] += len(inds)
+
+            # If trigger is found in last window of search area, we blind the
+            # beginning of the following chunk
+            if inds and (s + inds[-1] > e):
+                skip_first[c] = s + inds[-1] - e + record_length//2
+            else:
+                skip_first[c] = 0
+
+        pbar.set_postfix({"triggers found": triggers_found})
+        if (n_triggers is not None) and (max(triggers_found) > n_triggers): break
+
+    return list(zip(trigger_inds, trigger_vals))
+
+def _merge_triggers(triggers: List[tuple], thresholds: List[float], coincidence_interval: int):
+    # Merges the triggers of multiple channels (list of tuples of trigger indices
+    # and trigger heights) into a single list of events. Triggers of different
+    # channels which lie within 'coincidence_interval' samples of the first
+    # trigger of an event are assigned to the same event. The event is assigned
+    # to the channel with the largest trigger height relative to its threshold
+    # (the dominant channel) and its index is the trigger index in this channel.
+    n_channels = len(triggers)
+
+    all_inds = np.concatenate([np.array(t[0], dtype=np.int64) for t in triggers])
+    all_vals = np.concatenate([np.array(t[1], dtype=np.float64) for t in triggers])
+    all_channels = np.concatenate([np.full(len(t[0]), c, dtype=np.int64) for c, t in enumerate(triggers)])
+
+    # Sort by trigger index (stable sort, i.e. ties are ordered by channel)
+    order = np.argsort(all_inds, kind="stable")
+    all_inds, all_vals, all_channels = all_inds[order], all_vals[order], all_channels[order]
+    scores = all_vals/np.array(thresholds, dtype=np.float64)[all_channels]
+
+    event_inds, event_channels, event_vals = [], [], []
+    n = 0
+    while n < all_inds.size:
+        # All triggers within the coincidence interval of the first one
+        m = n + np.searchsorted(all_inds[n:], all_inds[n] + coincidence_interval, side="left")
+
+        vals = np.full(n_channels, np.nan)
+        best = dict()
+        for k in range(n, m):
+            c = all_channels[k]
+            # In case a channel triggered twice within the interval, the larger trigger is kept
+            if c not in best or scores[k] > scores[best[c]]: best[c] = k
+        for c, k in best.items(): vals[c] = all_vals[k]
+
+        dominant = max(best.values(), key=lambda k: scores[k])
+        event_inds.append(int(all_inds[dominant]))
+        event_channels.append(int(all_channels[dominant]))
+        event_vals.append(vals)
+
+        n = m
+
+    return (np.array(event_inds, dtype=np.int64), 
+            np.array(event_channels, dtype=np.int64), 
+            np.array(event_vals).reshape(-1, n_channels))
\ No newline at end of file
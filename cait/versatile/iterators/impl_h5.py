@@ -1,5 +1,7 @@
 from typing import Union, List
 from contextlib import nullcontext
+from collections import OrderedDict
+import os
 
 import numpy as np
 import h5py
@@ -9,7 +11,7 @@ from .iteratorbase import IteratorBaseClass
 class H5Iterator(IteratorBaseClass):
     """
     Iterator object for HDF5 datasets that iterates along the "event-dimension" (second dimension of 3-dimensional events data) of a dataset and returns the event voltage traces.
-    If the Iterator is used as a context manager, the HDF5 file is not closed during iteration which improves file access speed.
+    If the Iterator is used as a context manager, the HDF5 file is not closed during iteration which improves file access speed. The same holds within a session of the DataHandler (see :meth:`DataHandler.session`).
 
     The datasets in the HDF5 file are assumed to have shape `(channels, events, data)` but the iterator *always* returns data event by event. If batches are used (see below), they are returned with the events dimension being the first dimension. To explain the returned shapes we start from a general dataset with shape `(n_channels, n_events, n_data)`. Note that `n_channels`, `n_events`, or `n_data` could be 1, but in total, a 3-dimensional dataset is needed. 
     For a batch size of 1, the iterator in this case returns shapes `(n_channels, n_data)`. 
@@ -27,6 +29,10 @@ class H5Iterator(IteratorBaseClass):
     :type channels: Union[int, List[int]]
     :param batch_size: The number of events to be returned at once (these are all read together). There will be a trade-off: large batch_sizes cause faster read speed but increase the memory usage.
     :type batch_size: int
+    :param prefetch: The number of batches (or events if no batches are used) which are read in a background thread while the current one is processed. This overlaps reading and processing, which is especially useful for slow (e.g. network-mounted) storage. Memory usage increases by at most ``prefetch+1`` batches. Defaults to None, i.e. no prefetching.
+    :type prefetch: int, optional
+    :param cache_size: The maximum number of bytes of data which is kept in memory after it was read (least recently used data is discarded first). This speeds up repeated passes over the same events (as long as they fit in the cache). The cache is cleared if the HDF5 file is modified. Defaults to None, i.e. no caching.
+    :type cache_size: int, optional
 
     :return: Iterable object
     :rtype: EventIterator
@@ -38,17 +44,23 @@ class H5Iterator(IteratorBaseClass):
     >>> with it as opened_it:
     ...     for i in opened_it:
     ...         print(i.shape)
+
+    The events of a batch are not read using fancy indexing (which is slow in h5py for arbitrary indices). Instead, the requested events are grouped by the HDF5 chunks they are stored in (or into runs of consecutive events if the dataset is not chunked) and consecutive chunks are read as a single slice (as long as this does not read much more events than requested, such that the memory needed stays at about one batch plus one chunk). Therefore, iterating a subset of the events (e.g. after a cut) is not slower than iterating all events.
     """
 
-    def __init__(self, dh, group: str, channels: Union[int, List[int]] = None, inds: List[int] = None, batch_size: int = None):
+    def __init__(self, dh, group: str, channels: Union[int, List[int]] = None, inds: List[int] = None, batch_size: int = None, prefetch: int = None, cache_size: int = None):
 
         # Check if dataset has correct shape:
-        with h5py.File(dh.get_filepath(), 'r') as f:
+        with dh.get_filehandle(mode='r') as f:
             ndim = f[group]['event'].ndim
             shape = f[group]['event'].shape
+            chunks = f[group]['event'].chunks
             if ndim != 3:
                 raise ValueError(f"Only 3-dimensional datasets can be used to construct H5Iterator. Dataset 'event' in group '{group}' is {ndim}-dimensional.")
 
+        if cache_size is not None and cache_size < 0:
+            raise ValueError(f"'cache_size' has to be a non-negative integer, got {cache_size}.")
+
         self._dh = dh
         self._path = dh.get_filepath()
         self._group = group
@@ -70,14 +82,16 @@ class H5Iterator(IteratorBaseClass):
         inds = [inds] if isinstance(inds, int) else [int(i) for i in inds]
 
         # Does batch handling and creates properties self._inds, self.uses_batches, and self.n_batches
-        super().__init__(inds=inds, batch_size=batch_size)
+        super().__init__(inds=inds, batch_size=batch_size, prefetch=prefetch)
 
         # Save values to reconstruct iterator:
         self._params = {'dh': dh, 
                         'group': group, 
                         'channels': self._channels, 
                         'inds': inds, 
-                        'batch_size': batch_size}
+                        'batch_size': batch_size,
+                        'prefetch': prefetch,
+                        'cache_size': cache_size}
 
         # If list specifies all channels, we replace it by a None-slice to bypass h5py's restriction on fancy indexing
         # Notice that this has to be done after saving the list in self._params
@@ -87,19 +101,39 @@ class H5Iterator(IteratorBaseClass):
         # that the first dimension of the output is always the event dimension
         self._should_be_transposed = self.uses_batches and self._n_channels > 1
 
+        # Events are read in blocks of HDF5 chunks (along the event dimension)
+        self._n_events_total = n_events_total
+        self._chunk_length = chunks[1] if chunks is not None else 1
+
+        # LRU cache of blocks which were already read (block index -> data)
+        self._cache_size = cache_size or 0
+        self._cache = OrderedDict()
+        self._cache_nbytes = 0
+        self._cache_mtime = None
+
         self._file_open = False
 
     def __enter__(self):
-        self._f = h5py.File(self._path, 'r')
+        self._f = self._dh.get_filehandle(path=self._path, mode='r')
         self._file_open = True
         return self
     
     def __exit__(self, typ, val, tb):
+        # The background thread must not read from the file after it is closed
+        self._reset_prefetching()
         self._f.close()
         self._file_open = False
     
     def __iter__(self):
+        self._reset_prefetching()
         self._current_batch_ind = 0
+
+        # Cached data is only valid as long as the file is not modified
+        if self._cache_size > 0:
+            mtime = os.stat(self._path).st_mtime_ns
+            if mtime != self._cache_mtime: self._clear_cache()
+            self._cache_mtime = mtime
+
         return self
 
     def _next_raw(self):
@@ -108,8 +142,11 @@ class H5Iterator(IteratorBaseClass):
             self._current_batch_ind += 1
 
             # Open HDF5 file if not yet open, else use already open file
-            with h5py.File(self._path, 'r') if not self._file_open else nullcontext(self._f) as f:
-                out = f[self._group]["event"][self._channels, event_inds_in_batch]
+            with self._dh.get_filehandle(path=self._path, mode='r') if not self._file_open else nullcontext(self._f) as f:
+                if self.uses_batches:
+                    out = self._read(f[self._group]["event"], event_inds_in_batch)
+                else:
+                    out = self._read(f[self._group]["event"], [event_inds_in_batch])[..., 0, :]
 
                 # transpose data when using batches such that first dimension is ALWAYS the event dimension
                 if self._should_be_transposed: out = np.transpose(out, axes=[1,0,2])
@@ -118,6 +155,86 @@ class H5Iterator(IteratorBaseClass):
         
         else:
             raise StopIteration
+
+    def _read(self, ds: h5py.Dataset, inds: List[int]):
+        # Reads the events 'inds' (in the given order) of the selected channels
+        # from 'ds'. The data is returned with the event dimension being the 
+        # second to last dimension (like in the dataset)
+        inds = np.asarray(inds, dtype=np.int64)
+        c = self._chunk_length
+
+        # Consecutive events are read with a single slice
+        if self._cache_size == 0 and np.all(np.diff(inds) == 1):
+            return ds[self._channels, inds[0]:inds[-1]+1]
+
+        uinds, inverse = np.unique(inds, return_inverse=True)
+        blocks = np.unique(uinds//c)
+        # Positions of the events of each block in 'uinds'
+        bounds = np.searchsorted(uinds, np.append(blocks, blocks[-1]+1)*c)
+
+        # Consecutive blocks which are not yet cached are read together, but a
+        # single read contains at most about as many events as were requested
+        # (and at least one block). Blocks are scattered into the output right
+        # away, so memory is bounded by about one batch plus one read.
+        max_run = max(1, len(uinds)//c)
+
+        out, run = None, []
+        for i, b in enumerate(blocks):
+            if b in self._cache:
+                self._cache.move_to_end(b)
+                out = self._scatter(out, self._cache[b], uinds, bounds[i], bounds[i+1], b*c)
+                continue
+
+            if run and (b != blocks[run[-1]]+1 or len(run) == max_run):
+                out = self._read_run(ds, out, blocks[run], uinds, bounds[run[0]:run[-1]+2])
+                run = []
+            run.append(i)
+
+        if run: out = self._read_run(ds, out, blocks[run], uinds, bounds[run[0]:run[-1]+2])
+
+        if len(uinds) == len(inds) and np.all(uinds == inds): return out
+
+        return out[..., inverse.reshape(-1), :]
+
+    def _read_run(self, ds: h5py.Dataset, out: np.ndarray, blocks: np.ndarray, uinds: np.ndarray, bounds: np.ndarray):
+        # Reads the consecutive 'blocks' with a single slice and scatters the
+        # requested events into 'out' (allocated if None)
+        c = self._chunk_length
+        start = blocks[0]*c
+        run_data = ds[self._channels, start:min((blocks[-1]+1)*c, self._n_events_total)]
+
+        for b, lo, hi in zip(blocks, bounds[:-1], bounds[1:]):
+            block_data = run_data[..., b*c-start:(b+1)*c-start, :]
+            out = self._scatter(out, block_data, uinds, lo, hi, b*c)
+            if self._cache_size > 0: self._add_to_cache(b, block_data)
+
+        return out
+
+    @staticmethod
+    def _scatter(out: np.ndarray, block_data: np.ndarray, uinds: np.ndarray, lo: int, hi: int, offset: int):
+        # Writes the events uinds[lo:hi] (contained in 'block_data', which starts
+        # at event 'offset') into 'out' (allocated if None)
+        if out is None:
+            out = np.empty((*block_data.shape[:-2], len(uinds), block_data.shape[-1]), dtype=block_data.dtype)
+        out[..., lo:hi, :] = block_data[..., uinds[lo:hi]-offset, :]
+
+        return out
+
+    def _add_to_cache(self, block: int, data: np.ndarray):
+        # Copy such that the cached block does not keep the data of other blocks alive
+        data = data.copy()
+        if data.nbytes > self._cache_size: return
+
+        self._cache[block] = data
+        self._cache_nbytes += data.nbytes
+
+        while self._cache_nbytes > self._cache_size:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_nbytes -= evicted.nbytes
+
+    def _clear_cache(self):
+        self._cache.clear()
+        self._cache_nbytes = 0
         
     @property
     def record_length(self):
@@ -130,7 +247,7 @@ class H5Iterator(IteratorBaseClass):
     @property
     def ds_start_us(self):
         # There is not really a more accurate way to do this
-        with h5py.File(self._path, 'r') as f:
+        with self._dh.get_filehandle(path=self._path, mode='r') as f:
             sec = np.array(f[self._group]["time_s"], dtype=np.int64)
             mus = np.array(f[self._group]["time_mus"], dtype=np.int64)
 
@@ -138,7 +255,7 @@ class H5Iterator(IteratorBaseClass):
 
     @property
     def timestamps(self):
-        with h5py.File(self._path, 'r') as f:
+        with self._dh.get_filehandle(path=self._path, mode='r') as f:
             sec = np.array(f[self._group]["time_s"][self._params["inds"]], dtype=np.int64)
             mus = np.array(f[self._group]["time_mus"][self._params["inds"]], dtype=np.int64)
 
@@ -16,6 +16,8 @@ class RDTIterator(IteratorBaseClass):
     :type inds: Union[int, List[int]]
     :param batch_size: The number of events to be returned at once (these are all read together). There will be a trade-off: large batch_sizes cause faster read speed but increase the memory usage.
     :type batch_size: int
+    :param prefetch: The number of batches (or events if no batches are used) which are read in a background thread while the current one is processed. This overlaps reading and processing, which is especially useful for slow (e.g. network-mounted) storage. Memory usage increases by at most ``prefetch+1`` batches. Defaults to None, i.e. no prefetching.
+    :type prefetch: int, optional
 
     :return: Iterable object
     :rtype: RDTIterator
@@ -24,7 +26,8 @@ class RDTIterator(IteratorBaseClass):
                  rdt_channel, 
                  channels: Union[int, List[int]] = None, 
                  inds: Union[int, List[int]] = None,
-                 batch_size: int = None):
+                 batch_size: int = None,
+                 prefetch: int = None):
 
         self._rdt_channel = rdt_channel
 
@@ -41,7 +44,7 @@ class RDTIterator(IteratorBaseClass):
         inds = [inds] if isinstance(inds, int) else [int(i) for i in inds]
 
         # Does batch handling and creates properties self._inds, self.uses_batches, and self.n_batches
-        super().__init__(inds=inds, batch_size=batch_size)
+        super().__init__(inds=inds, batch_size=batch_size, prefetch=prefetch)
 
         # Save index array for channel selection in __next__ (the values in self._channels correspond to 
         # actual channel numbers in the RDT file. Here, we are interested in the indices of the already selected
@@ -53,9 +56,11 @@ class RDTIterator(IteratorBaseClass):
         self._params = {'rdt_channel': rdt_channel, 
                         'channels': self._channels, 
                         'inds': inds,
-                        'batch_size': batch_size}
+                        'batch_size': batch_size,
+                        'prefetch': prefetch}
     
     def __iter__(self):
+        self._reset_prefetching()
         self._current_batch_ind = 0
         return self
 
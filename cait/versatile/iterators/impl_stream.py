@@ -4,6 +4,25 @@ import numpy as np
 
 from .iteratorbase import IteratorBaseClass
 
+def _coalesce_windows(starts: np.ndarray, record_length: int):
+    # Sorts the record windows beginning at 'starts' and merges overlapping or 
+    # adjacent ones into contiguous runs. Returns a list of tuples (start of run, 
+    # end of run, positions of its windows in 'starts', offsets of its windows 
+    # relative to the start of the run)
+    order = np.argsort(starts, kind="stable")
+    sorted_starts = starts[order]
+
+    # A new run begins where a window starts after the end of the previous one
+    # (all windows have the same length, i.e. the previous one ends last)
+    breaks = np.flatnonzero(sorted_starts[1:] > sorted_starts[:-1] + record_length) + 1
+
+    runs = []
+    for a, b in zip(np.r_[0, breaks], np.r_[breaks, len(starts)]):
+        run_start = sorted_starts[a]
+        runs.append((run_start, sorted_starts[b-1] + record_length, order[a:b], sorted_starts[a:b] - run_start))
+
+    return runs
+
 class StreamIterator(IteratorBaseClass):
     """
     Iterator object that returns voltage traces for given trigger indices of a stream file. 
@@ -20,6 +39,10 @@ class StreamIterator(IteratorBaseClass):
     :type alignment: float
     :param batch_size: The number of events to be returned at once (these are all read together). There will be a trade-off: large batch_sizes cause faster read speed but increase the memory usage.
     :type batch_size: int
+    :param dtype: The floating point data type of the returned voltage traces. Using ``np.float32`` halves the memory (bandwidth) needed. Defaults to ``np.float64``.
+    :type dtype: np.dtype, optional
+    :param prefetch: The number of batches (or events if no batches are used) which are read in a background thread while the current one is processed. This overlaps reading and processing, which is especially useful for slow (e.g. network-mounted) storage. Memory usage increases by at most ``prefetch+1`` batches. Defaults to None, i.e. no prefetching.
+    :type prefetch: int, optional
 
     :return: Iterable object
     :rtype: StreamIterator
@@ -31,19 +54,24 @@ class StreamIterator(IteratorBaseClass):
                  inds: Union[int, List[int]], 
                  record_length: int, 
                  alignment: float = 1/4,
-                 batch_size: int = None):
+                 batch_size: int = None,
+                 dtype: np.dtype = np.float64,
+                 prefetch: int = None):
         
         if 0 > alignment or 1 < alignment:
             raise ValueError("'alignment' has to be in the interval [0,1]")
+        if np.dtype(dtype).kind != "f":
+            raise TypeError(f"Voltage traces can only be returned as floating point numbers, got dtype {np.dtype(dtype)}.")
         
         self._keys = [keys] if isinstance(keys, str) else keys
         inds = [inds] if isinstance(inds, int) else [int(i) for i in inds]
 
         # Does batch handling and creates properties self._inds, self.uses_batches, and self.n_batches
-        super().__init__(inds=inds, batch_size=batch_size)
+        super().__init__(inds=inds, batch_size=batch_size, prefetch=prefetch)
 
         self._stream = stream
         self._record_length = record_length
+        self._dtype = dtype
 
         # Save values to reconstruct iterator:
         self._params = {'stream': stream, 
@@ -51,11 +79,14 @@ class StreamIterator(IteratorBaseClass):
                         'inds': inds, 
                         'record_length': record_length,
                         'alignment': alignment,
-                        'batch_size': batch_size}
+                        'batch_size': batch_size,
+                        'dtype': dtype,
+                        'prefetch': prefetch}
 
         self._interval = (int(alignment*record_length), record_length - int(alignment*record_length))
 
     def __iter__(self):
+        self._reset_prefetching()
         self._current_batch_ind = 0
         return self
 
@@ -69,25 +100,48 @@ class StreamIterator(IteratorBaseClass):
                           event_inds_in_batch + self._interval[1])
                 
                 if len(self._keys) == 1:
-                    out = self._stream[self._keys[0], s, 'as_voltage']
+                    out = self._stream[self._keys[0], s, 'as_voltage', self._dtype]
                 else:
-                    out = [self._stream[k, s, 'as_voltage'] for k in self._keys]
+                    out = [self._stream[k, s, 'as_voltage', self._dtype] for k in self._keys]
             
                 return np.array(out)
 
             else:
-                all_slices = np.r_.__getitem__(tuple(
-                    [slice(i - self._interval[0], i + self._interval[1]) for i in event_inds_in_batch]
-                    )
-                ).reshape(len(event_inds_in_batch), self._record_length)
+                # The record windows are sorted and merged into contiguous runs which
+                # are read at once (instead of gathering all samples by fancy indexing)
+                starts = np.array(event_inds_in_batch) - self._interval[0]
+                runs = _coalesce_windows(starts, self._record_length)
+                stream_length = len(self._stream)
 
-                if len(self._keys) == 1:
-                    out = self._stream[self._keys[0], all_slices, 'as_voltage']
-                else:
-                    out = [self._stream[k, all_slices, 'as_voltage'] for k in self._keys]
-                    out = np.transpose(np.array(out), axes=[1,0,2])
-            
-                return np.array(out)
+                out = np.empty((len(starts), len(self._keys), self._record_length), dtype=self._dtype)
+
+                for c, k in enumerate(self._keys):
+                    # If possible, the raw values are copied into the output buffer
+                    # and converted to voltages in place afterwards. Otherwise (e.g. 
+                    # for the sum of channels), the voltage traces are read directly
+                    try:
+                        scale, offset = self._stream.get_voltage_scale(k)
+                        read = self._stream.get_raw_trace
+                    except KeyError:
+                        scale, offset = None, None
+                        read = lambda key, where: self._stream.get_voltage_trace(key, where, self._dtype)
+
+                    for run_start, run_end, positions, offsets in runs:
+                        # Runs which exceed the stream are read by indexing to preserve
+                        # the behavior of numpy indexing (negative indices, IndexError)
+                        if run_start >= 0 and run_end <= stream_length:
+                            trace = read(k, slice(run_start, run_end))
+                        else:
+                            trace = read(k, np.arange(run_start, run_end))
+
+                        for p, o in zip(positions, offsets):
+                            out[p, c] = trace[o:o+self._record_length]
+
+                    if scale is not None:
+                        out[:, c] *= out.dtype.type(scale)
+                        if offset != 0: out[:, c] += out.dtype.type(offset)
+
+                return out[:, 0] if len(self._keys) == 1 else out
             
         else:
             raise StopIteration
@@ -1,6 +1,8 @@
 from abc import ABC, abstractmethod
 from typing import Union, List, Callable
 import itertools
+import threading
+import queue
 
 import numpy as np
 
@@ -19,10 +21,54 @@ def _ensure_not_array(x):
     if isinstance(x, str): x = str(x)
     return x
 
+class _Prefetcher:
+    # Calls 'fetch' repeatedly in a background thread and keeps its results in a 
+    # queue of size 'n' (i.e. at most n+1 results are held in memory at once). 
+    # Exceptions raised by 'fetch' (including StopIteration) end the thread and 
+    # are re-raised by 'get' in the calling thread.
+    def __init__(self, fetch: Callable, n: int):
+        self._queue = queue.Queue(maxsize=n)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(fetch,), daemon=True)
+        self._thread.start()
+
+    def _run(self, fetch: Callable):
+        while not self._stop.is_set():
+            try:
+                item = (fetch(), None)
+            except BaseException as e:
+                item = (None, e)
+
+            # Wait for a free slot in the queue (unless we are asked to stop)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+            if item[1] is not None: return
+
+    def get(self):
+        out, err = self._queue.get()
+        if err is not None: raise err
+        return out
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
 class IteratorBaseClass(ABC):
-    def __init__(self, inds: List[int], batch_size: int = None):
+    def __init__(self, inds: List[int], batch_size: int = None, prefetch: int = None):
         self.fncs = list()
 
+        if prefetch is not None and prefetch < 0:
+            raise ValueError(f"'prefetch' has to be a non-negative integer, got {prefetch}.")
+        
+        # Number of batches to read in a background thread while the current one is processed
+        self._prefetch = prefetch
+        self._prefetcher = None
+
         self.__n_events = len(inds)
 
         # self._inds will be a list of batches. If we just take the inds list, we have batches of size 1, if we take [inds]
@@ -46,14 +92,35 @@ class IteratorBaseClass(ABC):
         return self
     
     def __exit__(self, typ, val, tb):
-        ...
+        self._reset_prefetching()
     
     @abstractmethod
     def __iter__(self):
         ...
 
     def __next__(self):
-        return self._apply_processing(self._next_raw())
+        if not self._prefetch:
+            return self._apply_processing(self._next_raw())
+        
+        # The raw data is read in a background thread, only the 
+        # processing is done here
+        if self._prefetcher is None:
+            self._prefetcher = _Prefetcher(self._next_raw, self._prefetch)
+
+        try:
+            out = self._prefetcher.get()
+        except BaseException:
+            self._reset_prefetching()
+            raise
+
+        return self._apply_processing(out)
+    
+    def _reset_prefetching(self):
+        # Stops the background thread (if any). Has to be called by child classes
+        # before the state used by '_next_raw' is reset (e.g. in '__iter__')
+        if getattr(self, "_prefetcher", None) is not None:
+            self._prefetcher.stop()
+            self._prefetcher = None
     
     @abstractmethod
     def _next_raw(self):
@@ -294,7 +361,10 @@ class IteratorCollection(IteratorBaseClass):
     """
     def __init__(self, iterators: Union[IteratorBaseClass, List[IteratorBaseClass]]):
         # We do not construct the superclass because batching is handled differently
+        # (prefetching is done by the individual iterators)
         self.fncs = list()
+        self._prefetch = None
+        self._prefetcher = None
         # Check if all elements are IteratorBaseClass instances
         if isinstance(iterators, list):
             for it in iterators:
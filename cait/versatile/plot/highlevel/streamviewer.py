@@ -2,14 +2,11 @@ from typing import Union, List
 import datetime
 
 import numpy as np
-import scipy as sp
 
 from ..viewer import Viewer
 from ...datasources.stream.streambase import StreamBaseClass
 from ...datasources.stream.factory import Stream
-
-def filter_chunk(data, of):
-    return sp.signal.oaconvolve(data, np.fft.irfft(of))
+from ...functions.trigger.streamfilter import StreamFilter
 
 # Has no test case (yet)
 class StreamViewer(Viewer):
@@ -104,6 +101,11 @@ class StreamViewer(Viewer):
         self.current_start = 0
         self.downsample_factor = downsample_factor
 
+        # The filter is prepared for the size of the frames (which includes one 
+        # record window before the first displayed sample)
+        if of is not None:
+            self._stream_filter = StreamFilter(of, block_size=n_points*downsample_factor + 2*(of.shape[-1] - 1) - 1)
+
         self.update_frame()
         self.show()
 
@@ -133,14 +135,18 @@ class StreamViewer(Viewer):
                 val_min.append(np.min(y))
                 val_max.append(np.max(y))
                 
-        if self._of:
-            record_length = 2*(self._of.shape[-1] - 1)
-            d = record_length if self.current_start > record_length else 0
+        if self._of is not None:
+            record_length = self._stream_filter.record_length
+            # The filtered value of a sample depends on the record window before it.
+            # At the beginning of the stream, the missing samples are set to zero.
+            d = min(self.current_start, record_length - 1)
             where_filter = slice(self.current_start - d, 
-                                 self.current_start + self.n_points*self.downsample_factor + record_length)
-            
-            filtered_stream = filter_chunk(self.stream[self._keys[0], where_filter, "as_voltage"], self._of)[d:-record_length]
-            self.update_line(name=f"{self._keys[0]} (filtered)", x=t_ms, y=filtered_stream[::self.downsample_factor])
+                                 self.current_start + self.n_points*self.downsample_factor)
+            chunk = self.stream[self._keys[0], where_filter, "as_voltage"]
+            if d < record_length - 1: chunk = np.concatenate([np.zeros(record_length - 1 - d), chunk])
+
+            filtered_stream = self._stream_filter(chunk)[::self.downsample_factor]
+            self.update_line(name=f"{self._keys[0]} (filtered)", x=t_ms, y=filtered_stream)
             
             if self._marks_timestamps:
                 val_min.append(np.min(filtered_stream))
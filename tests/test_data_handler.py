@@ -1,11 +1,12 @@
 import pytest
 
 import os
+import shutil
 import h5py
 import numpy as np
 import cait as ai
 
-from .fixtures import tempdir, datahandler, testdata_1D_2D_3D_s_mus, RECORD_LENGTH
+from .fixtures import tempdir, datahandler, datahandler_testdata, testdata_1D_2D_3D_s_mus, RECORD_LENGTH
 
 class TestDataHandler:
     # tests all methods directly defined in DataHandler (not within mixins) except:
@@ -42,6 +43,102 @@ class TestDataHandler:
             with datahandler.get_filehandle(path=mock_file, mode="a") as fh:
                 assert f == fh
 
+    def test_session(self, datahandler, testdata_1D_2D_3D_s_mus):
+        *_ , d3, s, mus = testdata_1D_2D_3D_s_mus
+
+        with datahandler.session() as dh:
+            dh.set("session_testing", event=d3)
+            # All calls share the session's file handle
+            with dh.get_filehandle(mode="r") as f1, dh.get_filehandle() as f2:
+                assert f1 == f2
+            assert np.array_equal(dh.get("session_testing", "event"), d3.astype(np.float32))
+            assert np.array_equal(dh.get("session_testing", "event", 0, [1, 2]), d3[0, [1, 2]].astype(np.float32))
+            assert len([ev for ev in dh.get_event_iterator("session_testing", batch_size=13)]) == 8
+            # Nested sessions are not supported
+            with pytest.raises(RuntimeError): 
+                with dh.session(): pass
+            # Leaving a with statement does not close the session's file
+            assert dh.get("session_testing", "event").shape == d3.shape
+
+        with datahandler.session(mode="r") as dh:
+            with pytest.raises(OSError): dh.set("session_testing", event2=d3)
+
+        datahandler.drop("session_testing")
+
+    @pytest.mark.parametrize("processes", [1, 2])
+    def test_convert_mp(self, tempdir, datahandler_testdata, processes):
+        # Main parameters calculated during the conversion match the ones calculated afterwards
+        dh = ai.DataHandler(channels=[0, 1])
+        dh.convert_dataset(path_rdt=tempdir.name, fname='/mock_001', path_h5=tempdir.name + f'/converted_{processes}', 
+                           calc_mp=True, calc_add_mp=True, processes=processes, batch_size=7)
+
+        # The reference is calculated on a copy (the fixture is shared with other tests)
+        shutil.copy(datahandler_testdata.get_filepath(), tempdir.name + f'/reference_{processes}.h5')
+        ref = ai.DataHandler(channels=[0, 1])
+        ref.set_filepath(path_h5=tempdir.name, fname=f'reference_{processes}', appendix=False)
+        for group in ["events", "testpulses"]:
+            ref.calc_mp(group)
+            ref.calc_additional_mp(group, no_of=True)
+
+        for group in ["events", "testpulses", "noise"]:
+            assert np.array_equal(dh.get(group, "event"), ref.get(group, "event"))
+        for group in ["events", "testpulses"]:
+            assert np.allclose(dh.get(group, "mainpar"), ref.get(group, "mainpar"))
+            assert np.allclose(dh.get(group, "add_mainpar"), ref.get(group, "add_mainpar"))
+
+    def test_get_many(self, datahandler):
+        mainpar = np.random.rand(2, 50, 10).astype(np.float32)
+        add_mainpar = np.random.rand(2, 50, 16).astype(np.float32)
+        datahandler.set("get_many_testing", mainpar=mainpar, add_mainpar=add_mainpar)
+
+        rl, fs = datahandler.record_length, datahandler.sample_frequency
+        names = ["pulse_height", "onset", "rise_time", "decay_time", "slope", "var", "mainpar", "onset"]
+        for idx0, idx1 in [(None, None), (0, None), (1, [3, 7, 21])]:
+            i0 = slice(None) if idx0 is None else idx0
+            i1 = slice(None) if idx1 is None else idx1
+            mp, add_mp = mainpar[i0][..., i1, :], add_mainpar[i0][..., i1, :]
+            expected = [mp[..., 0], 
+                        (mp[..., 1] - rl/4)/fs*1000,
+                        (mp[..., 2] - mp[..., 1])/fs*1000,
+                        (mp[..., 6] - mp[..., 4])/fs*1000,
+                        mp[..., 8]*rl,
+                        add_mp[..., 6],
+                        mp,
+                        (mp[..., 1] - rl/4)/fs*1000]
+            
+            many = datahandler.get_many("get_many_testing", names, idx0=idx0, idx1=idx1)
+            for name, data, ref in zip(names, many, expected):
+                assert np.allclose(data, ref)
+                assert np.array_equal(data, datahandler.get("get_many_testing", name, idx0, idx1))
+
+        assert np.array_equal(datahandler.get_many("get_many_testing", ["mainpar"], 0, None, 3)[0], mainpar[0, :, 3])
+
+        datahandler.drop("get_many_testing")
+
+    def test_feature_table(self, datahandler, tempdir):
+        pytest.importorskip("pyarrow")
+
+        mainpar = np.random.rand(2, 50, 10).astype(np.float32)
+        hours = np.arange(50, dtype=np.float32)
+        datahandler.set("feature_table_testing", mainpar=mainpar, hours=hours)
+
+        path = os.path.join(tempdir.name, "features.parquet")
+        datahandler.to_feature_table("feature_table_testing", ["pulse_height", "rise_time", "hours", "mainpar"], path, chunk_size=16)
+
+        df = ai.DataHandler.read_feature_table(path)
+        assert len(df) == 50
+        assert np.array_equal(df["event_index"], np.arange(50))
+        assert np.array_equal(df["hours"], hours)
+        assert np.array_equal(df["pulse_height_ch1"], mainpar[1, :, 0])
+        assert np.array_equal(df["mainpar_8_ch0"], mainpar[0, :, 8])
+        assert np.array_equal(df["rise_time_ch0"], datahandler.get("feature_table_testing", "rise_time", 0))
+
+        df = ai.DataHandler.read_feature_table(path, columns=["event_index", "hours"], filters=[("hours", ">=", 40)])
+        assert list(df.columns) == ["event_index", "hours"]
+        assert np.array_equal(df["event_index"], np.arange(40, 50))
+
+        datahandler.drop("feature_table_testing")
+
     def test_manipulations(self, datahandler, testdata_1D_2D_3D_s_mus):
         d1, d2, d3, *_ = testdata_1D_2D_3D_s_mus
 
@@ -188,4 +285,20 @@ class TestDataHandler:
 
         with pytest.raises(Exception): # already existing dataset
             it = datahandler.get_event_iterator("iterator_testing")
-            datahandler.include_event_iterator("iterator_testing", it)
\ No newline at end of file
+            datahandler.include_event_iterator("iterator_testing", it)
+
+    @pytest.mark.parametrize("kwargs", [dict(compression="gzip", shuffle=True, n_threads=2),
+                                        dict(compression="gzip", chunks=(1, 7, RECORD_LENGTH)),
+                                        dict(compression="lzf", chunks=(1, 7, 1024)),
+                                        dict(chunks=(1, 16, RECORD_LENGTH))])
+    def test_event_iterator_compression(self, datahandler, testdata_1D_2D_3D_s_mus, kwargs): 
+        *_ , d3, s, mus = testdata_1D_2D_3D_s_mus
+        datahandler.set("compression_testing", event=d3, overwrite_existing=True)
+        datahandler.set(group="compression_testing", time_s=s, time_mus=mus, dtype=np.int32, overwrite_existing=True)
+
+        for it in [datahandler.get_event_iterator("compression_testing", batch_size=13),
+                   datahandler.get_event_iterator("compression_testing", 1)]:
+            datahandler.include_event_iterator("compression_testing_out", it, **kwargs)
+            expected = datahandler.get("compression_testing", "event", [1] if it.n_channels == 1 else None)
+            assert np.array_equal(datahandler.get("compression_testing_out", "event"), expected)
+            datahandler.drop("compression_testing_out")
\ No newline at end of file
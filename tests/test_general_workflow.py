@@ -77,6 +77,17 @@ def test_workflow(dh, tempdir):
         of=of,
         path_dig=tempdir.name+'/mock_001.dig_stamps')
 
+    # Triggering the channels in parallel gives the same trigger time stamps
+    trigger_hours = dh_stream.get("stream", "trigger_hours")
+    dh_stream.include_csmpl_triggers(
+        csmpl_paths=[tempdir.name+'/mock_001_Ch0.csmpl',
+                     tempdir.name+'/mock_001_Ch1.csmpl'],
+        thresholds=thresholds,
+        of=of,
+        path_dig=tempdir.name+'/mock_001.dig_stamps',
+        processes=2)
+    assert np.array_equal(trigger_hours, dh_stream.get("stream", "trigger_hours"))
+
     # Includes information needed to distinguish testpulses from particle hits
     dh_stream.include_test_stamps(
         path_teststamps=tempdir.name+'/mock_001.test_stamps',
@@ -0,0 +1,190 @@
+import os
+
+import pytest
+import numpy as np
+import cait as ai
+
+from cait.data._raw import convert_to_V
+from cait.filter._of import filter_event
+
+from .fixtures import tempdir
+
+DURATION = 30
+RECORD_LENGTH = 2**12
+TAKE_SAMPLES = 2**19
+BIN_DTYPE = np.dtype([('Time', '<i8'), ('ADC1', '<i2'), ('ADC2', '<i2')])
+BIN_HEADER_SIZE = 24
+
+@pytest.fixture(scope="module")
+def csmpl_path(tempdir):
+    ai.data.TestData(filepath=tempdir.name+'/trigger_001',
+                     duration=DURATION,
+                     channels=[0, 1],
+                     sample_frequency=25000,
+                     start_s=13).generate()
+    yield tempdir.name+'/trigger_001_Ch0.csmpl'
+
+@pytest.fixture(scope="module")
+def bin_path(tempdir, csmpl_path):
+    # VDAQ-like file with a header and the samples of the csmpl file in channel 'ADC1'
+    samples = np.fromfile(csmpl_path, dtype=np.int16)
+    data = np.zeros(len(samples), dtype=BIN_DTYPE)
+    data['Time'] = np.arange(len(samples))
+    data['ADC1'] = samples
+    path = tempdir.name+'/trigger_001.bin'
+    with open(path, 'wb') as f:
+        f.write(bytes(BIN_HEADER_SIZE))
+        data.tofile(f)
+    yield path
+
+# Copy of the record window filtering and trigger loop as they were before the
+# windows were filtered in batches (used as reference)
+def legacy_get_max_index(stream, counter, record_length, overlap, block, transfer_function, down=1, window=True,
+                         bits=16, max=10, min=-10, square=False):
+    record = stream[counter:counter + record_length]
+    if down > 1:
+        record = np.mean(record.reshape((int(len(record) / down), down)), axis=1)
+        overlap = int(overlap / down)
+        block = int(block / down)
+    record = convert_to_V(record, bits=bits, max=max, min=min)
+    if square:
+        record **= 2
+    record -= np.mean(record[:int(overlap / 2)])
+    filtered_record = filter_event(record, transfer_function=transfer_function, window=window)
+
+    if block > overlap:
+        trig = np.argmax(filtered_record[block:-overlap])
+        trig += block
+    else:
+        trig = np.argmax(filtered_record[overlap:-overlap])
+        trig += overlap
+    h = filtered_record[trig]
+    if down > 1:
+        trig *= down
+
+    return int(trig), h
+
+def legacy_trigger(stream, trigger_tres, record_length, overlap, take_samples, trigger_block, sample_length,
+                   **kwargs):
+    triggers, trigger_heights, record_starts, blocks = [], [], [], []
+    counter = record_length
+    block = 0
+    while counter < take_samples - record_length:
+        if block >= record_length - overlap:
+            block -= record_length - 2 * overlap
+            counter += record_length - 2 * overlap
+        else:
+            trig, height = legacy_get_max_index(stream, counter, record_length, overlap, block, **kwargs)
+            if height > trigger_tres:
+                counter += (trig - overlap) - 1
+                if counter > take_samples - record_length:
+                    continue
+                trig, height = legacy_get_max_index(stream, counter, record_length, overlap, block, **kwargs)
+                if height > trigger_tres:
+                    triggers.append(ai.trigger.sample_to_time(counter + trig, sample_duration=sample_length))
+                    trigger_heights.append(height)
+                    record_starts.append(ai.trigger.sample_to_time(counter, sample_duration=sample_length))
+                    blocks.append(block)
+                    block += trig + trigger_block
+            counter += record_length - 2 * overlap
+            block -= record_length - 2 * overlap
+            if block < 0:
+                block = 0
+
+    return np.array(triggers), np.array(trigger_heights), np.array(record_starts), np.array(blocks)
+
+def assert_same_info(info, reference):
+    assert len(reference[0]) > 0
+    for a, b in zip(info, reference):
+        assert np.array_equal(a, b)
+
+# A threshold of 0 triggers (almost) every window, which moves the record window
+# off the regular grid each time
+@pytest.mark.parametrize("down", [1, 2])
+@pytest.mark.parametrize("threshold", [0.0, 0.005])
+@pytest.mark.parametrize("batch_size", [1, 64])
+def test_trigger_csmpl_legacy(csmpl_path, down, threshold, batch_size):
+    tf = np.ones(RECORD_LENGTH//down//2 + 1)
+    info = ai.trigger.trigger_csmpl(paths=[csmpl_path],
+                                    trigger_tres=threshold,
+                                    transfer_function=tf,
+                                    record_length=RECORD_LENGTH,
+                                    take_samples=TAKE_SAMPLES,
+                                    trigger_block=RECORD_LENGTH,
+                                    return_info=True,
+                                    down=down,
+                                    batch_size=batch_size)
+
+    reference = legacy_trigger(ai.trigger.readcs(csmpl_path), threshold, RECORD_LENGTH, RECORD_LENGTH//8,
+                               TAKE_SAMPLES, RECORD_LENGTH, 0.00004, transfer_function=tf, down=down)
+    assert_same_info(info, reference)
+
+@pytest.mark.parametrize("square", [False, True])
+@pytest.mark.parametrize("threshold", [0.0, 0.005])
+def test_trigger_bin_legacy(bin_path, square, threshold):
+    tf = np.ones(RECORD_LENGTH//2 + 1)
+    info = ai.trigger.trigger_bin(paths=[bin_path],
+                                  dtype=BIN_DTYPE,
+                                  key='ADC1',
+                                  header_size=BIN_HEADER_SIZE,
+                                  trigger_tres=threshold,
+                                  transfer_function=tf,
+                                  record_length=RECORD_LENGTH,
+                                  take_samples=TAKE_SAMPLES,
+                                  trigger_block=RECORD_LENGTH,
+                                  return_info=True,
+                                  square=square)
+
+    stream = np.memmap(bin_path, dtype=BIN_DTYPE, mode='r', offset=BIN_HEADER_SIZE)['ADC1']
+    reference = legacy_trigger(stream, threshold, RECORD_LENGTH, RECORD_LENGTH//8, TAKE_SAMPLES, RECORD_LENGTH,
+                               0.00004, transfer_function=tf, max=20, min=-20, square=square)
+    assert_same_info(info, reference)
+
+@pytest.mark.parametrize("down", [1, 4])
+def test_record_windows(csmpl_path, down):
+    start_times = np.array([20.3, -0.1, 12.7, 12.71, 0.0])
+
+    windows = ai.trigger.get_record_windows(csmpl_path, start_times, 2**14, sample_duration=4e-5, down=down)
+    assert windows.shape == (len(start_times), 2**14 // down)
+
+    for t, w in zip(start_times, windows):
+        ev, _ = ai.trigger.get_record_window(csmpl_path, t, 2**14, sample_duration=4e-5, down=down)
+        assert np.array_equal(w, ev)
+
+    # an opened stream gives the same windows
+    stream = ai.trigger.readcs(csmpl_path)
+    assert np.array_equal(windows, ai.trigger.get_record_windows(csmpl_path, start_times, 2**14, sample_duration=4e-5,
+                                                                 down=down, stream=stream))
+
+    # windows reaching beyond the end of the file are padded
+    windows = ai.trigger.get_record_windows(csmpl_path, [DURATION - 0.1], 2**14, sample_duration=4e-5)
+    ev, _ = ai.trigger.get_record_window(csmpl_path, DURATION - 0.1, 2**14, sample_duration=4e-5)
+    n = os.path.getsize(csmpl_path) // 2 - int(ai.trigger.time_to_sample(DURATION - 0.1, sample_duration=4e-5))
+    assert np.array_equal(windows[0, :n], ev[:n])
+    assert np.all(np.abs(windows[0, n:]) < 1e-3)
+
+def test_record_windows_vdaq(bin_path):
+    start_times = np.array([20.3, 0.0, 12.7, 12.71])
+    kwargs = dict(record_length=2**12, dtype=BIN_DTYPE, key='ADC1', header_size=BIN_HEADER_SIZE)
+
+    windows = ai.trigger.get_record_windows_vdaq(bin_path, start_times, **kwargs)
+    stream = ai.trigger.memmap_bin(bin_path, BIN_DTYPE, BIN_HEADER_SIZE)['ADC1']
+    assert np.array_equal(windows, ai.trigger.get_record_windows_vdaq(bin_path, start_times, stream=stream, **kwargs))
+
+    for t, w in zip(start_times, windows):
+        ev, _ = ai.trigger.get_record_window_vdaq(bin_path, t, **kwargs)
+        assert np.array_equal(w, ev)
+
+def test_queue_progress():
+    from queue import Queue
+    from cait.trigger._csmpl import _QueueProgress
+
+    queue = Queue()
+    progress = _QueueProgress(queue, min_samples=100, interval=3600)
+    for _ in range(25):
+        progress.update(10)
+    # Only full batches of updates are put to the queue, the rest after flushing
+    assert queue.qsize() == 2
+    progress.flush()
+    counts = [queue.get() for _ in range(queue.qsize())]
+    assert counts == [100, 100, 50]
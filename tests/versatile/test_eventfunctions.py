@@ -1,6 +1,11 @@
+import time
+
 import pytest
+import numpy as np
+
+from cait.versatile import apply, apply_to_dh, ResultCache, MockData, Pipeline, Align, BoxCarSmoothing, Downsample, OptimumFiltering, RemoveBaseline, TukeyFiltering, CalcMP, FitBaseline
 
-from cait.versatile import apply, MockData, BoxCarSmoothing, Downsample, OptimumFiltering, RemoveBaseline, TukeyFiltering, CalcMP, FitBaseline
+from ..fixtures import datahandler, tempdir
 
 RECORD_LENGTH = 2**14
 N_EVENTS = 100
@@ -19,6 +24,21 @@ calcmp = CalcMP()
 calcmp_scalar = CalcMP(dt_us=mock.dt_us)
 fbl = FitBaseline()
 
+with it1[:, :1] as it:
+    FIRST_MAX = np.max(next(iter(it)))
+
+# Functions whose output type or shape for the first event differs from the others
+def int_then_float(event):
+    m = np.max(event)
+    return 1 if m == FIRST_MAX else np.float32(m)
+
+def float32_then_float64(event):
+    m = np.max(event)
+    return np.float32(m) if m == FIRST_MAX else np.float64(m)
+
+def ragged(event):
+    return np.zeros(1 if np.max(event) == FIRST_MAX else 2)
+
 @pytest.mark.parametrize("fnc", [bcs, ds, rmbl, tf, calcmp])
 def test_batches_processing(fnc):
     # Double channel
@@ -57,6 +77,100 @@ def test_batches_of():
     assert out1.shape == out2.shape
     assert out2.shape == out3.shape
 
+def test_batches_full():
+    # Batched results are the same as for single events
+    it = mock.get_event_iterator()
+    of1 = OptimumFiltering(mock.of[0])
+    of2 = OptimumFiltering(mock.of)
+
+    # Double channel
+    assert np.allclose(apply(of2, it), apply(of2, it2))
+    # Single channel
+    assert np.allclose(apply(of1, it[0]), apply(of1, it2[0]))
+
+def test_align():
+    sev = np.array(mock.sev[0])
+    align = Align(sev)
+    shifted = np.array([np.roll(sev, s) for s in [-300, -10, 0, 50, 400]])
+
+    # Single events, batches and batches of multiple channels
+    assert np.allclose(align(shifted[1]), sev)
+    assert np.allclose(align(shifted), sev)
+    assert np.allclose(align(np.stack([shifted, shifted[::-1]], axis=1)), sev)
+
+@pytest.mark.parametrize("kwargs", [{}, {"peak_bounds": (0, 1)}, {"box_car_smoothing": {"length": 7}}])
+def test_calcmp_fused(kwargs):
+    # The compiled kernel yields the same results as the step-by-step calculation
+    events = mock.get_event(np.arange(N_EVENTS)).reshape(-1, RECORD_LENGTH)
+    f = CalcMP(**kwargs)
+    fused, steps = f(events), f._calc(events)
+
+    assert np.array_equal(fused[:, 1:7], steps[:, 1:7])
+    assert np.allclose(fused, steps)
+
+@pytest.mark.parametrize("model", [1, 2, "exp"])
+def test_fitbaseline_batches(model):
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 1, 1000)
+    pars = np.array([[2, 5, -1], [1, 20, 0.5]])
+    traces = pars[:, 0, None]*np.exp(-pars[:, 1, None]*x) + pars[:, 2, None] + 0.01*rng.normal(size=(2, 1000))
+    batch = np.stack([traces, traces[::-1]])
+
+    f = FitBaseline(model=model)
+    par, rms = f(batch)
+    assert par.shape[:-1] == rms.shape == (2, 2)
+
+    # Batched fit yields the same results as fits of single traces
+    for k in range(2):
+        p, r = FitBaseline(model=model)(traces[k])
+        assert np.allclose(par[0, k], p) and np.allclose(rms[0, k], r)
+
+    if model == "exp":
+        assert np.allclose(par[0], pars, rtol=1e-2, atol=1e-2)
+    else:
+        assert np.allclose(par[0, 0], np.polyfit(x, traces[0], model)[::-1])
+
+def test_pipeline():
+    it = mock.get_event_iterator()
+    chain = [rmbl, tf, OptimumFiltering(mock.of), calcmp_scalar]
+    pipeline = Pipeline(*chain)
+
+    assert pipeline.batch_support == "full"
+    assert Pipeline(rmbl, bcs, ds).batch_support == "trivial"
+    assert Pipeline(rmbl, lambda x: x).batch_support == "none"
+
+    # Same result as processing and applying the functions one after another
+    out_steps = apply(chain[-1], it.with_processing(chain[:-1]))
+    for i in [it, it2]:
+        out = apply(pipeline, i)
+        assert all([np.allclose(a, b) for a, b in zip(out, out_steps)])
+
+    out_steps = apply(ds, it[0].with_processing([rmbl, bcs]))
+    assert np.allclose(apply(Pipeline(rmbl, bcs, ds), it2[0]), out_steps)
+
+def test_pipeline_buffers():
+    of = OptimumFiltering(mock.of)
+    pipeline = Pipeline(rmbl, tf, of, Downsample(2))
+    with it2 as it:
+        batches = [b for b, _ in zip(it, range(2))]
+
+    # Intermediate results are written into the same buffers for batches of the same shape
+    first = pipeline(batches[0])
+    buffers = [b for _, b in pipeline._buffers.values()]
+    assert len(buffers) == 3
+    second = pipeline(batches[1])
+    assert all(b is c for b, (_, c) in zip(buffers, pipeline._buffers.values()))
+
+    # ... but the returned results are not overwritten
+    for batch, out in zip(batches, [first, second]):
+        assert np.allclose(out, np.array([Downsample(2)(of(tf(rmbl(ev)))) for ev in batch]))
+
+    # Functions returning their input do not hand out a buffer
+    pipeline = Pipeline(rmbl, lambda x: x)
+    out = pipeline(batches[0])
+    assert not np.may_share_memory(out, pipeline._buffers[0][1])
+    assert np.array_equal(out, rmbl(batches[0]))
+
 @pytest.mark.parametrize("fnc", [calcmp_scalar, fbl])
 def test_batches_scalar(fnc):
     # Double channel
@@ -73,4 +187,103 @@ def test_batches_scalar(fnc):
     out3 = apply(fnc, it3[0])
 
     assert len(out1) == len(out2)
-    assert len(out2) == len(out3)
\ No newline at end of file
+    assert len(out2) == len(out3)
+
+@pytest.mark.parametrize("fnc", [calcmp_scalar, fbl, rmbl])
+def test_multiprocessing(fnc):
+    for it in [it1, it2, it2[0]]:
+        out_serial = apply(fnc, it)
+        out_parallel = apply(fnc, it, n_processes=2)
+
+        if isinstance(out_serial, tuple):
+            assert all([np.array_equal(a, b) for a, b in zip(out_serial, out_parallel)])
+        else:
+            assert np.array_equal(out_serial, out_parallel)
+
+@pytest.mark.parametrize("fnc", [int_then_float, float32_then_float64, ragged])
+def test_multiprocessing_output_types(fnc):
+    for it in [it1, it2]:
+        try:
+            out_serial = apply(fnc, it)
+        except Exception as e:
+            with pytest.raises(type(e)):
+                apply(fnc, it, n_processes=2)
+        else:
+            out_parallel = apply(fnc, it, n_processes=2)
+            assert out_serial.dtype == out_parallel.dtype
+            assert np.array_equal(out_serial, out_parallel)
+
+def test_apply_cache(tempdir):
+    cache = ResultCache(tempdir.name + "/cache")
+    cache.clear()
+
+    out = apply(calcmp_scalar, it2, cache=cache)
+    assert len(cache) == 1
+    # Batch size does not change the key, function parameters, events and processing do
+    assert cache.key(calcmp_scalar, it2) == cache.key(CalcMP(dt_us=mock.dt_us), it3)
+    assert cache.key(calcmp_scalar, it2) != cache.key(CalcMP(dt_us=2*mock.dt_us), it2)
+    assert cache.key(calcmp_scalar, it2) != cache.key(calcmp_scalar, it2[:, :50])
+    assert cache.key(calcmp_scalar, it2) != cache.key(calcmp_scalar, it2.with_processing(rmbl))
+    # Arguments which are not stored as '_<param>' attributes are part of the key, too
+    fit_bl = CalcMP(dt_us=mock.dt_us, fit_baseline={'model': 1, 'where': 1/8, 'xdata': None})
+    assert cache.key(calcmp_scalar, it2) != cache.key(fit_bl, it2)
+    apply(fit_bl, it2, cache=cache)
+    assert len(cache) == 2
+    cache.clear()
+    out = apply(calcmp_scalar, it2, cache=cache)
+    # Calling a function (which can alter its attributes) does not change the key
+    rb = RemoveBaseline()
+    key = cache.key(rb, it2)
+    rb(next(iter(it2)))
+    assert cache.key(rb, it2) == key
+
+    cached = apply(calcmp_scalar, it3, cache=cache)
+    assert len(cache) == 1
+    assert all([np.array_equal(a, b) for a, b in zip(out, cached)])
+
+    # Least recently used results are evicted
+    small = ResultCache(tempdir.name + "/cache", max_size=cache.size + 1)
+    apply(calcmp_scalar, it2, cache=small)
+    apply(rmbl, it2, cache=small)
+    assert len(small) == 1
+    assert small.load(small.key(calcmp_scalar, it2)) is None
+
+def test_bounded_imap():
+    from multiprocessing import Pool
+    from cait.versatile.functions.apply import _bounded_imap
+
+    n_pulled = 0
+    def tasks():
+        nonlocal n_pulled
+        for i in range(40):
+            n_pulled += 1
+            yield -i
+
+    # A slow sink must not let finished results pile up
+    with Pool(2) as pool:
+        for n_consumed, res in enumerate(_bounded_imap(pool, abs, tasks(), 4)):
+            assert res == n_consumed
+            assert n_pulled - n_consumed <= 4
+            time.sleep(0.01)
+
+@pytest.mark.parametrize("n_processes", [1, 2])
+def test_apply_to_dh(datahandler, n_processes):
+    group = f"apply_{n_processes}"
+
+    # Multiple channels and multiple outputs (event dimension is second dimension)
+    apply_to_dh(rmbl, it2, datahandler, group, "event", n_processes=n_processes, chunk_size=20)
+    apply_to_dh(calcmp_scalar, it2, datahandler, group, ["ph", "t0", "t_rise", "t_decay", "lin_slope"], n_processes=n_processes, chunk_size=20, dtype="float64")
+    # Single channel (event dimension is first dimension)
+    apply_to_dh(calcmp_scalar, it2[0], datahandler, group, [f"{x}_0" for x in ["ph", "t0", "t_rise", "t_decay", "lin_slope"]], n_processes=n_processes, dtype="float64")
+
+    event = apply(rmbl, it2)
+    mp = apply(calcmp_scalar, it2)
+
+    assert np.array_equal(datahandler.get(group, "event"), np.moveaxis(event, 0, 1).astype(np.float32))
+    assert np.array_equal(datahandler.get(group, "ph"), mp[0].T)
+    assert np.array_equal(datahandler.get(group, "lin_slope"), mp[-1].T)
+    assert np.array_equal(datahandler.get(group, "ph_0"), mp[0][:, 0])
+
+    # Datasets are not overwritten
+    with pytest.raises(ValueError):
+        apply_to_dh(rmbl, it2, datahandler, group, "event")
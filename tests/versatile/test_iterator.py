@@ -201,6 +201,44 @@ class TestH5Iterator:
         for i in it3: assert i.shape == (3, dh.record_length)
         for i in it4: assert i.shape == (3, 2, dh.record_length)
 
+    @pytest.mark.parametrize("cache_size", [None, 2**20])
+    def test_unsorted_inds(self, dh, cache_size):
+        # Unsorted, repeated and non-consecutive indices
+        inds = [55, 12, 13, 14, 99, 12, 0, 81]
+        events = np.moveaxis(dh.get("events", "event")[:, inds], 0, 1)
+
+        for channels, expected in [(None, events), (1, events[:, 1]), ([0, 1], events)]:
+            it = H5Iterator(dh, "events", channels=channels, batch_size=3, inds=inds, cache_size=cache_size)
+            # Second pass uses cached data (if cache_size is given)
+            for _ in range(2):
+                assert np.array_equal(apply(lambda x: x, it), expected)
+
+    def test_sparse_chunked_reads(self, dh):
+        events = dh.get("events", "event")
+        with dh.get_filehandle(mode="r+") as f:
+            if "events_chunked" in f: del f["events_chunked"]
+            f.create_group("events_chunked").create_dataset("event", data=events, chunks=(2, 5, events.shape[-1]))
+
+        # Records the number of events of each read
+        class Recorder:
+            def __init__(self, ds): self.ds, self.lengths = ds, []
+            def __getitem__(self, key):
+                data = self.ds[key]
+                self.lengths.append(data.shape[-2])
+                return data
+
+        # Every chunk contains one requested event
+        inds = list(range(2, 100, 5))
+        it = H5Iterator(dh, "events_chunked", batch_size=4, inds=inds)
+        assert np.array_equal(apply(lambda x: x, it), np.moveaxis(events[:, inds], 0, 1))
+
+        with dh.get_filehandle(mode="r") as f:
+            rec = Recorder(f["events_chunked"]["event"])
+            out = it._read(rec, inds[:4])
+        assert np.array_equal(out, events[:, inds[:4]])
+        # No read is larger than a chunk (i.e. than the number of requested events plus a chunk)
+        assert max(rec.lengths) <= 5
+
     def test_batch_remainder(self, dh):
         it = H5Iterator(dh, "events", channels=1, batch_size=11)
         lens_are = np.array([len(i) for i in it])
@@ -325,6 +363,19 @@ class TestStreamIterator:
 
         assert np.array_equal(next(iter(it))[0], next(iter(it2)))
 
+    def test_batches_overlapping(self, testdata):
+        stream, *_ = testdata
+
+        # Unsorted indices with overlapping, adjacent and separate record windows
+        inds = [50000, 20000, 20100, 20000+2**13, 90000, 20050]
+        keys = ["mock_001_Ch0","mock_001_Ch1"]
+
+        batched = next(iter(StreamIterator(stream=stream, keys=keys, inds=inds, record_length=2**13, batch_size=6)))
+        single = np.array(list(StreamIterator(stream=stream, keys=keys, inds=inds, record_length=2**13)))
+
+        assert batched.shape == (6, 2, 2**13)
+        assert np.array_equal(batched, single)
+
 class TestRDTIterator:
     def test_basic(self, testdata):
         _, f, *_ = testdata
@@ -382,6 +433,54 @@ class TestIteratorCollection:
         
         with pytest.raises(ValueError): it1 + it3
 
+class TestPrefetching:
+    def check_prefetching(self, it, it_prefetch):
+        read = lambda x: np.concatenate(list(x)) if x.uses_batches else np.array(list(x))
+        assert np.array_equal(read(it), read(it_prefetch))
+
+        # Restart iteration before previous one is finished
+        first = next(iter(it_prefetch))
+        assert np.array_equal(read(it_prefetch), read(it))
+        assert np.array_equal(first, next(iter(it)))
+
+        # Prefetching is preserved when slicing
+        assert it_prefetch[:, :5]._prefetch == it_prefetch._prefetch
+
+        basic_checks(it_prefetch)
+
+    def test_h5(self, dh):
+        self.check_prefetching(H5Iterator(dh, "events", batch_size=11),
+                               H5Iterator(dh, "events", batch_size=11, prefetch=2))
+        
+        it = H5Iterator(dh, "events", prefetch=3)
+        with it as opened_it:
+            assert np.array_equal(np.array(list(opened_it)), 
+                                  np.array(list(H5Iterator(dh, "events"))))
+
+    def test_stream(self, testdata):
+        stream, *_ = testdata
+        inds = stream.time.timestamp_to_ind(stream.tp_timestamps["0"])
+
+        self.check_prefetching(stream.get_event_iterator(["mock_001_Ch0","mock_001_Ch1"], 2**13, inds=inds, batch_size=7),
+                               stream.get_event_iterator(["mock_001_Ch0","mock_001_Ch1"], 2**13, inds=inds, batch_size=7, prefetch=1))
+        
+    def test_rdt(self, testdata):
+        _, f, *_ = testdata
+
+        self.check_prefetching(f[(0,1)].get_event_iterator(),
+                               f[(0,1)].get_event_iterator(prefetch=4))
+
+    def test_errors(self, testdata):
+        stream, *_ = testdata
+
+        with pytest.raises(ValueError):
+            StreamIterator(stream, "mock_001_Ch0", [10000], 2**13, prefetch=-1)
+
+        # Exceptions raised while reading are raised in the main thread
+        it = StreamIterator(stream, "mock_001_Ch0", [10000, len(stream)], 2**13, batch_size=2, prefetch=2)
+        with pytest.raises(IndexError):
+            list(it)
+
 class TestMockIterator:
     def test_basic(self):
         mock = MockData()
@@ -1,6 +1,8 @@
 import pytest
+import numpy as np
 
 import cait as ai
+from cait.data._raw import get_record_indices
 from cait.versatile.datasources.hardwaretriggered.rdt_file import RDTFile
 from cait.versatile.datasources.hardwaretriggered.par_file import PARFile
 
@@ -98,4 +100,15 @@ class TestRDT:
 
         next(iter(it1))
         next(iter(it2))
-        next(iter(it3))
\ No newline at end of file
+        next(iter(it3))
+
+
+def test_record_indices():
+    detector_nmbr = np.random.randint(0, 3, size=1000)
+    for channels in [[0], [0, 1], [2, 0, 1], [1, 1]]:
+        # Reference: consecutive records with the channels in the given order
+        ref = [i for i in range(len(detector_nmbr) - len(channels) + 1) 
+               if all(detector_nmbr[i+j] == c for j, c in enumerate(channels))]
+        assert np.array_equal(get_record_indices(detector_nmbr, channels), ref)
+
+    assert len(get_record_indices(detector_nmbr[:1], [0, 1])) == 0
@@ -1,9 +1,17 @@
+import os
+import shutil
+import time
+
 import pytest
 
 import numpy as np
+import scipy as sp
+import numba as nb
 import cait as ai
 import cait.versatile as vai
 
+from cait.versatile.functions.trigger.triggerbase import search_chunk, _search_chunk
+
 from ..fixtures import tempdir
 
 LENGTH = 100
@@ -77,6 +85,47 @@ def test_cresst_basic(tempdir, stream_cresst): # stream_cresst needed for file i
     basic_checks(s1)
     basic_checks(s2)
 
+def test_voltage_dtype(stream_cresst):
+    k = "mock_001_Ch0"
+    raw = stream_cresst.get_raw_trace(k, slice(100, 5000))
+    scale, offset = stream_cresst.get_voltage_scale(k)
+
+    # Raw traces are views of the memory-mapped data
+    assert np.shares_memory(raw, stream_cresst.get_channel(k))
+
+    # The conversion agrees with the one of ai.data.convert_to_V
+    reference = ai.data.convert_to_V(raw.astype(np.float64), bits=16, min=-10, max=10)
+    assert np.array_equal(stream_cresst[k, 100:5000, 'as_voltage'], reference)
+    assert np.array_equal(scale*raw + offset, reference)
+
+    single = stream_cresst[k, 100:5000, 'as_voltage', np.float32]
+    assert single.dtype == np.float32
+    assert np.allclose(single, reference, atol=1e-6)
+    with pytest.raises(TypeError): stream_cresst[k, 100:5000, 'as_voltage', np.int16]
+
+    it64 = stream_cresst.get_event_iterator([k, "mock_001_Ch1"], 2**10, inds=[2000, 5000, 9000], batch_size=2)
+    it32 = stream_cresst.get_event_iterator([k, "mock_001_Ch1"], 2**10, inds=[2000, 5000, 9000], batch_size=2, dtype=np.float32)
+    for b64, b32 in zip(it64, it32):
+        assert b32.dtype == np.float32
+        assert np.allclose(b64, b32, atol=1e-6)
+
+    # Sum of channels
+    ss = vai.StreamSum(stream_cresst, [k, "mock_001_Ch1"])
+    assert ss["sum", 100:200, 'as_voltage', np.float32].dtype == np.float32
+    assert np.allclose(ss["sum", 100:200, 'as_voltage'], 
+                       stream_cresst[k, 100:200, 'as_voltage'] + stream_cresst["mock_001_Ch1", 100:200, 'as_voltage'])
+
+def test_voltage_traces(stream_cresst):
+    keys = ["mock_001_Ch0", "mock_001_Ch1"]
+    traces = stream_cresst.get_voltage_traces(keys, slice(100, 5000))
+    for k in keys:
+        assert np.array_equal(traces[k], stream_cresst[k, 100:5000, 'as_voltage'])
+
+    ss = vai.StreamSum(stream_cresst, keys)
+    traces = ss.get_voltage_traces(["sum", keys[1]], slice(100, 5000), np.float32)
+    assert np.array_equal(traces["sum"], ss["sum", 100:5000, 'as_voltage', np.float32])
+    assert np.array_equal(traces[keys[1]], ss[keys[1], 100:5000, 'as_voltage', np.float32])
+
 # TODO
 def test_VDAQ2():
     ...
@@ -90,4 +139,137 @@ def test_VDAQ3():
 def test_trigger(stream_cresst):
     i, v = vai.trigger_zscore(stream_cresst, "mock_001_Ch0", 2**14)
     i, v = vai.trigger_zscore(stream_cresst, "mock_001_Ch0", 2**14, n_triggers=10)
-    i, v = vai.trigger_zscore(stream_cresst, "mock_001_Ch1", 2**14, apply_first=lambda x: -x)
\ No newline at end of file
+    i, v = vai.trigger_zscore(stream_cresst, "mock_001_Ch1", 2**14, apply_first=lambda x: -x)
+
+def test_trigger_parallel(stream_cresst):
+    of = np.ones(2**12+1)
+    of[0] = 0
+    # Small chunks result in many search area boundaries which have to be resolved
+    serial = vai.trigger_of(stream_cresst, "mock_001_Ch0", 0.01, of, chunk_size=1)
+    parallel = vai.trigger_of(stream_cresst, "mock_001_Ch0", 0.01, of, chunk_size=1, n_processes=2)
+    assert serial[0] == parallel[0]
+    assert np.array_equal(serial[1], parallel[1])
+
+    serial = vai.trigger_zscore(stream_cresst, "mock_001_Ch1", 2**14, chunk_size=2)
+    parallel = vai.trigger_zscore(stream_cresst, "mock_001_Ch1", 2**14, chunk_size=2, n_processes=2)
+    assert serial[0] == parallel[0]
+
+def test_trigger_multi(stream_cresst):
+    of = np.ones(2**12+1)
+    of[0] = 0
+    keys = ["mock_001_Ch0", "mock_001_Ch1"]
+    triggers, events = vai.trigger_of_multi(stream_cresst, keys, [0.01, 0.02], [of, of])
+
+    # Triggers of individual channels are the same as for single channel triggering
+    assert triggers[keys[0]] == vai.trigger_of(stream_cresst, keys[0], 0.01, of)
+    assert triggers[keys[1]] == vai.trigger_of(stream_cresst, keys[1], 0.02, of)
+
+    # Merged events are sorted and each one was triggered by its dominant channel
+    assert np.all(np.diff(events["inds"]) > 0)
+    assert events["vals"].shape == (len(events["inds"]), 2)
+    for ind, channel in zip(events["inds"], events["channels"]):
+        assert ind in triggers[channel][0]
+
+def test_trigger_checkpoint(stream_cresst, tempdir):
+    of = np.ones(2**12+1)
+    of[0] = 0
+    key = "mock_001_Ch0"
+    checkpoint = tempdir.name+'/checkpoint.h5'
+
+    # Emulate a stream which is still being written by truncating the files
+    os.makedirs(tempdir.name+'/growing', exist_ok=True)
+    files = []
+    for f in ['_Ch0.csmpl', '_Ch1.csmpl', '.test_stamps', '.dig_stamps', '.par']:
+        src, dst = tempdir.name+'/mock_001'+f, tempdir.name+'/growing/mock_001'+f
+        shutil.copy(src, dst)
+        if f.endswith('.csmpl'): 
+            with open(dst, 'r+b') as fh: fh.truncate(2*(len(stream_cresst)//2))
+        files.append(dst)
+    partial = vai.Stream('cresst', files)
+
+    first = vai.trigger_of(partial, key, 0.01, of, chunk_size=3, checkpoint=checkpoint)
+    resumed = vai.trigger_of(stream_cresst, key, 0.01, of, chunk_size=3, checkpoint=checkpoint)
+    full = vai.trigger_of(stream_cresst, key, 0.01, of, chunk_size=3)
+
+    assert resumed[0] == full[0]
+    assert np.array_equal(resumed[1], full[1])
+    assert 0 < len(first[0]) < len(full[0])
+
+    # Resuming with different settings is not possible
+    with pytest.raises(ValueError):
+        vai.trigger_of(stream_cresst, key, 0.02, of, chunk_size=3, checkpoint=checkpoint)
+
+@pytest.mark.parametrize("n", [2**12, 2**14+17, 3*2**15])
+def test_stream_filter(n):
+    of = np.fft.rfft(np.random.rand(2**10))
+    data = np.random.rand(n)
+    kernel = np.fft.irfft(of)
+    expected = sp.signal.oaconvolve(data, kernel, mode="valid")
+
+    # Preallocated buffers
+    stream_filter = vai.StreamFilter(of, block_size=n)
+    assert np.allclose(stream_filter(data), expected)
+    assert np.allclose(stream_filter(data), expected)
+    # Different length than the one buffers were allocated for
+    assert np.allclose(stream_filter(data[:n//2]), sp.signal.oaconvolve(data[:n//2], kernel, mode="valid"))
+    # Small FFT size
+    assert np.allclose(vai.StreamFilter(of, fft_size=2**11)(data), expected)
+
+
+# Original implementation of the peak search (used as reference)
+@nb.njit
+def reference_search_chunk(data, threshold, record_length, skip_first=0):
+    trigger_inds = []
+    trigger_vals = []
+    search_len = len(data)-record_length
+    inds = iter(range(skip_first, search_len))
+    for i in inds:
+        if data[i] > threshold:
+            j = np.argmax(data[i:i+record_length])
+            trigger_inds.append(i+j)
+            trigger_vals.append(data[i+j])
+            if i+j+record_length//2 > search_len: 
+                break
+            else:
+                for _ in range(j+record_length//2): 
+                    next(inds)
+    return trigger_inds, trigger_vals
+
+@pytest.mark.parametrize("record_length", [16, 1024])
+@pytest.mark.parametrize("threshold", [-1, 0.5, 3])
+def test_search_chunk(record_length, threshold):
+    rng = np.random.default_rng(seed=42)
+    data = rng.standard_normal(50*record_length)
+    smooth = np.convolve(data, np.ones(record_length//4), mode="same")
+
+    for d in [data, smooth]:
+        for skip_first in [0, 7, record_length]:
+            expected = reference_search_chunk(d, threshold, record_length, skip_first)
+            assert search_chunk(d, threshold, record_length, skip_first) == expected
+            # Search in parallel blocks
+            for n_blocks in [2, 3, 11]:
+                inds, vals, _ = _search_chunk(d, threshold, record_length, skip_first, n_blocks)
+                assert (inds, vals) == expected
+
+    # Dead-time ends exactly at the end of the search region
+    d = np.zeros(3*record_length)
+    d[2*record_length - record_length//2] = 1
+    assert search_chunk(d, 0.5, record_length)[0] == [2*record_length - record_length//2]
+
+@pytest.mark.skipif(min(nb.config.NUMBA_NUM_THREADS, os.cpu_count() or 1) < 2, 
+                    reason="Parallel search needs multiple cores.")
+def test_search_chunk_benchmark():
+    record_length = 2**14
+    # Noisy channel with low threshold, i.e. high trigger density
+    data = np.random.default_rng(seed=42).standard_normal(200*record_length)
+
+    def best_time(f):
+        f(data, 0.5, record_length)
+        times = []
+        for _ in range(5):
+            t0 = time.perf_counter()
+            f(data, 0.5, record_length)
+            times.append(time.perf_counter() - t0)
+        return min(times)
+    
+    assert best_time(search_chunk) < best_time(reference_search_chunk)
\ No newline at end of file